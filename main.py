@@ -26,6 +26,7 @@ import tempfile
 import webbrowser
 import winsound
 import io
+import csv
 import wave
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog, colorchooser
@@ -45,6 +46,20 @@ try:
 except ImportError:
     HAS_TRAY = False
 
+from utils.motion import MotionEngine, MOTION_MODELS, fit_cubic
+from utils.rng import RandomStream
+from utils.patterns import BUILTIN_PATTERNS, build_patterns, load_pattern_specs
+from utils.timing import now_ns, sleep_until_ns, LatencyMeter, TimingStats
+from utils import binfmt, checkpoint
+from utils.pipeline import build_stages, chain, crop
+from utils.journal import JournalWriter, JournalReader
+from utils.macro import compile_steps, optimize, MacroVM, StepProfile, ACT_CLICK
+from utils.script import parse_script
+from utils.analysis import MacroAnalyzer
+from utils.library import MacroLibrary
+from utils.recording import (EventBuffer, PathSimplifier, SpscRing, EV_MOVE, EV_CLICK, EV_KEY,
+                             EV_BUTTON_UP, EV_KEY_UP, BUTTONS)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Вспомогательные классы
@@ -115,7 +130,13 @@ class MouseOpsApp:
     CFG_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_config.json")
     PROFILES_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_profiles.json")
     COORDS_HISTORY_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_coords.json")
-    MACROS_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_macros.json")
+    MACROS_DIR = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_macros")
+    MACROS_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_macros.bin")
+    LEGACY_MACROS_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_macros.json")
+    PATTERNS_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_patterns.json")
+    JOURNAL_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_recording.journal")
+    MACRO_CHECKPOINT_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_macro.checkpoint")
+    ROUTE_CHECKPOINT_FILE = os.path.join(tempfile.gettempdir(), "mouse_ops_v5_route.checkpoint")
 
     DEFAULTS = {
         "hotkey": "F6", "radius": "30", "mouse_delay": "60",
@@ -128,7 +149,7 @@ class MouseOpsApp:
         "human_pos_variation": "5", "curviness": 5, "hand_tremor": 3,
         "click_pressure": 5, "random_pauses": 3,
         "fatigue": 3, "overshoot": 4, "micro_movements": 3,
-        "speed_variation": 5,
+        "speed_variation": 5, "motion_model": "bezier", "human_seed": "",
         "language": "en",
         "coord_select_button": "left",
         "sound_enabled": True, "action_limit_enabled": True,
@@ -136,12 +157,16 @@ class MouseOpsApp:
         "anti_afk": False, "anti_afk_interval": "30",
         "drag_enabled": False,
         "drag_start_x": "0", "drag_start_y": "0",
-        "drag_end_x": "0", "drag_end_y": "0",
+        "drag_end_x": "0", "drag_end_y": "0", "drag_duration": "300",
         "tray_enabled": False,
         "tray_start_minimized": False,
         "tray_show_startstop": True,
         "tray_show_coords": False,
         "sound_volume": 50,
+        "rec_move_hz": "60", "rec_tolerance": "2", "rec_fsync": False,
+        "macro_profile": False,
+        "rec_trim_idle": "", "rec_dedupe": "", "rec_speed": "1",
+        "preroll_enabled": False, "preroll_seconds": "30", "preroll_hotkey": "f10",
     }
 
     def __init__(self, root: tk.Tk):
@@ -193,6 +218,7 @@ class MouseOpsApp:
         self._applying_config = False  # блокировка сохранения при применении профиля
         self.human_delay_variation = tk.StringVar(value="25")
         self.human_pos_variation = tk.StringVar(value="5")
+        self.human_seed = tk.StringVar(value="")
         self.curviness = tk.IntVar(value=5)
         self.hand_tremor = tk.IntVar(value=3)
         self.click_pressure = tk.IntVar(value=5)
@@ -201,6 +227,7 @@ class MouseOpsApp:
         self.overshoot_level = tk.IntVar(value=4)
         self.micro_movements_level = tk.IntVar(value=3)
         self.speed_variation_level = tk.IntVar(value=5)
+        self.motion_model = tk.StringVar(value="bezier")
         self.coord_select_button = tk.StringVar(value="left")
         self.movement_var = tk.StringVar(value="free")
 
@@ -215,6 +242,8 @@ class MouseOpsApp:
         self._noise_y = HumanNoise(seed=137)
         self._fatigue_factor = 1.0
         self._action_count = 0
+        self._new_session_rng()
+        self._motion = MotionEngine(humanize=False, rng=self._rng_move)
 
         # ── Профили ──
         self.current_profile = self._t("profile.default")
@@ -239,6 +268,7 @@ class MouseOpsApp:
         self.drag_start_y = tk.StringVar(value="0")
         self.drag_end_x = tk.StringVar(value="0")
         self.drag_end_y = tk.StringVar(value="0")
+        self.drag_duration = tk.StringVar(value="300")
 
         # ── НОВОЕ v5: Системный трей ──
         self.tray_enabled = tk.BooleanVar(value=False)
@@ -249,12 +279,56 @@ class MouseOpsApp:
 
         # ── НОВОЕ v4: Макросы ──
         self.macro_steps = []           # [{type, x, y, button, key, delay}, ...]
-        self.saved_macros = {}          # {name: [steps]}
+        self.macro_library = MacroLibrary(self.MACROS_DIR)
+        self._macro_analysis = MacroAnalyzer(self._screen_bounds())
+        self._macro_analysis_job = None
+        self.macro_profile = tk.BooleanVar(value=False)
+        self._macro_profile = None      # StepProfile последнего воспроизведения
         self.is_recording = False
-        self.recorded_events = []
+        self.rec_buffer = EventBuffer()
+        self.rec_move_hz = tk.StringVar(value="60")
+        self.rec_tolerance = tk.StringVar(value="2")
+        self.rec_fsync = tk.BooleanVar(value=False)
+        self.rec_trim_idle = tk.StringVar(value="")
+        self.rec_dedupe = tk.StringVar(value="")
+        self.rec_speed = tk.StringVar(value="1")
+        self.rec_crop_from = tk.StringVar(value="")
+        self.rec_crop_to = tk.StringVar(value="")
+        self._rec_journal = None        # журнал текущей записи на диске
+        self._rec_move_interval = 1_000_000_000 // 60   # нс
+        self._rec_last_move = 0
+        self._rec_simplifier = PathSimplifier()
+        # Колбэки слушателей кладут события в свои кольца, остальное — в потоке записи
+        self._rec_rings = (SpscRing(), SpscRing())      # мышь, клавиатура
+        self._rec_worker = None
+        self._rec_worker_stop = threading.Event()
+        self._rec_stop_requested = False
+        self._rec_ui_queue = deque()    # строки для списка записи, разбираются пачками
+        self._rec_ui_after = None
         self._rec_mouse_listener = None
         self._rec_kb_listener = None
         self._rec_start_time = 0
+        self._rec_held = set()          # нажатые во время записи кнопки/клавиши
+
+        # Действия макроса для журнала и счётчиков: (time.time(), вид, строка)
+        self._macro_events = deque()
+        self._macro_limited = False
+
+        # ── Предзапись: кольцо последних N секунд ввода ──
+        self.preroll_enabled = tk.BooleanVar(value=False)
+        self.preroll_seconds = tk.StringVar(value="30")
+        self.preroll_hotkey = tk.StringVar(value="f10")
+        self._preroll_buf = None
+        self._preroll_window = 0        # нс
+        self._preroll_key = None
+        self._preroll_lock = threading.Lock()
+        self._preroll_listeners = []
+        self._preroll_held = set()
+        self._preroll_last_move = 0
+        self._preroll_move_interval = 1_000_000_000 // 60
+        self._preroll_cost = 0          # нс, суммарно в колбэках
+        self._preroll_calls = 0
+        self._preroll_started = 0
 
         # ── НОВОЕ v4: Мульти-точки маршрут ──
         self.route_points = []          # [{x, y, delay, action}]
@@ -262,6 +336,11 @@ class MouseOpsApp:
         # ── НОВОЕ v4: Лог действий ──
         self.action_log = deque(maxlen=500)
 
+        # ── Параметрические фигуры движения ──
+        self.patterns = {}
+        self.user_pattern_names = []
+        self._load_patterns()
+
         # ── UI ──
         self._build_ui()
 
@@ -297,6 +376,9 @@ class MouseOpsApp:
 
         self._center_window()
 
+        # Восстановление записи, прерванной сбоем
+        self.root.after(800, self._rec_recover_journal)
+
         # Звук при запуске программы
         if self.sound_enabled.get():
             self.root.after(300, lambda: self._play_sound("startup"))
@@ -391,6 +473,7 @@ class MouseOpsApp:
         self._on_sound_toggle()
         self._on_tray_toggle()
         self._on_movement_change()
+        self._preroll_apply()
         self.root.geometry(geo)
         self.root.after(50, lambda: self.start_btn.focus_set())
 
@@ -683,7 +766,9 @@ class MouseOpsApp:
         mv_box = ttk.LabelFrame(frame, text=f"  {self._t('lbl.movement_type')}  ", padding=12)
         mv_box.pack(fill=tk.X)
         
-        for label, val in [
+        mv_box.columnconfigure(0, weight=1)
+        mv_box.columnconfigure(1, weight=1)
+        for i, (label, val) in enumerate([
             (self._t("mv.left_right"), "left_right"), 
             (self._t("mv.up_down"), "up_down"),
             (self._t("mv.diagonal"), "diagonal"), 
@@ -691,10 +776,28 @@ class MouseOpsApp:
             (self._t("mv.circle"), "circle"), 
             (self._t("mv.eight"), "eight"),
             (self._t("mv.square"), "square"), 
+            (self._t("mv.ellipse"), "ellipse"),
+            (self._t("mv.spiral"), "spiral"),
+            (self._t("mv.lissajous"), "lissajous"),
+            (self._t("mv.zigzag"), "zigzag"),
             (self._t("mv.free"), "free"),
-        ]:
+        ]):
             ttk.Radiobutton(mv_box, text=label, variable=self.movement_var,
-                            value=val, command=self._on_movement_change).pack(anchor="w", pady=3)
+                            value=val, command=self._on_movement_change
+                            ).grid(row=i // 2, column=i % 2, sticky="w", pady=3)
+
+        # Пользовательские фигуры из файла описаний
+        cp_row = ttk.Frame(mv_box)
+        cp_row.grid(row=6, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+        ttk.Label(cp_row, text=self._t("mv.custom")).pack(side=tk.LEFT, padx=(0, 4))
+        self.custom_pattern_combo = ttk.Combobox(cp_row, state="readonly", width=14,
+                                                 values=self.user_pattern_names)
+        self.custom_pattern_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.custom_pattern_combo.bind("<<ComboboxSelected>>", self._on_custom_pattern)
+        ToolTip(self.custom_pattern_combo, self._t("tip.custom_pattern"))
+        b = ttk.Button(cp_row, text="📂", width=3, command=self._import_patterns)
+        b.pack(side=tk.LEFT, padx=(4, 0))
+        ToolTip(b, self._t("tip.import_patterns"))
 
     def _build_clicker_panel(self, parent):
         frame = ttk.LabelFrame(parent, text=f"  {self._t('lbl.clicker')}  ", padding=18)
@@ -955,6 +1058,10 @@ class MouseOpsApp:
         msb = ttk.Scrollbar(lf, orient=tk.VERTICAL, command=self.macro_listbox.yview)
         msb.pack(side=tk.RIGHT, fill=tk.Y)
         self.macro_listbox.config(yscrollcommand=msb.set)
+        self.macro_analysis_lbl = ttk.Label(steps_frame, text="", font=("Segoe UI", 8),
+                                            foreground=self.COLORS["text_sec"])
+        self.macro_analysis_lbl.pack(anchor="w", pady=(4, 0))
+        ToolTip(self.macro_analysis_lbl, self._t("tip.macro_analysis"))
 
         # Кнопки добавления
         add_row = ttk.Frame(builder)
@@ -974,6 +1081,9 @@ class MouseOpsApp:
         b = ttk.Button(add_row, text=self._t("macro.add_drag"), command=self._macro_add_drag)
         b.pack(side=tk.LEFT, padx=2)
         ToolTip(b, self._t("macro.add_drag"))
+        b = ttk.Button(add_row, text=self._t("macro.add_script"), command=self._macro_add_script)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.macro_script"))
 
         ctrl_row = ttk.Frame(builder)
         ctrl_row.pack(fill=tk.X, pady=2)
@@ -983,6 +1093,9 @@ class MouseOpsApp:
         b.pack(side=tk.LEFT, padx=2)
         b = ttk.Button(ctrl_row, text=self._t("macro.edit"), command=self._macro_edit_step)
         b.pack(side=tk.LEFT, padx=2)
+        b = ttk.Button(ctrl_row, text=self._t("macro.lane"), command=self._macro_set_lane)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.macro_lane"))
         b = ttk.Button(ctrl_row, text=self._t("btn.delete"), command=self._macro_delete_step)
         b.pack(side=tk.LEFT, padx=2)
         b = ttk.Button(ctrl_row, text=self._t("btn.clear"), command=self._macro_clear)
@@ -1001,6 +1114,12 @@ class MouseOpsApp:
         b = ttk.Button(save_row, text=self._t("btn.delete"), command=self._macro_delete_saved)
         b.pack(side=tk.LEFT, padx=2)
         ToolTip(b, self._t("tip.delete_macro"))
+        b = ttk.Button(save_row, text=self._t("btn.macro_import"), command=self._macro_import)
+        b.pack(side=tk.RIGHT, padx=2)
+        ToolTip(b, self._t("tip.macro_import"))
+        b = ttk.Button(save_row, text=self._t("btn.macro_export"), command=self._macro_export)
+        b.pack(side=tk.RIGHT, padx=2)
+        ToolTip(b, self._t("tip.macro_export"))
 
         play_row = ttk.Frame(builder)
         play_row.pack(fill=tk.X, pady=4)
@@ -1009,11 +1128,29 @@ class MouseOpsApp:
         self.macro_repeats.insert(0, "1")
         self.macro_repeats.pack(side=tk.LEFT, padx=2)
         ToolTip(self.macro_repeats, self._t("tip.macro_repeats"))
+        ttk.Label(play_row, text=self._t("macro.speed")).pack(side=tk.LEFT, padx=(8, 4))
+        self.macro_speed = ttk.Entry(play_row, width=5)
+        self.macro_speed.insert(0, "1.0")
+        self.macro_speed.pack(side=tk.LEFT, padx=2)
+        ToolTip(self.macro_speed, self._t("tip.macro_speed"))
         b_play = ttk.Button(play_row, text=self._t("btn.play_macro"), style="Accent.TButton",
                    command=self._macro_play)
         b_play.pack(side=tk.LEFT, padx=(8, 2))
         b_stop = ttk.Button(play_row, text=self._t("btn.stop_macro"), command=self._macro_stop)
         b_stop.pack(side=tk.LEFT, padx=2)
+        b = ttk.Button(play_row, text=self._t("btn.resume"), command=self._macro_resume)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.macro_resume"))
+        cb_prof = ttk.Checkbutton(play_row, text=self._t("macro.profile"),
+                                  variable=self.macro_profile, command=self._save_config)
+        cb_prof.pack(side=tk.LEFT, padx=(8, 2))
+        ToolTip(cb_prof, self._t("tip.macro_profile"))
+        b = ttk.Button(play_row, text=self._t("btn.profile_csv"), command=self._macro_export_profile)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.profile_csv"))
+        self.macro_info = ttk.Label(play_row, text="", font=("Segoe UI", 8),
+                                        foreground=self.COLORS["text_dim"])
+        self.macro_info.pack(side=tk.RIGHT, padx=4)
 
         # ── Sub-tab: Recording ──
         rec_tab = ttk.Frame(top_nb, padding=10)
@@ -1035,10 +1172,75 @@ class MouseOpsApp:
         b_to_builder = ttk.Button(rec_btns, text=self._t("btn.rec_to_builder"),
                    command=self._rec_to_builder)
         b_to_builder.pack(side=tk.LEFT, padx=4)
+        b_replay = ttk.Button(rec_btns, text=self._t("btn.rec_replay"),
+                              command=self._rec_replay)
+        b_replay.pack(side=tk.LEFT, padx=4)
+        ToolTip(b_replay, self._t("tip.rec_replay"))
+        b = ttk.Button(rec_btns, text="💾", width=3, command=self._rec_save)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.rec_save"))
+        b = ttk.Button(rec_btns, text="📂", width=3, command=self._rec_open)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.rec_open"))
+        tol_entry = ttk.Entry(rec_btns, textvariable=self.rec_tolerance, width=4,
+                              font=("Consolas", 9))
+        tol_entry.pack(side=tk.RIGHT, padx=(2, 4))
+        ttk.Label(rec_btns, text=self._t("lbl.rec_tolerance")).pack(side=tk.RIGHT)
+        ToolTip(tol_entry, self._t("tip.rec_tolerance"))
+        hz_entry = ttk.Entry(rec_btns, textvariable=self.rec_move_hz, width=5,
+                             font=("Consolas", 9))
+        hz_entry.pack(side=tk.RIGHT, padx=(2, 4))
+        ttk.Label(rec_btns, text=self._t("lbl.rec_move_hz")).pack(side=tk.RIGHT)
+        ToolTip(hz_entry, self._t("tip.rec_move_hz"))
+
+        proc_row = ttk.Frame(rec_tab)
+        proc_row.pack(fill=tk.X, pady=(2, 0))
+        for label, var, width, tip in (
+                ("lbl.rec_trim_idle", self.rec_trim_idle, 5, "tip.rec_trim_idle"),
+                ("lbl.rec_dedupe", self.rec_dedupe, 5, "tip.rec_dedupe"),
+                ("lbl.rec_speed", self.rec_speed, 4, "tip.rec_speed"),
+                ("lbl.rec_crop", self.rec_crop_from, 5, "tip.rec_crop")):
+            ttk.Label(proc_row, text=self._t(label)).pack(side=tk.LEFT, padx=(4, 2))
+            e = ttk.Entry(proc_row, textvariable=var, width=width, font=("Consolas", 9))
+            e.pack(side=tk.LEFT)
+            ToolTip(e, self._t(tip))
+        ttk.Label(proc_row, text="–").pack(side=tk.LEFT, padx=2)
+        e = ttk.Entry(proc_row, textvariable=self.rec_crop_to, width=5, font=("Consolas", 9))
+        e.pack(side=tk.LEFT)
+        ToolTip(e, self._t("tip.rec_crop"))
+        b = ttk.Button(proc_row, text=self._t("btn.rec_process"), command=self._rec_process)
+        b.pack(side=tk.LEFT, padx=6)
+        ToolTip(b, self._t("tip.rec_process"))
+
+        pre_row = ttk.Frame(rec_tab)
+        pre_row.pack(fill=tk.X, pady=(2, 0))
+        cb = ttk.Checkbutton(pre_row, text=self._t("lbl.preroll"), variable=self.preroll_enabled,
+                             command=self._preroll_apply)
+        cb.pack(side=tk.LEFT, padx=(4, 2))
+        ToolTip(cb, self._t("tip.preroll"))
+        e = ttk.Entry(pre_row, textvariable=self.preroll_seconds, width=4, font=("Consolas", 9))
+        e.pack(side=tk.LEFT)
+        e.bind("<FocusOut>", lambda ev: self._preroll_apply())
+        e.bind("<Return>", lambda ev: self._preroll_apply())
+        ttk.Label(pre_row, text=self._t("lbl.preroll_hotkey")).pack(side=tk.LEFT, padx=(4, 2))
+        e = ttk.Entry(pre_row, textvariable=self.preroll_hotkey, width=6, font=("Consolas", 9))
+        e.pack(side=tk.LEFT)
+        e.bind("<FocusOut>", lambda ev: self._preroll_apply())
+        e.bind("<Return>", lambda ev: self._preroll_apply())
+        ToolTip(e, self._t("tip.preroll_hotkey"))
+        self.preroll_info = ttk.Label(pre_row, text="", font=("Consolas", 8),
+                                      foreground=self.COLORS["text_dim"])
+        self.preroll_info.pack(side=tk.LEFT, padx=8)
 
-        self.rec_status = ttk.Label(rec_tab, text=self._t("status.not_recording"),
+        rec_status_row = ttk.Frame(rec_tab)
+        rec_status_row.pack(fill=tk.X, pady=4)
+        self.rec_status = ttk.Label(rec_status_row, text=self._t("status.not_recording"),
                                      foreground=self.COLORS["text_dim"], font=("Segoe UI", 10))
-        self.rec_status.pack(anchor="w", pady=4)
+        self.rec_status.pack(side=tk.LEFT)
+        cb_fsync = ttk.Checkbutton(rec_status_row, text=self._t("lbl.rec_fsync"),
+                                   variable=self.rec_fsync, command=self._save_config)
+        cb_fsync.pack(side=tk.RIGHT, padx=4)
+        ToolTip(cb_fsync, self._t("tip.rec_fsync"))
 
         rf = ttk.LabelFrame(rec_tab, text=f"  {self._t('macro.recorded_events')}  ", padding=8)
         rf.pack(fill=tk.BOTH, expand=True)
@@ -1109,6 +1311,9 @@ class MouseOpsApp:
         b_rp.pack(side=tk.LEFT, padx=(8, 2))
         b_rs = ttk.Button(rplay, text=self._t("btn.stop_macro"), command=self._stop)
         b_rs.pack(side=tk.LEFT, padx=2)
+        b = ttk.Button(rplay, text=self._t("btn.resume"), command=self._route_resume)
+        b.pack(side=tk.LEFT, padx=2)
+        ToolTip(b, self._t("tip.route_resume"))
 
     # ── Вкладка «Инструменты» ────────────────────────────────────────────────
 
@@ -1180,6 +1385,14 @@ class MouseOpsApp:
                    command=lambda: self._pick_for_var(self.drag_end_x, self.drag_end_y)
                    ).pack(side=tk.LEFT, padx=3)
 
+        drow3 = ttk.Frame(self._drag_container)
+        drow3.pack(fill=tk.X, pady=2)
+        ttk.Label(drow3, text=self._t("tool.drag_duration"), font=("Consolas", 9)).pack(side=tk.LEFT)
+        dur_entry = ttk.Entry(drow3, textvariable=self.drag_duration, width=7,
+                              font=("Consolas", 9))
+        dur_entry.pack(side=tk.LEFT, padx=3)
+        ToolTip(dur_entry, self._t("tip.drag_duration"))
+
         ttk.Button(self._drag_container, text=self._t("btn.test_drag"), command=self._test_drag
                    ).pack(anchor="w", pady=3)
         ToolTip(dd, self._t("tip.drag"))
@@ -1284,6 +1497,15 @@ class MouseOpsApp:
 
         mt = ttk.Frame(hn, padding=12)
         hn.add(mt, text=f"  {self._t('tab.movement')}  ")
+        mm_row = ttk.Frame(mt)
+        mm_row.pack(fill=tk.X, pady=4)
+        mm_lbl = ttk.Label(mm_row, text=self._t("human.motion_model"), width=28, anchor="w",
+                           font=("Segoe UI", 10))
+        mm_lbl.pack(side=tk.LEFT)
+        ToolTip(mm_lbl, self._t("tip.motion_model"))
+        for model in MOTION_MODELS:
+            ttk.Radiobutton(mm_row, text=self._t(f"motion.{model}"), variable=self.motion_model,
+                            value=model, command=self._save_config).pack(side=tk.LEFT, padx=6)
         self._make_slider(mt, self._t("human.curviness"), self.curviness, 1, 10,
                           self._t("human.curviness"))
         self._make_slider(mt, self._t("human.tremor"), self.hand_tremor, 0, 10,
@@ -1315,6 +1537,12 @@ class MouseOpsApp:
                                      font=("Consolas", 10))
         delay_var_entry.pack(fill=tk.X)
         ToolTip(delay_var_entry, self._t("tip.delay_var"))
+        ttk.Label(ct, text=self._t("human.seed"),
+                  style="Section.TLabel").pack(anchor="w", pady=(10, 2))
+        seed_entry = ttk.Entry(ct, textvariable=self.human_seed,
+                               font=("Consolas", 10))
+        seed_entry.pack(fill=tk.X)
+        ToolTip(seed_entry, self._t("tip.human_seed"))
 
         pv = ttk.Frame(hn, padding=12)
         hn.add(pv, text=f"  {self._t('tab.preview')}  ")
@@ -1322,9 +1550,17 @@ class MouseOpsApp:
                                          highlightthickness=1,
                                          highlightbackground=self.COLORS["border"])
         self.preview_canvas.pack(pady=8)
-        preview_btn = ttk.Button(pv, text=self._t("btn.preview"),
+        pv_btns = ttk.Frame(pv)
+        pv_btns.pack(pady=6)
+        preview_btn = ttk.Button(pv_btns, text=self._t("btn.preview"),
                    command=self._preview_trajectory)
-        preview_btn.pack(pady=6)
+        preview_btn.pack(side=tk.LEFT, padx=3)
+        animate_btn = ttk.Button(pv_btns, text=self._t("btn.preview_animate"),
+                   command=self._preview_animate)
+        animate_btn.pack(side=tk.LEFT, padx=3)
+        ToolTip(animate_btn, self._t("tip.preview_animate"))
+        self._preview_pts = []
+        self._preview_anim = None
         self.preview_info = ttk.Label(pv, text=self._t("human.preview_hint"),
                                       font=("Segoe UI", 8),
                                       foreground=self.COLORS["text_dim"])
@@ -1368,6 +1604,7 @@ class MouseOpsApp:
         self.stat_elapsed = tk.StringVar(value="00:00:00")
         self.stat_cps = tk.StringVar(value="0.0")
         self.stat_distance = tk.IntVar(value=0)
+        self.stat_seed = tk.StringVar(value=str(self._session_seed))
         self._session_start = None
         self._last_mouse_pos = None
 
@@ -1377,6 +1614,7 @@ class MouseOpsApp:
             (self._t("stat.elapsed"), self.stat_elapsed),
             (self._t("stat.cps"), self.stat_cps),
             (self._t("stat.distance"), self.stat_distance),
+            (self._t("stat.seed"), self.stat_seed),
         ]:
             row = ttk.Frame(sf)
             row.pack(fill=tk.X, pady=3)
@@ -1620,9 +1858,16 @@ class MouseOpsApp:
         self._save_config()
         return "break"
 
+    def _on_custom_pattern(self, event=None):
+        name = self.custom_pattern_combo.get()
+        if name in self.patterns:
+            self.movement_var.set(name)
+            self._on_movement_change()
+
     def _on_movement_change(self):
         mv = self.movement_var.get()
         is_free = (mv == "free")
+        self.custom_pattern_combo.set(mv if mv in self.user_pattern_names else "")
         # Клик по координатам, Drag & Drop, Маршрут, Имитация — только в режиме «Без движения»
         if not is_free:
             self.fixed_click_enabled.set(False)
@@ -1729,6 +1974,19 @@ class MouseOpsApp:
         self._coord_callback = (var_x, var_y)
         self._show_fullscreen_crosshair()
 
+    @staticmethod
+    def _screen_bounds():
+        """Границы виртуального экрана (все мониторы): (лево, верх, право, низ)"""
+        try:
+            u32 = ctypes.windll.user32
+            x, y = u32.GetSystemMetrics(76), u32.GetSystemMetrics(77)
+            w, h = u32.GetSystemMetrics(78), u32.GetSystemMetrics(79)
+            if w and h:
+                return x, y, x + w, y + h
+            return 0, 0, u32.GetSystemMetrics(0), u32.GetSystemMetrics(1)
+        except Exception:
+            return 0, 0, 1920, 1080
+
     def _show_fullscreen_crosshair(self):
         self._destroy_coord_windows()
         try:
@@ -1980,22 +2238,79 @@ class MouseOpsApp:
 
     def _macro_step_label(self, step):
         t = step.get("type", "?")
+        hold = f" ⏷{step['hold']} мс" if "hold" in step else ""
         if t == "click":
-            return f"🖱 Клик {step.get('button','left').upper()} в ({step.get('x',0)}, {step.get('y',0)})"
+            return f"🖱 Клик {step.get('button','left').upper()} в ({step.get('x',0)}, {step.get('y',0)}){hold}"
         elif t == "key":
-            return f"⌨ Клавиша [{step.get('key','?')}]"
+            return f"⌨ Клавиша [{step.get('key','?')}]{hold}"
+        elif t == "mouse_down":
+            return f"🖱↓ Нажать {step.get('button','left').upper()} в ({step.get('x',0)}, {step.get('y',0)})"
+        elif t == "mouse_up":
+            return f"🖱↑ Отпустить {step.get('button','left').upper()} в ({step.get('x',0)}, {step.get('y',0)})"
+        elif t == "key_down":
+            return f"⌨↓ Нажать [{step.get('key','?')}]"
+        elif t == "key_up":
+            return f"⌨↑ Отпустить [{step.get('key','?')}]"
         elif t == "delay":
             return f"⏱ Пауза {step.get('delay',0)} мс"
         elif t == "move":
             return f"↗ Переместить в ({step.get('x',0)}, {step.get('y',0)})"
         elif t == "drag":
-            return f"🔃 Drag ({step.get('x1',0)},{step.get('y1',0)})→({step.get('x2',0)},{step.get('y2',0)})"
+            dur = f" {step['duration']} мс" if "duration" in step else ""
+            return f"🔃 Drag ({step.get('x1',0)},{step.get('y1',0)})→({step.get('x2',0)},{step.get('y2',0)}){dur}"
+        elif t == "script":
+            lines = [ln for ln in step.get("source", "").splitlines() if ln.strip()]
+            first = lines[0].strip() if lines else ""
+            return f"📜 Сценарий: {first[:40]}{' …' if len(lines) > 1 else ''} ({len(lines)} стр.)"
+        elif t == "curve":
+            return f"〰 Кривая ({step.get('x1',0)},{step.get('y1',0)})→({step.get('x',0)},{step.get('y',0)}) {step.get('duration',0)} мс"
         return f"? {t}"
 
     def _macro_refresh_list(self):
         self.macro_listbox.delete(0, tk.END)
         for i, step in enumerate(self.macro_steps):
-            self.macro_listbox.insert(tk.END, f"{i+1}. {self._macro_step_label(step)}")
+            lane = f"‖{step['lane']} " if step.get("lane") else ""
+            self.macro_listbox.insert(tk.END, f"{i+1}. {lane}{self._macro_step_label(step)}")
+        if len(self._macro_analysis) != len(self.macro_steps):
+            self._macro_analysis.load(self.macro_steps)
+        for i in self._macro_analysis.offscreen():
+            self.macro_listbox.itemconfig(i, foreground=self.COLORS["error"])
+        if self._macro_analysis_job is not None:
+            self.root.after_cancel(self._macro_analysis_job)
+        self._macro_analysis_job = self.root.after(self.MACRO_ANALYSIS_DELAY, self._macro_show_analysis)
+
+    # Задержка сводки анализа после правки (мс): пиковая частота считается
+    # по всем шагам, серия быстрых правок пересчитывает её один раз
+    MACRO_ANALYSIS_DELAY = 150
+
+    def _macro_show_analysis(self):
+        """Сводка статического анализа под списком шагов"""
+        self._macro_analysis_job = None
+        an = self._macro_analysis
+        drag_ms = self._drag_duration_ms()
+        if an.drag_ms != drag_ms:
+            an.drag_ms = drag_ms
+            an.load(self.macro_steps)
+        rep = an.report()
+        if not rep["steps"]:
+            self.macro_analysis_lbl.config(text="")
+            return
+        counts = ", ".join(f"{t} {n}" for t, n in sorted(rep["counts"].items(), key=lambda kv: -kv[1]))
+        text = self._t("macro.analysis").format(
+            dur=rep["duration_ms"] / 1000, events=rep["events"], peak=an.peak_rate(),
+            lanes=len(rep["lanes"]), counts=counts)
+        if rep["dynamic"]:
+            text += " · " + self._t("macro.analysis_dynamic").format(n=rep["dynamic"])
+        if rep["offscreen"]:
+            first = ", ".join(str(i + 1) for i in an.offscreen()[:5])
+            text += " · " + self._t("macro.analysis_offscreen").format(n=rep["offscreen"], first=first)
+        self.macro_analysis_lbl.config(text=text, foreground=self.COLORS[
+            "warning" if rep["offscreen"] else "text_sec"])
+
+    def _macro_append(self, step):
+        self.macro_steps.append(step)
+        self._macro_analysis.append(step)
+        self._macro_refresh_list()
 
     def _macro_add_click(self):
         x, y = self.mouse.position
@@ -2008,20 +2323,17 @@ class MouseOpsApp:
         btn = simpledialog.askstring(self._t("dialog.click_title"), self._t("dialog.button"), initialvalue="left")
         if btn is None:
             return
-        self.macro_steps.append({"type": "click", "x": int(xs), "y": int(ys), "button": btn or "left"})
-        self._macro_refresh_list()
+        self._macro_append({"type": "click", "x": int(xs), "y": int(ys), "button": btn or "left"})
 
     def _macro_add_key(self):
         k = simpledialog.askstring(self._t("dialog.key_title"), self._t("dialog.key_name"), initialvalue="space")
         if k:
-            self.macro_steps.append({"type": "key", "key": k.strip()})
-            self._macro_refresh_list()
+            self._macro_append({"type": "key", "key": k.strip()})
 
     def _macro_add_delay(self):
         d = simpledialog.askstring(self._t("dialog.pause_title"), self._t("dialog.pause_duration"), initialvalue="500")
         if d:
-            self.macro_steps.append({"type": "delay", "delay": int(d)})
-            self._macro_refresh_list()
+            self._macro_append({"type": "delay", "delay": int(d)})
 
     def _macro_add_move(self):
         x, y = self.mouse.position
@@ -2031,8 +2343,7 @@ class MouseOpsApp:
         ys = simpledialog.askstring(self._t("dialog.move_title"), self._t("lbl.y"), initialvalue=str(y))
         if ys is None:
             return
-        self.macro_steps.append({"type": "move", "x": int(xs), "y": int(ys)})
-        self._macro_refresh_list()
+        self._macro_append({"type": "move", "x": int(xs), "y": int(ys)})
 
     def _macro_add_drag(self):
         x, y = self.mouse.position
@@ -2048,15 +2359,62 @@ class MouseOpsApp:
         y2 = simpledialog.askstring(self._t("dialog.drag_end"), "Y2:", initialvalue=str(y))
         if y2 is None:
             return
-        self.macro_steps.append({"type": "drag", "x1": int(x1), "y1": int(y1),
-                                  "x2": int(x2), "y2": int(y2)})
-        self._macro_refresh_list()
+        dur = simpledialog.askstring(self._t("dialog.drag_end"), self._t("dialog.duration_ms"),
+                                     initialvalue=str(self._drag_duration_ms()))
+        if dur is None:
+            return
+        self._macro_append({"type": "drag", "x1": int(x1), "y1": int(y1),
+                            "x2": int(x2), "y2": int(y2),
+                            "duration": int(dur or self._drag_duration_ms())})
+
+    def _macro_add_script(self):
+        source = self._macro_script_dialog()
+        if source is not None:
+            self._macro_append({"type": "script", "source": source})
+
+    def _macro_script_dialog(self, source=""):
+        """Редактор сценария; возвращает текст или None при отмене."""
+        win = tk.Toplevel(self.root)
+        win.title(self._t("dialog.script_title"))
+        win.transient(self.root)
+        win.geometry("560x420")
+        ttk.Label(win, text=self._t("dialog.script_hint"), font=("Segoe UI", 8),
+                  foreground=self.COLORS["text_dim"], wraplength=540, justify=tk.LEFT
+                  ).pack(fill=tk.X, padx=10, pady=(8, 4))
+        text = tk.Text(win, font=("Consolas", 10), wrap=tk.NONE, undo=True, bd=0, relief="flat",
+                       bg="#1a1a2e", fg="#e8e8f0", insertbackground="#e8e8f0",
+                       selectbackground="#7c5cfc", selectforeground="white",
+                       highlightthickness=1, highlightcolor="#2a2a44",
+                       highlightbackground="#2a2a44")
+        text.pack(fill=tk.BOTH, expand=True, padx=10)
+        text.insert("1.0", source)
+        result = {}
+
+        def ok():
+            src = text.get("1.0", tk.END).rstrip()
+            try:
+                parse_script(src)
+            except ValueError as e:
+                messagebox.showerror(self._t("title.error"), str(e), parent=win)
+                return
+            result["source"] = src
+            win.destroy()
+
+        row = ttk.Frame(win)
+        row.pack(fill=tk.X, padx=10, pady=8)
+        ttk.Button(row, text=self._t("btn.cancel"), command=win.destroy).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(row, text="OK", style="Accent.TButton", command=ok).pack(side=tk.RIGHT, padx=2)
+        text.focus_set()
+        win.grab_set()
+        self.root.wait_window(win)
+        return result.get("source")
 
     def _macro_move_up(self):
         sel = self.macro_listbox.curselection()
         if sel and sel[0] > 0:
             i = sel[0]
             self.macro_steps[i], self.macro_steps[i-1] = self.macro_steps[i-1], self.macro_steps[i]
+            self._macro_analysis.swap(i, i-1)
             self._macro_refresh_list()
             self.macro_listbox.selection_set(i-1)
 
@@ -2065,6 +2423,7 @@ class MouseOpsApp:
         if sel and sel[0] < len(self.macro_steps) - 1:
             i = sel[0]
             self.macro_steps[i], self.macro_steps[i+1] = self.macro_steps[i+1], self.macro_steps[i]
+            self._macro_analysis.swap(i, i+1)
             self._macro_refresh_list()
             self.macro_listbox.selection_set(i+1)
 
@@ -2098,16 +2457,41 @@ class MouseOpsApp:
             if ys is None:
                 return
             step["x"], step["y"] = int(xs), int(ys)
+        elif t == "script":
+            source = self._macro_script_dialog(step.get("source", ""))
+            if source is not None:
+                step["source"] = source
+        self._macro_analysis.set(sel[0], step)
         self._macro_refresh_list()
 
+    def _macro_set_lane(self):
+        """Перенести выбранный шаг на дорожку: дорожки играются одновременно."""
+        sel = self.macro_listbox.curselection()
+        if not sel or sel[0] >= len(self.macro_steps):
+            return
+        step = self.macro_steps[sel[0]]
+        lane = simpledialog.askinteger(self._t("dialog.edit_title"), self._t("dialog.lane"),
+                                       initialvalue=step.get("lane", 0), minvalue=0, maxvalue=99)
+        if lane is None:
+            return
+        if lane:
+            step["lane"] = lane
+        else:
+            step.pop("lane", None)
+        self._macro_analysis.set(sel[0], step)
+        self._macro_refresh_list()
+        self.macro_listbox.selection_set(sel[0])
+
     def _macro_delete_step(self):
         sel = self.macro_listbox.curselection()
         if sel and sel[0] < len(self.macro_steps):
             self.macro_steps.pop(sel[0])
+            self._macro_analysis.pop(sel[0])
             self._macro_refresh_list()
 
     def _macro_clear(self):
         self.macro_steps.clear()
+        self._macro_analysis.load(self.macro_steps)
         self._macro_refresh_list()
 
     def _macro_save(self):
@@ -2116,46 +2500,117 @@ class MouseOpsApp:
             name = simpledialog.askstring(self._t("dialog.save_macro_title"), self._t("dialog.macro_name"))
         if not name:
             return
-        self.saved_macros[name] = list(self.macro_steps)
-        self._save_macros()
-        self.macro_name_combo["values"] = list(self.saved_macros.keys())
+        # Оптимизируется копия для хранения: шаги в конструкторе остаются как есть
+        stored = self._macro_optimized(self.macro_steps)
+        if not self._save_macros({name: stored}):
+            return
+        self.macro_name_combo["values"] = self.macro_library.names()
         self.macro_name_combo.set(name)
-        messagebox.showinfo(self._t("title.done"), self._t("msg.macro_saved_detail").format(name=name, n=len(self.macro_steps)))
+        messagebox.showinfo(self._t("title.done"), self._t("msg.macro_saved_detail").format(name=name, n=len(stored)))
 
     def _macro_load_selected(self, event=None):
         name = self.macro_name_combo.get()
-        if name in self.saved_macros:
-            self.macro_steps = list(self.saved_macros[name])
+        if name in self.macro_library:
+            self.macro_steps = list(self._macro_steps_of(name))
+            self._macro_analysis.load(self.macro_steps)
             self._macro_refresh_list()
 
     def _macro_delete_saved(self):
         name = self.macro_name_combo.get()
-        if name and name in self.saved_macros:
+        if name and name in self.macro_library:
             if messagebox.askyesno(self._t("title.delete"), self._t("msg.delete_macro_confirm").format(name=name)):
-                del self.saved_macros[name]
-                self._save_macros()
-                self.macro_name_combo["values"] = list(self.saved_macros.keys())
+                try:
+                    self.macro_library.remove(name)
+                except OSError as e:
+                    messagebox.showerror(self._t("title.error"), str(e))
+                self.macro_name_combo["values"] = self.macro_library.names()
                 self.macro_name_combo.set("")
 
-    def _save_macros(self):
+    def _macro_steps_of(self, name):
+        """Шаги сохранённого макроса; файл макроса читается при первом обращении."""
         try:
-            with open(self.MACROS_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.saved_macros, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
+            return self.macro_library.get(name)
+        except (OSError, KeyError, ValueError, IndexError) as e:
+            self._log_action(f"Не удалось прочитать макрос {name}: {e}")
+            return []
+
+    def _save_macros(self, macros) -> bool:
+        """Записать изменённые макросы {имя: [шаги]}; остальные не трогаются."""
+        try:
+            self.macro_library.put_many(macros)
+            return True
+        except (OSError, ValueError) as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+            return False
 
     def _load_macros(self):
+        """Прочитать индекс библиотеки; шаги читаются при выборе макроса.
+
+        Прежний общий файл (двоичный или старый JSON) один раз переносится в
+        библиотеку и остаётся на месте.
+        """
         try:
-            if os.path.exists(self.MACROS_FILE):
-                with open(self.MACROS_FILE, "r", encoding="utf-8") as f:
-                    self.saved_macros = json.load(f)
-                self.macro_name_combo["values"] = list(self.saved_macros.keys())
-        except Exception:
-            pass
+            if not self.macro_library.open():
+                if binfmt.is_binary(self.MACROS_FILE):
+                    macros = binfmt.load_macros(self.MACROS_FILE)
+                elif os.path.exists(self.LEGACY_MACROS_FILE):
+                    with open(self.LEGACY_MACROS_FILE, "r", encoding="utf-8") as f:
+                        macros = json.load(f)
+                else:
+                    macros = {}
+                if macros:
+                    self.macro_library.put_many(macros)
+                    self._log_action(f"Макросы перенесены в библиотеку: {len(macros)}")
+        except Exception as e:
+            self._log_action(f"Не удалось прочитать библиотеку макросов: {e}")
+        self.macro_name_combo["values"] = self.macro_library.names()
+
+    def _macro_export(self):
+        """Экспорт шагов конструктора в JSON."""
+        if not self.macro_steps:
+            messagebox.showwarning(self._t("title.macro"), self._t("msg.no_steps_warn"))
+            return
+        name = self.macro_name_combo.get().strip() or "macro"
+        p = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON", "*.json")],
+            initialfile=f"{name}.json")
+        if not p:
+            return
+        try:
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump({name: self.macro_steps}, f, indent=2, ensure_ascii=False)
+            messagebox.showinfo(self._t("title.done"), self._t("msg.exported"))
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+
+    def _macro_import(self):
+        """Импорт макросов из JSON ({имя: [шаги]} или [шаги]) или двоичного файла."""
+        p = filedialog.askopenfilename(filetypes=[("JSON", "*.json"), ("Mouse Ops", "*.bin")])
+        if not p:
+            return
+        try:
+            if binfmt.is_binary(p):
+                data = binfmt.load_macros(p)
+            else:
+                with open(p, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            if isinstance(data, list):
+                data = {os.path.splitext(os.path.basename(p))[0]: data}
+            if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+                raise ValueError(self._t("msg.macro_bad_file"))
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+            return
+        if not self._save_macros({str(name): [st for st in steps if isinstance(st, dict) and "type" in st]
+                                  for name, steps in data.items()}):
+            return
+        self.macro_name_combo["values"] = self.macro_library.names()
+        messagebox.showinfo(self._t("title.done"), self._t("msg.macros_imported").format(n=len(data)))
 
     # ── Воспроизведение макроса ────────────────────────────────────────────────
 
-    def _macro_play(self):
+    def _macro_play(self, resume=None):
+        """resume — контрольная точка: повторы, скорость и позиция берутся из неё"""
         if not self.macro_steps:
             messagebox.showwarning(self._t("title.macro"), self._t("msg.no_steps_warn"))
             return
@@ -2163,11 +2618,37 @@ class MouseOpsApp:
             repeats = max(1, int(self.macro_repeats.get() or 1))
         except ValueError:
             repeats = 1
+        try:
+            speed = max(0.1, min(10.0, float(self.macro_speed.get().replace(",", ".") or 1)))
+        except ValueError:
+            speed = 1.0
+        meta = {"kind": "macro", "name": self.macro_name_combo.get().strip(),
+                "repeats": repeats, "speed": speed, "digest": None}
+        if resume is not None:
+            repeats, speed = resume["repeats"], resume["speed"]
+            meta.update(repeats=repeats, speed=speed, digest=resume["digest"])
+        profile = StepProfile(len(self.macro_steps)) if self.macro_profile.get() else None
+        # Метки шагов — номера строк конструктора для профиля и контрольной
+        # точки; с профилировщиком циклы не сворачиваются, чтобы метка была у каждого шага
+        origins = []
+        try:
+            prog = compile_steps(self._macro_optimized(self.macro_steps, origins=origins),
+                                 self._resolve_button, self._resolve_key,
+                                 loops=profile is None, macro_of=self._macro_callee,
+                                 marks=origins)
+        except ValueError as e:
+            messagebox.showerror(self._t("title.macro"), str(e))
+            return
+        offscreen = self._macro_analysis.offscreen()
+        if offscreen:
+            self._log_action(f"Макрос: {len(offscreen)} шаг(ов) за пределами экрана, первый — "
+                             f"№{offscreen[0] + 1}")
 
         self.is_running = True
         self.stop_event.clear()
         self._session_start = time.time()
         self._total_actions_done = 0
+        self._new_session_rng()
         self._tick_stats()
         self._play_sound("start")
 
@@ -2175,46 +2656,198 @@ class MouseOpsApp:
         self.status_dot.config(text=self._t("status.macro"), foreground="#ff6b9d")
         self._update_status_dot("#ff6b9d")
 
-        threading.Thread(target=self._macro_execute, args=(repeats,), daemon=True).start()
+        self._macro_limited = self.action_limit_enabled.get()
+        self._macro_events.clear()
+        self.root.after(self.MACRO_UI_INTERVAL, self._macro_drain_ui)
+        threading.Thread(target=self._macro_execute,
+                         args=(prog, repeats, speed, self._drag_duration_ms(), profile,
+                               meta, list(self.macro_steps), resume),
+                         daemon=True).start()
 
-    def _macro_execute(self, repeats):
-        btn_map = {"left": Button.left, "right": Button.right, "middle": Button.middle}
-        for rep in range(repeats):
-            for step in self.macro_steps:
-                if not self.is_running or self.stop_event.is_set():
-                    break
-                if self._check_action_limit():
-                    break
-                t = step["type"]
-                try:
-                    if t == "click":
-                        self.mouse.position = (step["x"], step["y"])
-                        time.sleep(0.02)
-                        self.mouse.click(btn_map.get(step.get("button", "left"), Button.left))
-                        self._safe_inc(self.stat_clicks)
-                        self._total_actions_done += 1
-                        self._log_action(f"Клик {step.get('button','left')} в ({step['x']}, {step['y']})")
-                    elif t == "key":
-                        self._press_key(step["key"])
-                        self._safe_inc(self.stat_actions)
-                        self._total_actions_done += 1
-                        self._log_action(f"Клавиша [{step['key']}]")
-                    elif t == "delay":
-                        time.sleep(step["delay"] / 1000)
-                    elif t == "move":
-                        self.mouse.position = (step["x"], step["y"])
-                        self._log_action(f"Переместить в ({step['x']}, {step['y']})")
-                    elif t == "drag":
-                        self._do_drag(step["x1"], step["y1"], step["x2"], step["y2"])
-                        self._safe_inc(self.stat_clicks)
-                        self._total_actions_done += 1
-                        self._log_action(f"Drag ({step['x1']},{step['y1']})→({step['x2']},{step['y2']})")
-                except Exception as e:
-                    self._log_action(f"ОШИБКА: {e}")
+    def _macro_resume(self):
+        """Продолжить макрос с контрольной точки (остановка, лимит, сбой)"""
+        if self.is_running:
+            return
+        ck = checkpoint.load(self.MACRO_CHECKPOINT_FILE, "macro")
+        if ck is None:
+            messagebox.showinfo(self._t("title.macro"), self._t("msg.no_checkpoint"))
+            return
+        name = ck.get("name") or ""
+        digest = checkpoint.fingerprint(self.macro_steps)
+        if ck["digest"] != digest and name in self.macro_library:
+            # Точка от сохранённого макроса, а в конструкторе другой — загрузить его
+            steps = list(self._macro_steps_of(name))
+            if checkpoint.fingerprint(steps) == ck["digest"]:
+                self.macro_steps = steps
+                self._macro_analysis.load(steps)
+                self._macro_refresh_list()
+                self.macro_name_combo.set(name)
+                digest = ck["digest"]
+        if ck["digest"] != digest:
+            messagebox.showerror(self._t("title.macro"),
+                                 self._t("msg.checkpoint_mismatch").format(name=name or "—"))
+            return
+        if not messagebox.askyesno(self._t("title.macro"), self._t("msg.resume_macro_confirm").format(
+                name=name or "—", rep=ck["repeat"] + 1, reps=ck["repeats"], step=max(ck["step"], 0) + 1,
+                time=self._fmt(ck["total_ms"] // 1000))):
+            return
+        self._macro_play(resume=ck)
+
+    def _macro_callee(self, name):
+        """Шаги макроса для call в сценарии; None — такого макроса нет"""
+        if name not in self.macro_library:
+            return None
+        return self._macro_optimized(self._macro_steps_of(name), report=False)
+
+    def _macro_optimized(self, steps, report=True, origins=None):
+        """Шаги после оптимизатора; сводка — в строке под конструктором"""
+        out, removed = optimize(steps, origins)
+        if not report:
+            return out
+        self.macro_info.config(text=self._t("status.macro_optimized").format(
+            events=removed, steps=len(steps) - len(out)))
+        return out
+
+    def _macro_execute(self, prog, repeats, speed, drag_ms, profile=None, meta=None, steps=(),
+                       resume=None):
+        """Повторы идут встык по плановой шкале: повтор k начинается ровно
+        в момент конца повтора k−1 по плану, а не когда тот фактически
+        закончился. В конце — сравнение плановой и фактической длительности
+        и, если включён профилировщик, раскраска медленных шагов.
+
+        Позиция раз в checkpoint.INTERVAL сохраняется в контрольную точку;
+        с resume воспроизведение продолжается с неё: повтор перематывается
+        без ввода до сохранённого пробуждения дорожки, и из него пропускаются
+        уже выполненные действия.
+        """
+        vm = MacroVM(self.mouse, self.kb_ctrl, self._tap_key, self._do_drag,
+                     self._macro_on_action, self._macro_on_error, self.stop_event, drag_ms,
+                     rng=self._rng_click, profile=profile)
+        start = due = now_ns()
+        first, seek = 0, None
+        if resume is not None:
+            first = resume["repeat"]
+            elapsed = resume.get("elapsed_ns", resume["elapsed_ms"] * 1_000_000)
+            seek = (elapsed, resume.get("lane", 0), resume.get("acts", 0))
+            vm.regs = list(resume.get("regs", ()))
+            vm.started = start - resume["total_ms"] * 1_000_000
+            due = start - elapsed
+            self._log_action(f"Макрос: продолжение с повтора {first + 1}, "
+                             f"{resume['elapsed_ms'] / 1000:.1f} с от его начала")
+        if meta["digest"] is None:
+            meta["digest"] = checkpoint.fingerprint(steps)
+
+        def position():
+            if vm.at is None:
+                return None
+            rep, step, elapsed, lane, acts, total, regs = vm.at
+            return {"repeat": rep, "step": step, "elapsed_ms": elapsed // 1_000_000,
+                    "elapsed_ns": elapsed, "lane": lane, "acts": acts,
+                    "total_ms": total // 1_000_000, "regs": regs}
+
+        ck = checkpoint.Checkpoint(self.MACRO_CHECKPOINT_FILE, meta, position)
+        done = 0
+        for rep in range(first, repeats):
             if not self.is_running:
                 break
+            vm.repeat = rep
+            due = vm.run(prog, due, speed, seek if rep == first else None)
+            if due is None:
+                break
+            done += 1
+        end = now_ns()
+        self._release_all(vm.held)
+        ck.close(finished=first + done == repeats)
+        if ck.error is not None:
+            self._log_action(f"Контрольная точка не записана: {ck.error}")
+        if due is not None:
+            planned, actual = (due - start) / 1e9, (end - start) / 1e9
+            self._log_action(f"Макрос: {done} повт. ×{speed:g}, план {planned:.3f} с, "
+                             f"факт {actual:.3f} с ({(actual - planned) * 1000:+.1f} мс)")
+            text = self._t("status.macro_done").format(
+                reps=done, planned=planned, actual=actual, drift=(actual - planned) * 1000)
+            self.root.after(0, lambda: self.macro_info.config(text=text))
+        if profile is not None:
+            self.root.after(0, lambda: self._macro_show_profile(profile))
         self.root.after(0, self._stop)
 
+    # Период сброса действий макроса в журнал и счётчики (мс)
+    MACRO_UI_INTERVAL = 100
+
+    def _macro_on_action(self, act, msg):
+        """Учёт действия макроса в потоке воспроизведения; True — достигнут лимит.
+
+        Журнал и счётчики интерфейса обновляются пачкой в _macro_drain_ui,
+        здесь — только дозапись в очередь.
+        """
+        self._total_actions_done += 1
+        self._macro_events.append((time.time(), act, msg))
+        return self._macro_limited and self._check_action_limit()
+
+    def _macro_drain_ui(self):
+        clicks = actions = 0
+        q = self._macro_events
+        while q:
+            ts, act, msg = q.popleft()
+            if act == ACT_CLICK:
+                clicks += 1
+            else:
+                actions += 1
+            if msg is not None:
+                self._log_action(msg, ts)
+        if clicks:
+            self.stat_clicks.set(self.stat_clicks.get() + clicks)
+        if actions:
+            self.stat_actions.set(self.stat_actions.get() + actions)
+        if self.is_running:
+            self.root.after(self.MACRO_UI_INTERVAL, self._macro_drain_ui)
+
+    # Пороги раскраски шагов по среднему slip (мс) — насколько шаг увеличил
+    # отставание от плана — и цвета фона строк
+    PROFILE_HEAT = ((20, "#5a1e2a"), (5, "#4a3d14"))
+
+    def _macro_show_profile(self, profile):
+        """Раскрасить медленные шаги и записать худшие в журнал"""
+        self._macro_profile = profile
+        rows = list(profile.rows())
+        if profile.steps == len(self.macro_steps):
+            for row in rows:
+                for limit, color in self.PROFILE_HEAT:
+                    if row[5] >= limit:
+                        self.macro_listbox.itemconfig(row[0], background=color)
+                        break
+        worst = sorted((r for r in rows if r[5] > 0), key=lambda r: -r[5])[:3]
+        if worst:
+            self._log_action("Профиль макроса, больше всего отставания: " + ", ".join(
+                f"шаг {r[0] + 1} +{r[5]:.1f} мс" for r in worst))
+
+    def _macro_export_profile(self):
+        """Экспорт профиля последнего воспроизведения в CSV"""
+        profile = self._macro_profile
+        if profile is None:
+            messagebox.showwarning(self._t("title.macro"), self._t("msg.no_profile"))
+            return
+        p = filedialog.asksaveasfilename(
+            defaultextension=".csv", filetypes=[("CSV", "*.csv")], initialfile="macro_profile.csv")
+        if not p:
+            return
+        steps = self.macro_steps if profile.steps == len(self.macro_steps) else None
+        try:
+            with open(p, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(("step", "type", "lane", "runs", "planned_ms", "actual_ms", "lag_ms",
+                            "slip_ms", "slip_max_ms", "cost_ms", "cost_max_ms"))
+                for i, n, *times in profile.rows():
+                    step = steps[i] if steps is not None else {}
+                    w.writerow((i + 1, step.get("type", ""), step.get("lane", 0), n,
+                                *(f"{v:.3f}" for v in times)))
+            messagebox.showinfo(self._t("title.done"), self._t("msg.exported"))
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+
+    def _macro_on_error(self, e):
+        self._log_action(f"ОШИБКА: {e}")
+
     def _macro_stop(self):
         self._stop()
 
@@ -2224,80 +2857,763 @@ class MouseOpsApp:
 
     def _rec_start(self):
         self.is_recording = True
-        self.recorded_events.clear()
+        self.rec_buffer.clear()
         self.rec_listbox.delete(0, tk.END)
-        self._rec_start_time = time.time()
+        self._rec_ui_queue.clear()
+        try:
+            hz = max(0, min(1000, int(self.rec_move_hz.get() or 0)))
+        except ValueError:
+            hz = 60
+        # 0 — не записывать перемещения
+        self._rec_move_interval = 1_000_000_000 // hz if hz else None
+        self._rec_last_move = 0
+        try:
+            tol = max(0.0, float(self.rec_tolerance.get() or 0))
+        except ValueError:
+            tol = 2.0
+        # Окно не длиннее REC_PATH_GAP: иначе _rec_to_builder примет промежуток
+        # между сохранёнными точками прямого участка за остановку курсора
+        self._rec_simplifier = PathSimplifier(tol, max_span=self.REC_PATH_GAP * 1_000_000)
+        try:
+            self._rec_journal = JournalWriter(
+                self.JOURNAL_FILE, self.REC_FSYNC_INTERVAL if self.rec_fsync.get() else None)
+        except OSError as e:
+            self._rec_journal = None
+            self._log_action(f"Журнал записи недоступен: {e}")
+        self._rec_start_time = now_ns()
         self.rec_btn.config(state="disabled")
         self.rec_stop_btn.config(state="normal")
         self.rec_status.config(text=self._t("status.recording"), foreground="#ff5c5c")
 
+        self._rec_held.clear()
+        self._rec_stop_requested = False
+        self._rec_rings = (SpscRing(), SpscRing())
+        self._rec_worker_stop.clear()
+        self._rec_worker = threading.Thread(target=self._rec_worker_loop, daemon=True)
+        self._rec_worker.start()
+
         self._rec_mouse_listener = MouseListener(
             on_click=self._rec_on_click, on_move=self._rec_on_move)
         self._rec_mouse_listener.start()
 
-        self._rec_kb_listener = KBListener(on_press=self._rec_on_key)
+        self._rec_kb_listener = KBListener(on_press=self._rec_on_key,
+                                           on_release=self._rec_on_key_release)
         self._rec_kb_listener.start()
+        self._rec_ui_after = self.root.after(self.REC_UI_INTERVAL, self._rec_drain_ui)
 
     def _rec_stop(self):
+        if not self.is_recording:
+            return
         self.is_recording = False
         self.rec_btn.config(state="normal")
         self.rec_stop_btn.config(state="disabled")
-        self.rec_status.config(
-            text=self._t("status.recorded_n").format(n=len(self.recorded_events)), foreground=self.COLORS["text_dim"])
 
+        # Сначала слушатели, затем поток записи: он разберёт всё, что осталось в кольцах
         if self._rec_mouse_listener:
             self._rec_mouse_listener.stop()
             self._rec_mouse_listener = None
         if self._rec_kb_listener:
             self._rec_kb_listener.stop()
             self._rec_kb_listener = None
+        if self._rec_worker:
+            # Без таймаута: последний проход ограничен ёмкостью колец, а после
+            # него буфер и упроститель снова принадлежат только потоку Tk
+            self._rec_worker_stop.set()
+            self._rec_worker.join()
+            self._rec_worker = None
+
+        self._rec_flush_path()
+        # Незакрытые нажатия (например, клик по «Стоп») закрываем сейчас
+        dt = now_ns() - self._rec_start_time
+        x, y = self.mouse.position
+        for what, code in sorted(self._rec_held, key=str):
+            if what == "btn":
+                self._rec_append(dt, EV_BUTTON_UP, x, y, code)
+            else:
+                self._rec_append(dt, EV_KEY_UP, code=self.rec_buffer.intern(code))
+        self._rec_held.clear()
 
-    def _rec_on_click(self, x, y, button, pressed):
-        if not self.is_recording or not pressed:
+        simp = self._rec_simplifier
+        if simp.raw:
+            text = self._t("status.recorded_nc").format(
+                n=len(self.rec_buffer), kept=simp.kept, raw=simp.raw, ratio=f"{simp.ratio:.1f}")
+        else:
+            text = self._t("status.recorded_n").format(n=len(self.rec_buffer))
+        calls = sum(r.pushed for r in self._rec_rings)
+        if calls:
+            avg = sum(r.cost for r in self._rec_rings) / calls / 1000
+            peak = max(r.cost_max for r in self._rec_rings) / 1000
+            text += self._t("status.rec_callback").format(us=f"{avg:.1f}", max=f"{peak:.0f}")
+            self._log_action(f"Запись: колбэков {calls}, в среднем {avg:.1f} мкс, максимум {peak:.0f} мкс")
+        self.rec_status.config(text=text, foreground=self.COLORS["text_dim"])
+
+        if self._rec_ui_after:
+            self.root.after_cancel(self._rec_ui_after)
+        self._rec_drain_ui()
+        if self._rec_journal:
+            journal, self._rec_journal = self._rec_journal, None
+            journal.close()
+            if journal.dropped or journal.error:
+                self._log_action(f"Журнал записи: потеряно {journal.dropped}, ошибка: {journal.error}")
+
+    # Интервал принудительного сброса журнала на диск (сек), если включён
+    REC_FSYNC_INTERVAL = 1.0
+
+    def _rec_recover_journal(self):
+        """Предложить восстановить запись, оборванную сбоем или закрытием окна.
+
+        Журнал разбирается в фоновом потоке: длинная запись читается долго,
+        а окно в это время должно отвечать.
+        """
+        path = self.JOURNAL_FILE
+        if not JournalReader.is_journal(path) or JournalReader.finished(path):
+            return
+        self.rec_status.config(text=self._t("status.recovering"), foreground=self.COLORS["text_dim"])
+
+        def read():
+            reader = JournalReader(path)
+            buf = EventBuffer()
+            try:
+                for ev in reader:
+                    buf.append(*ev)
+            except OSError:
+                buf = EventBuffer()
+            buf.load_names(reader.names)
+            self.root.after(0, self._rec_offer_recovery, path, buf)
+
+        threading.Thread(target=read, daemon=True).start()
+
+    def _rec_offer_recovery(self, path, buf):
+        # Пока журнал читался, могла начаться новая запись — журнал уже её
+        if self.is_recording:
             return
-        dt = int((time.time() - self._rec_start_time) * 1000)
-        btn_name = "left" if button == Button.left else "right" if button == Button.right else "middle"
-        ev = {"type": "click", "x": x, "y": y, "button": btn_name, "time_ms": dt}
-        self.recorded_events.append(ev)
-        self.root.after(0, lambda: self.rec_listbox.insert(
-            tk.END, f"[{dt:>6}ms] 🖱 {btn_name} ({x}, {y})"))
+        self.rec_status.config(text="")
+        if not len(buf):
+            return
+        if not messagebox.askyesno(self._t("title.recover"),
+                                   self._t("msg.recover_journal").format(n=len(buf))):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return
+        # Восстановленный журнал больше не предлагается; копия остаётся рядом,
+        # пока запись не сохранена
+        try:
+            os.replace(path, path + ".recovered")
+        except OSError as e:
+            self._log_action(f"Журнал записи не переименован: {e}")
+        self._rec_show_buffer(buf)
+        self.rec_status.config(text=self._t("status.recovered").format(n=len(buf)),
+                               foreground=self.COLORS["text_dim"])
+        self._log_action(f"Восстановлено событий записи: {len(buf)}")
+
+    def _rec_show_buffer(self, buf):
+        """Сделать buf текущей записью и показать её клики и клавиши в списке."""
+        self.rec_buffer = buf
+        self.rec_listbox.delete(0, tk.END)
+        for t, kind, x, y, code in buf:
+            if kind == EV_CLICK or kind == EV_BUTTON_UP:
+                arrow = " ↑" if kind == EV_BUTTON_UP else ""
+                self._rec_ui_queue.append(f"[{t // 1_000_000:>6}ms] 🖱 {BUTTONS[code]}{arrow} ({x}, {y})")
+            elif kind == EV_KEY or kind == EV_KEY_UP:
+                arrow = " ↑" if kind == EV_KEY_UP else ""
+                self._rec_ui_queue.append(f"[{t // 1_000_000:>6}ms] ⌨ [{buf.name(code)}]{arrow}")
+        self._rec_drain_ui()
+
+    def _rec_save(self):
+        if self.is_recording:
+            return
+        if not len(self.rec_buffer):
+            messagebox.showinfo(self._t("title.empty"), self._t("msg.no_events_info"))
+            return
+        p = filedialog.asksaveasfilename(
+            defaultextension=".bin", filetypes=[("Mouse Ops", "*.bin")],
+            initialfile="recording.bin")
+        if not p:
+            return
+        try:
+            binfmt.save_recording(p, self.rec_buffer)
+            messagebox.showinfo(self._t("title.done"), self._t("msg.exported"))
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+
+    def _rec_open(self):
+        if self.is_recording:
+            return
+        p = filedialog.askopenfilename(filetypes=[("Mouse Ops", "*.bin")])
+        if not p:
+            return
+        buf = EventBuffer()
+        try:
+            n = binfmt.load_recording(p, buf)
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+            return
+        self._rec_show_buffer(buf)
+        self.rec_status.config(text=self._t("status.recorded_n").format(n=n),
+                               foreground=self.COLORS["text_dim"])
+
+    def _rec_process(self):
+        """Пропустить запись через этапы обработки (обрезка пауз, дубли, скорость, отрезок)."""
+        if self.is_recording or self.is_running:
+            return
+        if not len(self.rec_buffer):
+            messagebox.showinfo(self._t("title.empty"), self._t("msg.no_events_info"))
+            return
+
+        def num(var):
+            v = var.get().strip().replace(",", ".")
+            return float(v) if v else None
+
+        try:
+            trim, dedupe, speed = num(self.rec_trim_idle), num(self.rec_dedupe), num(self.rec_speed)
+            a, b = num(self.rec_crop_from), num(self.rec_crop_to)
+            if trim is not None and not trim > 0:
+                raise ValueError(self._t("lbl.rec_trim_idle"))
+            src = self.rec_buffer
+            stages = build_stages(trim, dedupe, speed or 1.0,
+                                  (a or 0.0, b) if a is not None or b is not None else None,
+                                  src.has_releases())
+            if speed is not None and speed <= 0:
+                raise ValueError(self._t("lbl.rec_speed"))
+        except ValueError as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+            return
+        if not stages:
+            return
+        out = EventBuffer()
+        for ev in chain(src, *stages):
+            out.append(*ev)
+        out.load_names(src.names)
+        n_before = len(src)
+        self._rec_show_buffer(out)
+        self.rec_crop_from.set("")
+        self.rec_crop_to.set("")
+        self.rec_status.config(text=self._t("status.rec_processed").format(before=n_before, after=len(out)),
+                               foreground=self.COLORS["text_dim"])
+
+    # Частота обновления списка записи (мс) и предел строк в нём
+    REC_UI_INTERVAL = 50
+    REC_LIST_MAX = 1000
+
+    def _rec_drain_ui(self):
+        """Перенести накопленные строки в список одной вставкой.
+
+        Колбэки слушателей только кладут строки в очередь — так быстрый ввод
+        не заваливает очередь событий Tk. Пока идёт запись, метод сам
+        перепланирует себя; в списке остаются последние REC_LIST_MAX строк.
+        """
+        q = self._rec_ui_queue
+        batch = [q.popleft() for _ in range(len(q))]
+        if batch:
+            lb = self.rec_listbox
+            lb.insert(tk.END, *batch[-self.REC_LIST_MAX:])
+            extra = lb.size() - self.REC_LIST_MAX
+            if extra > 0:
+                lb.delete(0, extra - 1)
+            lb.see(tk.END)
+        self._rec_ui_after = None
+        if self.is_recording and self._rec_stop_requested:
+            self._rec_stop()
+        elif self.is_recording:
+            self._rec_ui_after = self.root.after(self.REC_UI_INTERVAL, self._rec_drain_ui)
+
+    # ── Колбэки слушателей: только метка времени и кортеж в кольцо ──
+
+    def _rec_on_click(self, x, y, button, pressed):
+        t = now_ns()
+        ring = self._rec_rings[0]
+        ring.push((t, EV_CLICK if pressed else EV_BUTTON_UP, x, y, button))
+        d = now_ns() - t
+        ring.cost += d
+        if d > ring.cost_max:
+            ring.cost_max = d
 
     def _rec_on_move(self, x, y):
-        pass  # не записываем каждое перемещение (слишком много)
+        t = now_ns()
+        ring = self._rec_rings[0]
+        ring.push((t, EV_MOVE, x, y, None))
+        d = now_ns() - t
+        ring.cost += d
+        if d > ring.cost_max:
+            ring.cost_max = d
 
     def _rec_on_key(self, key):
-        if not self.is_recording:
+        t = now_ns()
+        ring = self._rec_rings[1]
+        ring.push((t, EV_KEY, 0, 0, key))
+        d = now_ns() - t
+        ring.cost += d
+        if d > ring.cost_max:
+            ring.cost_max = d
+
+    def _rec_on_key_release(self, key):
+        t = now_ns()
+        ring = self._rec_rings[1]
+        ring.push((t, EV_KEY_UP, 0, 0, key))
+        d = now_ns() - t
+        ring.cost += d
+        if d > ring.cost_max:
+            ring.cost_max = d
+
+    # ── Поток записи ──
+
+    # Период разбора колец и запас времени, за который события обоих
+    # слушателей гарантированно уже лежат в кольцах (нс)
+    REC_WORKER_INTERVAL = 0.005
+    REC_WATERMARK_NS = 3_000_000
+
+    def _rec_worker_loop(self):
+        """Разбирать кольца мыши и клавиатуры и обрабатывать события по времени.
+
+        У каждого слушателя своё кольцо, поэтому события двух колец
+        сливаются сортировкой. Обрабатываются только события старше
+        REC_WATERMARK_NS: более свежие могут ещё догнать их из другого
+        кольца. При остановке разбирается всё.
+        """
+        pending = []
+        rings = self._rec_rings
+        while True:
+            final = self._rec_worker_stop.wait(self.REC_WORKER_INTERVAL)
+            for ring in rings:
+                ring.drain(pending.append)
+            if pending:
+                pending.sort(key=lambda ev: ev[0])
+                if final:
+                    ready, pending = pending, []
+                else:
+                    mark = now_ns() - self.REC_WATERMARK_NS
+                    i = len(pending)
+                    while i and pending[i - 1][0] > mark:
+                        i -= 1
+                    ready, pending = pending[:i], pending[i:]
+                for ev in ready:
+                    try:
+                        self._rec_handle(*ev)
+                    except Exception as e:
+                        self._log_action(f"ОШИБКА записи: {e}")
+            if final:
+                return
+
+    def _rec_handle(self, t, kind, x, y, payload):
+        """Обработать одно событие из кольца (только в потоке записи)."""
+        dt = t - self._rec_start_time
+        if kind == EV_MOVE:
+            # Перемещения прореживаются до заданной частоты и упрощаются на лету
+            if self._rec_move_interval is None or t - self._rec_last_move < self._rec_move_interval:
+                return
+            self._rec_last_move = t
+            p = self._rec_simplifier.push(dt, x, y)
+            if p:
+                self._rec_append(p[0], EV_MOVE, p[1], p[2])
+        elif kind == EV_CLICK or kind == EV_BUTTON_UP:
+            # Нажатие и отпускание — отдельные события: так сохраняются
+            # длительность удержания и перетаскивания
+            code = 0 if payload == Button.left else 1 if payload == Button.right else 2
+            held = ("btn", code)
+            if kind == EV_CLICK:
+                self._rec_held.add(held)
+            elif held in self._rec_held:
+                self._rec_held.discard(held)
+            else:
+                return  # отпускание кнопки, нажатой до начала записи
+            self._rec_flush_path()
+            self._rec_append(dt, kind, x, y, code)
+            arrow = "" if kind == EV_CLICK else " ↑"
+            self._rec_ui_queue.append(f"[{dt // 1_000_000:>6}ms] 🖱 {BUTTONS[code]}{arrow} ({x}, {y})")
+        else:
+            k = self._rec_key_name(payload)
+            held = ("key", k)
+            if kind == EV_KEY:
+                # Не записываем Escape (используется для стопа)
+                # Остановку выполнит _rec_drain_ui в потоке Tk: отсюда нельзя
+                # ждать Tk, пока он сам ждёт завершения этого потока
+                if k == 'escape':
+                    self._rec_stop_requested = True
+                    return
+                # Автоповтор удерживаемой клавиши — не новое нажатие
+                if held in self._rec_held:
+                    return
+                self._rec_held.add(held)
+            elif held in self._rec_held:
+                self._rec_held.discard(held)
+            else:
+                return  # клавиша была нажата до начала записи
+            self._rec_flush_path()
+            code = self.rec_buffer.intern(k)
+            if self._rec_journal:
+                # Таблица имён буфера общая для записей, а журнал у каждой свой
+                self._rec_journal.define(code, k)
+            self._rec_append(dt, kind, code=code)
+            arrow = "" if kind == EV_KEY else " ↑"
+            self._rec_ui_queue.append(f"[{dt // 1_000_000:>6}ms] ⌨ [{k}]{arrow}")
+
+    def _rec_flush_path(self):
+        """Дописать конец текущего участка пути."""
+        p = self._rec_simplifier.flush()
+        if p:
+            self._rec_append(p[0], EV_MOVE, p[1], p[2])
+
+    def _rec_append(self, t, kind, x=0, y=0, code=0):
+        """Событие — в буфер и в журнал на диске."""
+        self.rec_buffer.append(t, kind, x, y, code)
+        if self._rec_journal:
+            self._rec_journal.put(t, kind, x, y, code)
+
+    @staticmethod
+    def _rec_key_name(key):
+        try:
+            return key.char if hasattr(key, 'char') and key.char else key.name
+        except Exception:
+            return str(key)
+
+    # Запас перед первым событием повтора, чтобы учёт задержки не ушёл в прошлое
+    REPLAY_LEAD_NS = 50_000_000
+
+    def _rec_replay(self):
+        """Повторить запись с исходными таймингами (без перевода в конструктор)."""
+        if self.is_recording or self.is_running:
+            return
+        if not len(self.rec_buffer):
+            messagebox.showinfo(self._t("title.empty"), self._t("msg.no_events_info"))
+            return
+        self.is_running = True
+        self.stop_event.clear()
+        self._session_start = time.time()
+        self._total_actions_done = 0
+        self._tick_stats()
+        self._play_sound("start")
+        self.start_btn.config(text=self._t("btn.stop"))
+        self.status_dot.config(text=self._t("status.macro"), foreground="#ff6b9d")
+        self._update_status_dot("#ff6b9d")
+        threading.Thread(target=self._rec_replay_execute, daemon=True).start()
+
+    def _rec_replay_execute(self):
+        """Воспроизведение по абсолютной шкале времени.
+
+        Каждое событие планируется на момент начало + t, а не «после
+        предыдущего», так что ошибки не складываются. Вызов впрыска
+        начинается раньше на измеренную задержку своего типа события, чтобы
+        событие дошло до системы к плановому моменту. Отклонения момента
+        завершения от плана собираются и показываются после повтора.
+        """
+        mouse = self.mouse
+        kb = self.kb_ctrl
+        buf = self.rec_buffer
+        btn_map = (Button.left, Button.right, Button.middle)
+        # Записи без отпусканий (старый формат) повторяются кликами
+        edges = buf.has_releases()
+        held = set()
+
+        def move(x, y):
+            mouse.position = (x, y)
+
+        def click(x, y, code):
+            mouse.position = (x, y)
+            mouse.click(btn_map[code])
+
+        def press(x, y, code):
+            mouse.position = (x, y)
+            mouse.press(btn_map[code])
+            held.add(btn_map[code])
+
+        def release(x, y, code):
+            mouse.position = (x, y)
+            mouse.release(btn_map[code])
+            held.discard(btn_map[code])
+
+        keys = {}
+
+        def key_down(code):
+            key = keys.get(code) or keys.setdefault(code, self._resolve_key(buf.name(code)))
+            kb.press(key)
+            held.add(key)
+
+        def key_up(code):
+            key = keys.get(code) or keys.setdefault(code, self._resolve_key(buf.name(code)))
+            kb.release(key)
+            held.discard(key)
+
+        latency = {kind: LatencyMeter()
+                   for kind in (EV_MOVE, EV_CLICK, EV_KEY, EV_BUTTON_UP, EV_KEY_UP)}
+        stats = TimingStats()
+        start = first = None
+        try:
+            for t, kind, x, y, code in buf:
+                if start is None:
+                    start, first = now_ns() + self.REPLAY_LEAD_NS, t
+                planned = start + t - first
+                meter = latency[kind]
+                if not sleep_until_ns(planned - meter.estimate, self.stop_event):
+                    break
+                if kind == EV_MOVE:
+                    done = meter.call(move, x, y)
+                elif kind == EV_CLICK:
+                    done = meter.call(press if edges else click, x, y, code)
+                    self._safe_inc(self.stat_clicks)
+                    self._total_actions_done += 1
+                elif kind == EV_BUTTON_UP:
+                    done = meter.call(release, x, y, code)
+                elif kind == EV_KEY:
+                    if edges:
+                        done = meter.call(key_down, code)
+                    else:
+                        done = meter.call(self._press_key, buf.name(code))
+                    self._safe_inc(self.stat_actions)
+                    self._total_actions_done += 1
+                else:
+                    done = meter.call(key_up, code)
+                stats.add(planned, done)
+        except Exception as e:
+            self._log_action(f"ОШИБКА: {e}")
+        finally:
+            self._release_all(held)
+        s = stats.summary()
+        self._log_action(f"Повтор записи: {s['n']} событий, отклонение "
+                         f"ср. {s['mean']:+.2f} мс, p95 {s['p95']:.2f} мс, макс {s['max']:.2f} мс")
+        text = self._t("status.replay_done").format(**s)
+        self.root.after(0, lambda: self.rec_status.config(text=text, foreground=self.COLORS["text_dim"]))
+        self.root.after(0, self._stop)
+
+    # ══════════════════════════════════════════════════════════════════════════
+    #                   ПРЕДЗАПИСЬ
+    # ══════════════════════════════════════════════════════════════════════════
+
+    # Запас ёмкости кольца на клики и клавиши сверх частоты перемещений (событий/с)
+    PREROLL_EXTRA_RATE = 40
+
+    def _preroll_apply(self):
+        """Включить/выключить постоянную предзапись по текущим настройкам."""
+        try:
+            seconds = max(1, min(3600, int(self.preroll_seconds.get() or 30)))
+        except ValueError:
+            seconds = 30
+        try:
+            self._preroll_key = (self._resolve_key(self.preroll_hotkey.get().strip())
+                                 if self.preroll_enabled.get() and self.preroll_hotkey.get().strip() else None)
+        except Exception:
+            self._preroll_key = None
+        try:
+            hz = max(0, min(1000, int(self.rec_move_hz.get() or 0)))
+        except ValueError:
+            hz = 60
+        window = seconds * 1_000_000_000
+        interval = 1_000_000_000 // hz if hz else None
+        running = bool(self._preroll_listeners)
+        if (running and self.preroll_enabled.get() and window == self._preroll_window
+                and interval == self._preroll_move_interval):
+            return
+        self._preroll_stop()
+        if not self.preroll_enabled.get():
+            return
+        # Ёмкость по максимальной частоте событий: память ограничена ~19 байт × ёмкость
+        self._preroll_buf = EventBuffer(seconds * (hz + self.PREROLL_EXTRA_RATE))
+        self._preroll_window = window
+        self._preroll_move_interval = interval
+        self._preroll_cost = self._preroll_calls = 0
+        self._preroll_started = now_ns()
+        self._preroll_held.clear()
+        self._preroll_listeners = [
+            MouseListener(on_click=self._preroll_on_click, on_move=self._preroll_on_move),
+            KBListener(on_press=self._preroll_on_key, on_release=self._preroll_on_key_release),
+        ]
+        for listener in self._preroll_listeners:
+            listener.daemon = True
+            listener.start()
+        self._preroll_tick()
+
+    def _preroll_stop(self):
+        for listener in self._preroll_listeners:
+            try:
+                listener.stop()
+            except Exception:
+                pass
+        self._preroll_listeners = []
+        try:
+            self.preroll_info.config(text="")
+        except Exception:
+            pass
+
+    def _preroll_tick(self):
+        """Раз в 2 с показывать объём кольца и цену колбэков."""
+        if not self._preroll_listeners:
             return
-        dt = int((time.time() - self._rec_start_time) * 1000)
+        calls = self._preroll_calls
+        per_call = self._preroll_cost / calls / 1000 if calls else 0.0
+        elapsed = max(1, now_ns() - self._preroll_started)
+        cpu = self._preroll_cost / elapsed * 100
         try:
-            k = key.char if hasattr(key, 'char') and key.char else key.name
+            self.preroll_info.config(text=self._t("status.preroll").format(
+                n=len(self._preroll_buf), us=f"{per_call:.1f}", cpu=f"{cpu:.3f}"))
         except Exception:
-            k = str(key)
-        # Не записываем Escape (используется для стопа)
-        if k == 'escape':
-            self.root.after(0, self._rec_stop)
+            pass
+        self.root.after(2000, self._preroll_tick)
+
+    def _preroll_on_move(self, x, y):
+        t = now_ns()
+        interval = self._preroll_move_interval
+        if interval is not None and t - self._preroll_last_move >= interval:
+            self._preroll_last_move = t
+            with self._preroll_lock:
+                self._preroll_buf.append(t, EV_MOVE, x, y)
+        self._preroll_cost += now_ns() - t
+        self._preroll_calls += 1
+
+    def _preroll_on_click(self, x, y, button, pressed):
+        t = now_ns()
+        code = 0 if button == Button.left else 1 if button == Button.right else 2
+        with self._preroll_lock:
+            self._preroll_buf.append(t, EV_CLICK if pressed else EV_BUTTON_UP, x, y, code)
+        self._preroll_cost += now_ns() - t
+        self._preroll_calls += 1
+
+    def _preroll_on_key(self, key):
+        t = now_ns()
+        if key != self._preroll_key:
+            k = self._rec_key_name(key)
+            if k not in self._preroll_held:
+                self._preroll_held.add(k)
+                with self._preroll_lock:
+                    buf = self._preroll_buf
+                    buf.append(t, EV_KEY, code=buf.intern(k))
+        self._preroll_cost += now_ns() - t
+        self._preroll_calls += 1
+
+    def _preroll_on_key_release(self, key):
+        t = now_ns()
+        k = self._rec_key_name(key)
+        if k in self._preroll_held:
+            self._preroll_held.discard(k)
+            with self._preroll_lock:
+                buf = self._preroll_buf
+                buf.append(t, EV_KEY_UP, code=buf.intern(k))
+        self._preroll_cost += now_ns() - t
+        self._preroll_calls += 1
+
+    def _preroll_save(self):
+        """Сохранить последние N секунд предзаписи как текущую запись."""
+        if not self._preroll_listeners or self.is_recording:
             return
-        ev = {"type": "key", "key": k, "time_ms": dt}
-        self.recorded_events.append(ev)
-        self.root.after(0, lambda: self.rec_listbox.insert(
-            tk.END, f"[{dt:>6}ms] ⌨ [{k}]"))
+        start = now_ns() - self._preroll_window
+        # Под замком — только копия колонок: колбэки хуков ждут этот замок
+        with self._preroll_lock:
+            src = self._preroll_buf.copy()
+        out = EventBuffer()
+        # crop отбрасывает отпускания без нажатий в окне и закрывает незавершённые
+        for ev in crop(src.since(start), start):
+            out.append(*ev)
+        out.load_names(src.names)
+        self._rec_show_buffer(out)
+        secs = self._preroll_window // 1_000_000_000
+        self.rec_status.config(text=self._t("status.preroll_saved").format(n=len(out), s=secs),
+                               foreground=self.COLORS["text_dim"])
+        self._log_action(f"Предзапись: сохранены последние {secs} с, событий: {len(out)}")
+        self._play_sound("start")
+
+    # Пауза в движении (мс), после которой путь режется на отдельные участки
+    REC_PATH_GAP = 100
 
     def _rec_to_builder(self):
-        if not self.recorded_events:
+        if not len(self.rec_buffer):
             messagebox.showinfo(self._t("title.empty"), self._t("msg.no_events_info"))
             return
         self.macro_steps.clear()
+        try:
+            tol = max(1.0, float(self.rec_tolerance.get() or 0))
+        except ValueError:
+            tol = 2.0
         prev_time = 0
-        for ev in self.recorded_events:
-            dt = ev.get("time_ms", 0) - prev_time
-            if dt > 50:
-                self.macro_steps.append({"type": "delay", "delay": dt})
-            if ev["type"] == "click":
-                self.macro_steps.append({"type": "click", "x": ev["x"], "y": ev["y"],
-                                          "button": ev.get("button", "left")})
-            elif ev["type"] == "key":
-                self.macro_steps.append({"type": "key", "key": ev["key"]})
-            prev_time = ev.get("time_ms", 0)
+        run = []
+        gap = self.REC_PATH_GAP * 1_000_000
+
+        def ms(t_ns):
+            # Метки округляются от начала записи, поэтому ошибка не накапливается
+            return (t_ns + 500_000) // 1_000_000
+
+        def delay_to(t_ns):
+            d = ms(t_ns) - ms(prev_time)
+            if d > 0:
+                self.macro_steps.append({"type": "delay", "delay": d})
+
+        def flush_run():
+            # Участок пути между кликами/клавишами → несколько кривых Безье
+            nonlocal prev_time
+            if not run:
+                return
+            delay_to(run[0][0])
+            segs = fit_cubic(run, tol)
+            if not segs:
+                self.macro_steps.append({"type": "move", "x": run[-1][1], "y": run[-1][2]})
+            for t0, t1, p0, c1, c2, p3 in segs:
+                self.macro_steps.append({"type": "curve", "x1": p0[0], "y1": p0[1],
+                                         "cx1": c1[0], "cy1": c1[1], "cx2": c2[0], "cy2": c2[1],
+                                         "x": p3[0], "y": p3[1], "duration": ms(t1) - ms(t0)})
+            prev_time = run[-1][0]
+            run.clear()
+
+        buf = self.rec_buffer
+        edges = buf.has_releases()
+        # Нажатие, ждущее своего отпускания: если между ними ничего не было,
+        # пара становится одним кликом/клавишей с длительностью удержания
+        pending = None
+
+        def flush_pending():
+            nonlocal pending, prev_time
+            if pending is None:
+                return
+            t, kind, x, y, code = pending
+            delay_to(t)
+            if kind == EV_CLICK:
+                self.macro_steps.append({"type": "mouse_down", "x": x, "y": y,
+                                         "button": BUTTONS[code]})
+            else:
+                self.macro_steps.append({"type": "key_down", "key": buf.name(code)})
+            prev_time = t
+            pending = None
+
+        for ev in buf:
+            t, kind, x, y, code = ev
+            if kind == EV_MOVE:
+                flush_pending()
+                # Курсор стоял дольше REC_PATH_GAP — пауза, а не медленная кривая
+                if run and t - run[-1][0] > gap:
+                    flush_run()
+                run.append((t, x, y))
+                continue
+            flush_run()
+            if pending is not None:
+                pt, pkind, px, py, pcode = pending
+                if code == pcode and (pkind, kind) in ((EV_CLICK, EV_BUTTON_UP), (EV_KEY, EV_KEY_UP)):
+                    delay_to(pt)
+                    hold = ms(t) - ms(pt)
+                    if pkind == EV_CLICK:
+                        self.macro_steps.append({"type": "click", "x": px, "y": py,
+                                                 "button": BUTTONS[pcode], "hold": hold})
+                    else:
+                        self.macro_steps.append({"type": "key", "key": buf.name(pcode), "hold": hold})
+                    pending = None
+                    prev_time = t
+                    continue
+                flush_pending()
+            if edges and (kind == EV_CLICK or kind == EV_KEY):
+                pending = ev
+                continue
+            delay_to(t)
+            if kind == EV_CLICK:
+                self.macro_steps.append({"type": "click", "x": x, "y": y,
+                                          "button": BUTTONS[code]})
+            elif kind == EV_KEY:
+                self.macro_steps.append({"type": "key", "key": buf.name(code)})
+            elif kind == EV_BUTTON_UP:
+                self.macro_steps.append({"type": "mouse_up", "x": x, "y": y,
+                                         "button": BUTTONS[code]})
+            elif kind == EV_KEY_UP:
+                self.macro_steps.append({"type": "key_up", "key": buf.name(code)})
+            prev_time = t
+        flush_pending()
+        flush_run()
+        self._macro_analysis.load(self.macro_steps)
         self._macro_refresh_list()
         messagebox.showinfo(self._t("title.done"), self._t("msg.rec_converted_detail").format(n=len(self.macro_steps)))
 
@@ -2357,7 +3673,7 @@ class MouseOpsApp:
         self.route_points.clear()
         self._route_refresh()
 
-    def _route_play(self):
+    def _route_play(self, resume=None):
         if not self.route_points:
             messagebox.showwarning(self._t("title.route"), self._t("msg.no_points_warn"))
             return
@@ -2365,6 +3681,8 @@ class MouseOpsApp:
             repeats = max(1, int(self.route_repeats.get() or 1))
         except ValueError:
             repeats = 1
+        if resume is not None:
+            repeats = resume["repeats"]
 
         self.is_running = True
         self.stop_event.clear()
@@ -2376,14 +3694,52 @@ class MouseOpsApp:
         self.status_dot.config(text=self._t("status.route"), foreground="#7c5cfc")
         self._update_status_dot("#7c5cfc")
 
-        threading.Thread(target=self._route_execute, args=(repeats,), daemon=True).start()
+        threading.Thread(target=self._route_execute, args=(repeats, list(self.route_points), resume),
+                         daemon=True).start()
 
-    def _route_execute(self, repeats):
-        for rep in range(repeats):
-            for pt in self.route_points:
-                if not self.is_running or self.stop_event.is_set():
-                    break
-                if self._check_action_limit():
+    def _route_resume(self):
+        """Продолжить маршрут с контрольной точки"""
+        if self.is_running:
+            return
+        ck = checkpoint.load(self.ROUTE_CHECKPOINT_FILE, "route")
+        if ck is None:
+            messagebox.showinfo(self._t("title.route"), self._t("msg.no_checkpoint"))
+            return
+        if ck["digest"] != checkpoint.fingerprint(self.route_points):
+            messagebox.showerror(self._t("title.route"), self._t("msg.route_checkpoint_mismatch"))
+            return
+        if not messagebox.askyesno(self._t("title.route"), self._t("msg.resume_route_confirm").format(
+                rep=ck["repeat"] + 1, reps=ck["repeats"], step=ck["step"] + 1,
+                time=self._fmt(ck["total_ms"] // 1000))):
+            return
+        self._route_play(resume=ck)
+
+    def _route_execute(self, repeats, points=None, resume=None):
+        """Точки по порядку; позиция (повтор, следующая точка) идёт в
+        контрольную точку, с resume — продолжение с неё."""
+        points = points if points is not None else list(self.route_points)
+        t0 = time.monotonic()
+        first, skip, total0 = 0, 0, 0
+        if resume is not None:
+            first, skip, total0 = resume["repeat"], resume["step"], resume["total_ms"]
+        at = None
+
+        def position():
+            if at is None:
+                return None
+            rep, nxt, total = at
+            return {"repeat": rep, "step": nxt, "elapsed_ms": 0, "total_ms": total}
+
+        ck = checkpoint.Checkpoint(self.ROUTE_CHECKPOINT_FILE,
+                                   {"kind": "route", "repeats": repeats,
+                                    "digest": checkpoint.fingerprint(points)}, position)
+        stopped = False
+        for rep in range(first, repeats):
+            for i, pt in enumerate(points):
+                if rep == first and i < skip:
+                    continue
+                if not self.is_running or self.stop_event.is_set() or self._check_action_limit():
+                    stopped = True
                     break
                 self.mouse.position = (pt["x"], pt["y"])
                 time.sleep(0.03)
@@ -2392,9 +3748,12 @@ class MouseOpsApp:
                     self._safe_inc(self.stat_clicks)
                     self._total_actions_done += 1
                     self._log_action(f"Маршрут: клик в ({pt['x']}, {pt['y']})")
+                total = total0 + int((time.monotonic() - t0) * 1000)
+                at = (rep, i + 1, total) if i + 1 < len(points) else (rep + 1, 0, total)
                 time.sleep(pt.get("delay", 500) / 1000)
-            if not self.is_running:
+            if stopped:
                 break
+        ck.close(finished=not stopped)
         self.root.after(0, self._stop)
 
     # ══════════════════════════════════════════════════════════════════════════
@@ -2403,17 +3762,28 @@ class MouseOpsApp:
 
     # ── Drag & Drop ──
 
-    def _do_drag(self, x1, y1, x2, y2):
-        """Перетащить: зажать ЛКМ в (x1,y1), переместить в (x2,y2), отпустить."""
+    def _drag_duration_ms(self):
+        try:
+            return max(10, min(60000, int(self.drag_duration.get() or 300)))
+        except ValueError:
+            return 300
+
+    def _do_drag(self, x1, y1, x2, y2, duration_ms=None):
+        """Перетащить: зажать ЛКМ в (x1,y1), провести до (x2,y2) за duration_ms, отпустить.
+
+        Точки идут потоком из движка траекторий: время перетаскивания задаётся
+        длительностью, а не числом шагов, память не зависит от дистанции.
+        """
+        if duration_ms is None:
+            duration_ms = self._drag_duration_ms()
         self.mouse.position = (x1, y1)
         time.sleep(0.05)
         self.mouse.press(Button.left)
-        steps = max(10, int(math.hypot(x2 - x1, y2 - y1) / 5))
-        for i in range(1, steps + 1):
-            t = i / steps
-            self.mouse.position = (int(x1 + (x2 - x1) * t), int(y1 + (y2 - y1) * t))
-            time.sleep(0.01)
-        self.mouse.release(Button.left)
+        try:
+            for x, y in self._motion.stream(x1, y1, x2, y2, duration_ms / 1000):
+                self.mouse.position = (x, y)
+        finally:
+            self.mouse.release(Button.left)
 
     def _test_drag(self):
         try:
@@ -2435,25 +3805,25 @@ class MouseOpsApp:
             interval = 30
         keys = ['w', 'a', 's', 'd', 'space']
         while self.is_running and not self.stop_event.is_set():
-            time.sleep(interval * random.uniform(0.7, 1.3))
+            time.sleep(interval * self._rng_afk.uniform(0.7, 1.3))
             if not self.is_running:
                 break
-            action = random.choice(["key", "mouse_move"])
+            action = self._rng_afk.choice(["key", "mouse_move"])
             if action == "key":
-                k = random.choice(keys)
+                k = self._rng_afk.choice(keys)
                 try:
                     key = getattr(pynput_keyboard.Key, k, None)
                     if key is None:
                         key = pynput_keyboard.KeyCode.from_char(k)
                     self.kb_ctrl.press(key)
-                    time.sleep(random.uniform(0.05, 0.2))
+                    time.sleep(self._rng_afk.uniform(0.05, 0.2))
                     self.kb_ctrl.release(key)
                     self._log_action(f"Anti-AFK: нажал [{k}]")
                 except Exception:
                     pass
             else:
                 cx, cy = self.mouse.position
-                dx, dy = random.randint(-30, 30), random.randint(-30, 30)
+                dx, dy = self._rng_afk.randint(-30, 30), self._rng_afk.randint(-30, 30)
                 self.mouse.position = (cx + dx, cy + dy)
                 time.sleep(0.1)
                 self.mouse.position = (cx, cy)
@@ -2515,8 +3885,9 @@ class MouseOpsApp:
 
     # ── Лог действий ──
 
-    def _log_action(self, msg):
-        ts = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+    def _log_action(self, msg, at=None):
+        """at — время события (time.time()), если запись откладывалась"""
+        ts = (datetime.fromtimestamp(at) if at else datetime.now()).strftime("%H:%M:%S.%f")[:-3]
         entry = f"[{ts}] {msg}"
         self.action_log.append(entry)
         try:
@@ -2556,48 +3927,73 @@ class MouseOpsApp:
     #                   ПРЕДПРОСМОТР ТРАЕКТОРИИ
     # ══════════════════════════════════════════════════════════════════════════
 
+    PREVIEW_BUCKETS = 8
+
+    def _preview_engine(self):
+        """Движок траекторий по текущим слайдерам — без изменения состояния UI.
+
+        Случайность берётся из глобального random, чтобы предпросмотр не
+        сдвигал поток чисел сессии с фиксированным сидом.
+        """
+        return MotionEngine(model=self.motion_model.get(), curviness=self.curviness.get(),
+                            overshoot=self.overshoot_level.get(),
+                            speed_var=self.speed_variation_level.get(), humanize=True)
+
+    def _preview_points(self, mv, cx, cy, r):
+        engine = self._preview_engine()
+        try:
+            table = self.patterns[mv].points(r) if mv in self.patterns else None
+        except ValueError:
+            table = None
+            mv = "left_right"
+        if table is not None:
+            pts = [(cx + dx, cy + dy) for dx, dy in table]
+        else:
+            segments, n = self._pattern_segments(mv, (cx, cy), r)
+            if not segments:
+                segments, n = self._pattern_segments("left_right", (cx, cy), r)
+                n = 30
+            pts = engine.bake(segments, n=n, variants=1)[0]
+
+        tremor = self.hand_tremor.get()
+        if tremor > 0:
+            # Тремор вдоль имитируемого времени воспроизведения
+            step = self._preview_delay() * 5
+            nx, ny = self._noise_x.value, self._noise_y.value
+            pts = [(int(x + nx(i * step) * tremor), int(y + ny(i * step) * tremor))
+                   for i, (x, y) in enumerate(pts)]
+        return pts
+
+    def _preview_delay(self):
+        try:
+            return max(1, min(60000, int(self.mouse_delay_entry.get() or "50"))) / 1000
+        except ValueError:
+            return 0.05
+
     def _preview_trajectory(self):
         c = self.preview_canvas
+        self._preview_stop_animation()
         c.delete("all")
         w, h = c.winfo_width() or 380, c.winfo_height() or 200
         cx, cy = w // 2, h // 2
         r = min(w, h) // 3
 
-        saved = self.human_like_enabled.get()
-        self.human_like_enabled.set(True)
-        self._cache_human_params()
+        pts = self._preview_points(self.movement_var.get(), cx, cy, r)
+        self._preview_pts = pts
 
-        mv = self.movement_var.get()
-        pts = []
-        if mv == "circle":
-            for i in range(61):
-                a = (i / 60) * 2 * math.pi
-                pts.append(self._apply_tremor(cx + int(r * math.cos(a)),
-                                              cy + int(r * math.sin(a))))
-        elif mv == "eight":
-            for i in range(81):
-                t = (i / 80) * 2 * math.pi
-                pts.append(self._apply_tremor(cx + int(r * math.sin(t)),
-                                              cy + int(r * 0.6 * math.sin(2 * t))))
-        elif mv == "square":
-            corners = [(cx-r, cy-r), (cx+r, cy-r), (cx+r, cy+r), (cx-r, cy+r)]
-            for i in range(4):
-                ni = (i + 1) % 4
-                pts += self._bezier_points(corners[i][0], corners[i][1],
-                                           corners[ni][0], corners[ni][1], n=15)
-        else:
-            pts = (self._bezier_points(cx - r, cy, cx + r, cy, n=30) +
-                   self._bezier_points(cx + r, cy, cx - r, cy, n=30))
-
-        self.human_like_enabled.set(saved)
-
-        for i in range(1, len(pts)):
-            frac = i / len(pts)
+        # Несколько полилиний с цветом по корзинам вместо линии на каждый отрезок
+        n = len(pts)
+        k = self.PREVIEW_BUCKETS
+        for b in range(k):
+            lo, hi = b * n // k, min(n, (b + 1) * n // k + 1)
+            if hi - lo < 2:
+                continue
+            frac = (b + 0.5) / k
             cr0 = int(124 + 131 * frac)
             cg0 = int(92 + 120 * (1 - frac))
             cb0 = int(252 - 82 * frac)
-            c.create_line(pts[i-1][0], pts[i-1][1], pts[i][0], pts[i][1],
-                         fill=f"#{cr0:02x}{cg0:02x}{cb0:02x}", width=2)
+            c.create_line(*[v for p in pts[lo:hi] for v in p],
+                          fill=f"#{cr0:02x}{cg0:02x}{cb0:02x}", width=2)
 
         if pts:
             c.create_oval(pts[0][0]-4, pts[0][1]-4, pts[0][0]+4, pts[0][1]+4,
@@ -2612,6 +4008,43 @@ class MouseOpsApp:
                 c=self.curviness.get(), t=self.hand_tremor.get(),
                 o=self.overshoot_level.get()))
 
+    def _preview_animate(self):
+        """Провести маркер по траектории с реальной скоростью воспроизведения.
+
+        Кадры идут через after(), позиция считается по прошедшему времени,
+        так что цикл Tk не блокируется, а медленный кадр не замедляет анимацию.
+        """
+        if not self._preview_pts:
+            self._preview_trajectory()
+        self._preview_stop_animation()
+        pts = self._preview_pts
+        if not pts:
+            return
+        c = self.preview_canvas
+        x, y = pts[0]
+        marker = c.create_oval(x-5, y-5, x+5, y+5, fill="#ffffff", outline="#7c5cfc", width=2)
+        delay = self._preview_delay()
+        start = time.perf_counter()
+
+        def frame():
+            i = int((time.perf_counter() - start) / delay)
+            if i >= len(pts):
+                c.delete(marker)
+                self._preview_anim = None
+                return
+            px, py = pts[i]
+            c.coords(marker, px-5, py-5, px+5, py+5)
+            self._preview_anim = (self.root.after(16, frame), marker)
+
+        frame()
+
+    def _preview_stop_animation(self):
+        if self._preview_anim:
+            after_id, marker = self._preview_anim
+            self.root.after_cancel(after_id)
+            self.preview_canvas.delete(marker)
+            self._preview_anim = None
+
     # ══════════════════════════════════════════════════════════════════════════
     #                       ЗАПУСК / ОСТАНОВКА
     # ══════════════════════════════════════════════════════════════════════════
@@ -2632,6 +4065,7 @@ class MouseOpsApp:
             m = max(0, int(self.minutes_entry.get() or 0))
             s = max(0, int(self.seconds_entry.get() or 0))
             self.duration = h * 3600 + m * 60 + s or None
+            self._new_session_rng()
             self._cache_human_params()
         except ValueError as e:
             messagebox.showerror(self._t("title.error"), self._t("msg.bad_values").format(e=e))
@@ -2645,12 +4079,12 @@ class MouseOpsApp:
         self._action_count = 0
         self._total_actions_done = 0
         self._last_mouse_pos = self.mouse.position
-        self._noise_x = HumanNoise(seed=random.randint(0, 99999))
-        self._noise_y = HumanNoise(seed=random.randint(0, 99999))
+        self._noise_x = HumanNoise(seed=self._rng.randint(0, 99999))
+        self._noise_y = HumanNoise(seed=self._rng.randint(0, 99999))
         self._tick_stats()
 
         self._play_sound("start")
-        self._log_action("▶ СТАРТ")
+        self._log_action(f"▶ СТАРТ (seed {self._rng.seed})")
 
         if self.duration:
             self.timer_frame.pack(fill=tk.X, padx=6, pady=(4, 0))
@@ -2701,6 +4135,29 @@ class MouseOpsApp:
                          'h_pauses', 'h_fatigue', 'h_overshoot', 'h_micro', 'h_speed_var'):
                 setattr(self, attr, 0)
             self.h_pressure = 5
+        self._motion = MotionEngine(
+            model=self.motion_model.get(), curviness=self.h_curviness,
+            overshoot=self.h_overshoot, speed_var=self.h_speed_var,
+            humanize=self.human_like_enabled.get(), rng=self._rng_move)
+
+    def _new_session_rng(self):
+        """Новый поток случайных чисел сессии.
+
+        Сид берётся из настроек (пусто — случайный) и сохраняется в сессии,
+        чтобы прогон можно было воспроизвести. Каждый рабочий поток получает
+        свой дочерний поток чисел, иначе порядок выборок зависел бы от
+        планировщика.
+        """
+        seed = self.human_seed.get().strip()
+        self._rng = RandomStream(int(seed) if seed.isdigit() else seed or None)
+        self._rng_move = self._rng.spawn("move")
+        self._rng_click = self._rng.spawn("click")
+        self._rng_afk = self._rng.spawn("afk")
+        self._session_seed = self._rng.seed
+        try:
+            self.stat_seed.set(str(self._session_seed))
+        except AttributeError:
+            pass
 
     def _stop(self):
         was = self.is_running
@@ -2743,17 +4200,14 @@ class MouseOpsApp:
 
     def _movement_loop(self):
         pos = self._start_pos
+        table = self._bake_pattern(self.movement_type, pos)
         while self.is_running and not self.stop_event.is_set():
             try:
                 mt = self.movement_type
-                if mt == "left_right":   self._move_lr(pos)
-                elif mt == "up_down":    self._move_ud(pos)
-                elif mt == "diagonal":   self._move_diag(pos)
+                if table:                self._play_table(table)
                 elif mt == "random":     self._move_random(pos)
-                elif mt == "circle":     self._move_circle(pos)
-                elif mt == "eight":      self._move_eight(pos)
-                elif mt == "square":     self._move_square(pos)
-                elif mt == "free":
+                elif mt in self.patterns: self._play_pattern(self.patterns[mt], pos)
+                else:
                     if self.human_like_enabled.get() and self.h_micro > 0:
                         self._do_micro()
                     time.sleep(self.mouse_delay)
@@ -2761,43 +4215,36 @@ class MouseOpsApp:
             except Exception:
                 break
 
+    def _pattern_segments(self, mt, sp, r):
+        """Отрезки одного цикла для фигур из прямых участков."""
+        if mt == "left_right":
+            return [(sp[0]-r, sp[1], sp[0]+r, sp[1]), (sp[0]+r, sp[1], sp[0]-r, sp[1])], 20
+        if mt == "up_down":
+            return [(sp[0], sp[1]-r, sp[0], sp[1]+r), (sp[0], sp[1]+r, sp[0], sp[1]-r)], 20
+        if mt == "diagonal":
+            return [(sp[0]-r, sp[1]-r, sp[0]+r, sp[1]+r), (sp[0]+r, sp[1]+r, sp[0]-r, sp[1]-r)], 20
+        if mt == "square":
+            corners = [(sp[0]-r, sp[1]-r), (sp[0]+r, sp[1]-r),
+                       (sp[0]+r, sp[1]+r), (sp[0]-r, sp[1]+r)]
+            return [corners[i] + corners[(i + 1) % 4] for i in range(4)], 15
+        return None, 0
+
+    def _bake_pattern(self, mt, sp):
+        """Заранее построить пачку вариантов цикла — в цикле остаётся выбор из таблицы."""
+        segments, n = self._pattern_segments(mt, sp, self.radius)
+        if not segments:
+            return None
+        return self._motion.bake(segments, n=n)
+
+    def _play_table(self, table):
+        pts = table[self._rng_move.randrange(len(table))]
+        for x, y in pts:
+            if not self.is_running: return
+            self.mouse.position = self._apply_tremor(x, y)
+            time.sleep(self._hdelay())
+
     def _bezier_points(self, x1, y1, x2, y2, n=20):
-        if not self.human_like_enabled.get():
-            return [(int(x1 + (x2-x1)*i/n), int(y1 + (y2-y1)*i/n)) for i in range(n+1)]
-
-        dist = math.hypot(x2 - x1, y2 - y1)
-        strength = dist * 0.3 * (self.h_curviness / 5.0)
-        angle = math.atan2(y2 - y1, x2 - x1)
-        perp = angle + math.pi / 2
-
-        d1 = random.uniform(-strength, strength)
-        d2 = random.uniform(-strength, strength)
-        c1x = x1 + (x2-x1)*0.33 + d1 * math.cos(perp)
-        c1y = y1 + (y2-y1)*0.33 + d1 * math.sin(perp)
-        c2x = x1 + (x2-x1)*0.66 + d2 * math.cos(perp)
-        c2y = y1 + (y2-y1)*0.66 + d2 * math.sin(perp)
-
-        pts = []
-        for i in range(n + 1):
-            t = i / n
-            if self.h_speed_var > 0:
-                ease = self.h_speed_var / 10.0
-                t = t*t*(3 - 2*t) * ease + t * (1 - ease)
-            u = 1 - t
-            x = u**3*x1 + 3*u**2*t*c1x + 3*u*t**2*c2x + t**3*x2
-            y = u**3*y1 + 3*u**2*t*c1y + 3*u*t**2*c2y + t**3*y2
-            pts.append((int(x), int(y)))
-
-        if self.h_overshoot > 0 and dist > 20:
-            od = dist * 0.08 * (self.h_overshoot / 10.0) * random.uniform(0.5, 1.5)
-            ox = x2 + od * math.cos(angle)
-            oy = y2 + od * math.sin(angle)
-            for i in range(max(3, int(n * 0.15))):
-                t = i / max(3, int(n * 0.15))
-                pts.append((int(x2 + (ox - x2) * (1 - t*t)),
-                            int(y2 + (oy - y2) * (1 - t*t))))
-            pts.append((int(x2), int(y2)))
-        return pts
+        return self._motion.path(x1, y1, x2, y2, n)
 
     def _apply_tremor(self, x, y):
         if self.human_like_enabled.get() and self.h_tremor > 0:
@@ -2807,96 +4254,96 @@ class MouseOpsApp:
         return x, y
 
     def _do_micro(self):
-        if random.random() > self.h_micro / 15.0:
+        rng = self._rng_move
+        if rng.random() > self.h_micro / 15.0:
             return
         try:
             cx, cy = self.mouse.position
-            self.mouse.position = (int(cx + random.gauss(0, self.h_micro * 0.4)),
-                                   int(cy + random.gauss(0, self.h_micro * 0.4)))
+            self.mouse.position = (int(cx + rng.gauss(0, self.h_micro * 0.4)),
+                                   int(cy + rng.gauss(0, self.h_micro * 0.4)))
         except Exception:
             pass
 
     def _maybe_pause(self):
         if self.human_like_enabled.get() and self.h_pauses > 0:
-            if random.random() < self.h_pauses / 500.0:
-                time.sleep(random.uniform(0.2, 1.0 + self.h_pauses * 0.2))
+            if self._rng_move.random() < self.h_pauses / 500.0:
+                time.sleep(self._rng_move.uniform(0.2, 1.0 + self.h_pauses * 0.2))
 
     def _hdelay(self):
         d = self.mouse_delay
         if self.human_like_enabled.get():
             if self.h_speed_var > 0:
-                d *= random.uniform(1 - self.h_speed_var/20, 1 + self.h_speed_var/20)
+                d *= self._rng_move.uniform(1 - self.h_speed_var/20, 1 + self.h_speed_var/20)
             d *= self._fatigue_factor
         return max(0.001, d)
 
-    def _move_lr(self, sp):
-        for pts in [self._bezier_points(sp[0]-self.radius, sp[1], sp[0]+self.radius, sp[1]),
-                    self._bezier_points(sp[0]+self.radius, sp[1], sp[0]-self.radius, sp[1])]:
-            for x, y in pts:
-                if not self.is_running: return
-                self.mouse.position = self._apply_tremor(x, y)
-                time.sleep(self._hdelay())
-
-    def _move_ud(self, sp):
-        for pts in [self._bezier_points(sp[0], sp[1]-self.radius, sp[0], sp[1]+self.radius),
-                    self._bezier_points(sp[0], sp[1]+self.radius, sp[0], sp[1]-self.radius)]:
-            for x, y in pts:
-                if not self.is_running: return
-                self.mouse.position = self._apply_tremor(x, y)
-                time.sleep(self._hdelay())
-
-    def _move_diag(self, sp):
-        r = self.radius
-        for pts in [self._bezier_points(sp[0]-r, sp[1]-r, sp[0]+r, sp[1]+r),
-                    self._bezier_points(sp[0]+r, sp[1]+r, sp[0]-r, sp[1]-r)]:
-            for x, y in pts:
-                if not self.is_running: return
-                self.mouse.position = self._apply_tremor(x, y)
-                time.sleep(self._hdelay())
-
     def _move_random(self, sp):
         cx, cy = self.mouse.position
         while self.is_running and not self.stop_event.is_set():
-            tx = sp[0] + random.randint(-self.radius, self.radius)
-            ty = sp[1] + random.randint(-self.radius, self.radius)
-            for x, y in self._bezier_points(cx, cy, tx, ty, n=12):
+            tx = sp[0] + self._rng_move.randint(-self.radius, self.radius)
+            ty = sp[1] + self._rng_move.randint(-self.radius, self.radius)
+            for x, y in self._motion.iter_path(cx, cy, tx, ty, n=12):
                 if not self.is_running: return
                 self.mouse.position = self._apply_tremor(x, y)
                 time.sleep(self._hdelay())
             cx, cy = tx, ty
             self._maybe_pause()
 
-    def _move_circle(self, sp):
-        for i in range(61):
-            if not self.is_running: return
-            a = (i / 60) * 2 * math.pi
-            self.mouse.position = self._apply_tremor(
-                sp[0] + int(self.radius * math.cos(a)),
-                sp[1] + int(self.radius * math.sin(a)))
-            time.sleep(self._hdelay())
-
-    def _move_eight(self, sp):
-        for i in range(81):
+    def _load_patterns(self):
+        """Встроенные фигуры + пользовательские из PATTERNS_FILE (компилируются один раз)."""
+        specs = dict(BUILTIN_PATTERNS)
+        user = {}
+        errors = []
+        if os.path.exists(self.PATTERNS_FILE):
+            try:
+                user = load_pattern_specs(self.PATTERNS_FILE)
+            except Exception as e:
+                errors.append((os.path.basename(self.PATTERNS_FILE), str(e)))
+        specs.update(user)
+        self.patterns = build_patterns(specs, errors)
+        self.user_pattern_names = [n for n in user
+                                   if n in self.patterns and n not in BUILTIN_PATTERNS]
+        for name, err in errors:
+            self._log_action(f"⚠ Фигура '{name}': {err}")
+        return errors
+
+    def _import_patterns(self):
+        p = filedialog.askopenfilename(filetypes=[("JSON", "*.json")])
+        if not p:
+            return
+        try:
+            new = load_pattern_specs(p)
+            errors = []
+            good = build_patterns(new, errors)
+            user = load_pattern_specs(self.PATTERNS_FILE) if os.path.exists(self.PATTERNS_FILE) else {}
+            user.update({name: new[name] for name in good})
+            with open(self.PATTERNS_FILE, "w", encoding="utf-8") as f:
+                json.dump(user, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            messagebox.showerror(self._t("title.error"), str(e))
+            return
+        self._load_patterns()
+        self.custom_pattern_combo["values"] = self.user_pattern_names
+        msg = self._t("msg.patterns_imported").format(n=len(good))
+        if errors:
+            msg += "\n\n" + "\n".join(f"{name}: {err}" for name, err in errors)
+        messagebox.showinfo(self._t("title.done"), msg)
+
+    def _play_pattern(self, pattern, sp):
+        """Один цикл параметрической фигуры — таблица смещений кешируется по радиусу."""
+        x0, y0 = sp
+        try:
+            table = pattern.points(self.radius)
+        except ValueError as e:
+            # Таблица для нового радиуса не строится — остановить, а не молча выйти из цикла
+            self._log_action(f"⚠ Фигура '{pattern.name}': {e}")
+            self.root.after(0, self._stop)
+            return
+        for dx, dy in table:
             if not self.is_running: return
-            t = (i / 80) * 2 * math.pi
-            self.mouse.position = self._apply_tremor(
-                sp[0] + int(self.radius * math.sin(t)),
-                sp[1] + int(self.radius * 0.6 * math.sin(2 * t)))
+            self.mouse.position = self._apply_tremor(x0 + dx, y0 + dy)
             time.sleep(self._hdelay())
 
-    def _move_square(self, sp):
-        r = self.radius
-        corners = [(sp[0]-r, sp[1]-r), (sp[0]+r, sp[1]-r),
-                   (sp[0]+r, sp[1]+r), (sp[0]-r, sp[1]+r)]
-        for i in range(4):
-            if not self.is_running: return
-            ni = (i + 1) % 4
-            for x, y in self._bezier_points(corners[i][0], corners[i][1],
-                                            corners[ni][0], corners[ni][1], n=15):
-                if not self.is_running: return
-                self.mouse.position = self._apply_tremor(x, y)
-                time.sleep(self._hdelay())
-
     # ══════════════════════════════════════════════════════════════════════════
     #                           КЛИКЕР
     # ══════════════════════════════════════════════════════════════════════════
@@ -2910,8 +4357,8 @@ class MouseOpsApp:
             return
 
         if self.human_like_enabled.get() and self.h_pauses > 0:
-            if random.random() < self.h_pauses / 80.0:
-                time.sleep(random.uniform(0.3, 1 + self.h_pauses * 0.15) * self._fatigue_factor)
+            if self._rng_click.random() < self.h_pauses / 80.0:
+                time.sleep(self._rng_click.uniform(0.3, 1 + self.h_pauses * 0.15) * self._fatigue_factor)
 
         at = self.action_type.get()
         if at == "keyboard":
@@ -2945,35 +4392,62 @@ class MouseOpsApp:
         except Exception:
             pass
 
+    @staticmethod
+    def _resolve_button(name: str):
+        """Имя кнопки ('left', 'right', 'middle') → Button; неизвестное — левая."""
+        return getattr(Button, name) if name in ("left", "right", "middle") else Button.left
+
+    @staticmethod
+    def _resolve_key(key_name: str):
+        """Имя клавиши ('space', 'shift', 'a') → объект pynput."""
+        key = getattr(pynput_keyboard.Key, key_name.lower(), None)
+        if key is None:
+            key = pynput_keyboard.KeyCode.from_char(key_name[0])
+        return key
+
+    def _release_all(self, held):
+        """Отпустить всё, что осталось нажатым после остановки воспроизведения."""
+        for item in held:
+            try:
+                if isinstance(item, Button):
+                    self.mouse.release(item)
+                else:
+                    self.kb_ctrl.release(item)
+            except Exception:
+                pass
+        held.clear()
+
     def _press_key(self, key_name: str):
         try:
-            key = getattr(pynput_keyboard.Key, key_name.lower(), None)
-            if key is None:
-                key = pynput_keyboard.KeyCode.from_char(key_name[0])
-            n = 2 if self.double_click_enabled.get() else 1
-            for i in range(n):
-                hold = (random.uniform(0.03, 0.12) * (1 + self.h_pressure * 0.05)
-                        if self.human_like_enabled.get() else 0.04)
-                self.kb_ctrl.press(key)
-                time.sleep(hold)
-                self.kb_ctrl.release(key)
-                if i < n - 1:
-                    time.sleep(random.uniform(0.04, 0.12))
+            self._tap_key(self._resolve_key(key_name))
         except Exception as e:
             print(f"Ошибка клавиши '{key_name}': {e}")
 
+    def _tap_key(self, key):
+        """Нажать клавишу с учётом двойного нажатия и человеческой задержки."""
+        n = 2 if self.double_click_enabled.get() else 1
+        for i in range(n):
+            hold = (self._rng_click.uniform(0.03, 0.12) * (1 + self.h_pressure * 0.05)
+                    if self.human_like_enabled.get() else 0.04)
+            self.kb_ctrl.press(key)
+            time.sleep(hold)
+            self.kb_ctrl.release(key)
+            if i < n - 1:
+                time.sleep(self._rng_click.uniform(0.04, 0.12))
+
     def _human_click(self, button, n, x, y):
         hpv = self.h_pos_var
+        rng = self._rng_click
         for i in range(n):
-            ox = int(random.gauss(0, hpv * 0.5)) if hpv > 0 else 0
-            oy = int(random.gauss(0, hpv * 0.5)) if hpv > 0 else 0
+            ox = int(rng.gauss(0, hpv * 0.5)) if hpv > 0 else 0
+            oy = int(rng.gauss(0, hpv * 0.5)) if hpv > 0 else 0
             self.mouse.position = (x + ox, y + oy)
-            dur = random.uniform(0.04, 0.10) * (1 + self.h_pressure * 0.08) * self._fatigue_factor
+            dur = rng.uniform(0.04, 0.10) * (1 + self.h_pressure * 0.08) * self._fatigue_factor
             self.mouse.press(button)
             time.sleep(dur)
             self.mouse.release(button)
             if i < n - 1:
-                time.sleep(random.uniform(0.04, 0.15))
+                time.sleep(rng.uniform(0.04, 0.15))
 
     def _clicker_loop(self):
         while self.is_running and not self.stop_event.is_set():
@@ -3005,7 +4479,7 @@ class MouseOpsApp:
         d = self.click_delay
         if self.human_like_enabled.get():
             v = self.h_delay_var / 100.0
-            d *= random.uniform(1 - v, 1 + v) * self._fatigue_factor
+            d *= self._rng_click.uniform(1 - v, 1 + v) * self._fatigue_factor
         return max(0.01, d)
 
     def _update_fatigue(self):
@@ -3044,6 +4518,8 @@ class MouseOpsApp:
         try:
             if key == self.hotkey:
                 self.root.after(0, self.toggle)
+            elif self._preroll_key is not None and key == self._preroll_key:
+                self.root.after(0, self._preroll_save)
         except Exception:
             pass
 
@@ -3071,6 +4547,7 @@ class MouseOpsApp:
             "human_like":            self.human_like_enabled.get(),
             "human_delay_variation": self.human_delay_variation.get(),
             "human_pos_variation":   self.human_pos_variation.get(),
+            "human_seed":            self.human_seed.get(),
             "curviness":             self.curviness.get(),
             "hand_tremor":           self.hand_tremor.get(),
             "click_pressure":        self.click_pressure.get(),
@@ -3079,6 +4556,7 @@ class MouseOpsApp:
             "overshoot":             self.overshoot_level.get(),
             "micro_movements":       self.micro_movements_level.get(),
             "speed_variation":       self.speed_variation_level.get(),
+            "motion_model":          self.motion_model.get(),
             "theme":                 self.current_theme,
             "coord_select_button":   self.coord_select_button.get(),
             "sound_enabled":         self.sound_enabled.get(),
@@ -3091,11 +4569,22 @@ class MouseOpsApp:
             "drag_start_y":          self.drag_start_y.get(),
             "drag_end_x":            self.drag_end_x.get(),
             "drag_end_y":            self.drag_end_y.get(),
+            "drag_duration":         self.drag_duration.get(),
             "tray_enabled":          self.tray_enabled.get(),
             "tray_start_minimized":  self.tray_start_minimized.get(),
             "tray_show_startstop":   self.tray_show_startstop.get(),
             "tray_show_coords":      self.tray_show_coords.get(),
             "sound_volume":          self.sound_volume.get(),
+            "rec_move_hz":           self.rec_move_hz.get(),
+            "rec_tolerance":         self.rec_tolerance.get(),
+            "rec_fsync":             self.rec_fsync.get(),
+            "macro_profile":         self.macro_profile.get(),
+            "rec_trim_idle":         self.rec_trim_idle.get(),
+            "rec_dedupe":            self.rec_dedupe.get(),
+            "rec_speed":             self.rec_speed.get(),
+            "preroll_enabled":       self.preroll_enabled.get(),
+            "preroll_seconds":       self.preroll_seconds.get(),
+            "preroll_hotkey":        self.preroll_hotkey.get(),
             "language":              self.current_language,
             "current_profile":       self.current_profile,
         }
@@ -3173,6 +4662,7 @@ class MouseOpsApp:
             ("human_like", self.human_like_enabled),
             ("human_delay_variation", self.human_delay_variation),
             ("human_pos_variation", self.human_pos_variation),
+            ("human_seed", self.human_seed),
             ("curviness", self.curviness),
             ("hand_tremor", self.hand_tremor),
             ("click_pressure", self.click_pressure),
@@ -3181,6 +4671,7 @@ class MouseOpsApp:
             ("overshoot", self.overshoot_level),
             ("micro_movements", self.micro_movements_level),
             ("speed_variation", self.speed_variation_level),
+            ("motion_model", self.motion_model),
             ("coord_select_button", self.coord_select_button),
             ("sound_enabled", self.sound_enabled),
             ("action_limit_enabled", self.action_limit_enabled),
@@ -3192,11 +4683,22 @@ class MouseOpsApp:
             ("drag_start_y", self.drag_start_y),
             ("drag_end_x", self.drag_end_x),
             ("drag_end_y", self.drag_end_y),
+            ("drag_duration", self.drag_duration),
             ("tray_enabled", self.tray_enabled),
             ("tray_start_minimized", self.tray_start_minimized),
             ("tray_show_startstop", self.tray_show_startstop),
             ("tray_show_coords", self.tray_show_coords),
             ("sound_volume", self.sound_volume),
+            ("rec_move_hz", self.rec_move_hz),
+            ("rec_tolerance", self.rec_tolerance),
+            ("rec_fsync", self.rec_fsync),
+            ("macro_profile", self.macro_profile),
+            ("rec_trim_idle", self.rec_trim_idle),
+            ("rec_dedupe", self.rec_dedupe),
+            ("rec_speed", self.rec_speed),
+            ("preroll_enabled", self.preroll_enabled),
+            ("preroll_seconds", self.preroll_seconds),
+            ("preroll_hotkey", self.preroll_hotkey),
         ]:
             if key == "hotkey":
                 if "hotkey" in cfg:
@@ -3215,6 +4717,7 @@ class MouseOpsApp:
         self._on_sound_toggle()
         self._on_tray_toggle()
         self._on_movement_change()
+        self._preroll_apply()
 
     def _export_cfg(self):
         p = filedialog.asksaveasfilename(
@@ -2,5 +2,12 @@
 
 from .helpers import HumanNoise, ToolTip
 from .sound import SoundManager
+from .motion import MotionEngine, MOTION_MODELS
+from .rng import RandomStream
+from .patterns import MovementPattern, BUILTIN_PATTERNS
+from .recording import EventBuffer
+from .timing import LatencyMeter, TimingStats
 
-__all__ = ['HumanNoise', 'ToolTip', 'SoundManager']
+__all__ = ['HumanNoise', 'ToolTip', 'SoundManager', 'MotionEngine', 'MOTION_MODELS',
+           'RandomStream', 'MovementPattern', 'BUILTIN_PATTERNS',
+           'EventBuffer', 'LatencyMeter', 'TimingStats']
@@ -0,0 +1,283 @@
+"""Статический анализ макроса без воспроизведения
+
+По шагам считает плановую длительность, число вводимых событий по типам,
+пиковую частоту событий и шаги с координатами за пределами экрана.
+
+Сводка по каждому шагу хранится в параллельных массивах, поэтому правка
+одного шага пересчитывает только его; итоги собираются встроенными
+функциями (sum, accumulate, bisect через map) без цикла на Python по
+шагам. Длительность совпадает с плановой шкалой MacroVM: паузы,
+удержания, кривые и перетаскивания; сценарии зависят от данных и
+считаются отдельно как динамические.
+
+    python -m utils.analysis --bench 100000
+"""
+
+import argparse
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, compress, repeat
+from operator import add, sub
+
+from .motion import STREAM_HZ
+
+
+# Поля с координатами конечных точек; контрольные точки кривой могут
+# законно лежать за экраном и не проверяются
+_POINTS = (("x", "y"), ("x1", "y1"), ("x2", "y2"))
+
+WINDOW_MS = 1000
+
+
+def _int(v, default=0):
+    return v if type(v) is int else default
+
+
+def step_summary(step, drag_ms=300, bounds=None):
+    """(тип, длительность мс, событий, событий в окне, дорожка, за экраном)
+
+    «Событий в окне» — сколько событий шага попадает в окно WINDOW_MS от его
+    начала: потоковые шаги (drag, curve) растянуты по времени.
+    bounds — (лево, верх, право, низ), правая и нижняя границы не включены.
+    """
+    t = step.get("type", "?")
+    dur = 0
+    events = 0
+    stream = 0
+    if t == "delay":
+        dur = _int(step.get("delay"))
+    elif t == "move":
+        events = 1
+    elif t == "click":
+        dur = max(_int(step.get("hold"), -1), 0)
+        events = 3
+    elif t == "key":
+        dur = max(_int(step.get("hold"), -1), 0)
+        events = 2
+    elif t in ("mouse_down", "mouse_up"):
+        events = 2
+    elif t in ("key_down", "key_up"):
+        events = 1
+    elif t == "drag":
+        dur = _int(step.get("duration"), -1)
+        if dur < 0:
+            dur = drag_ms
+        stream = dur * STREAM_HZ // 1000
+        events = 3 + stream
+    elif t == "curve":
+        dur = max(_int(step.get("duration")), 0)
+        stream = dur * STREAM_HZ // 1000
+        events = 1 + stream
+    dur = max(dur, 0)
+    burst = events
+    if stream and dur > WINDOW_MS:
+        burst = events - stream + stream * WINDOW_MS // dur
+    oob = False
+    if bounds is not None:
+        left, top, right, bottom = bounds
+        for fx, fy in _POINTS:
+            x, y = step.get(fx), step.get(fy)
+            if type(x) is int and type(y) is int and not (left <= x < right and top <= y < bottom):
+                oob = True
+                break
+    return t, dur, events, burst, _int(step.get("lane")), oob
+
+
+class MacroAnalyzer:
+    """Анализ шагов с пересчётом только изменённых.
+
+    Методы load/append/insert/pop/swap/set повторяют правки списка шагов
+    в конструкторе и поправляют итоги на вклад изменённого шага, так что
+    report() не проходит по шагам. Пиковая частота зависит от времени всех
+    шагов и считается отдельно в peak_rate() — лениво и с кешем до правки.
+    """
+
+    def __init__(self, bounds=None, drag_ms=300):
+        self.bounds = bounds
+        self.drag_ms = drag_ms
+        self.load(())
+
+    def __len__(self):
+        return len(self._types)
+
+    def _summary(self, step):
+        return step_summary(step, self.drag_ms, self.bounds)
+
+    def _columns(self):
+        return (self._types, self._dur, self._events, self._burst, self._lane, self._oob)
+
+    def _account(self, row, sign):
+        t, dur, events, _, lane, oob = row
+        self._counts[t] += sign
+        self._lane_ms[lane] += sign * dur
+        self._lane_steps[lane] += sign
+        if not self._lane_steps[lane]:
+            del self._lane_steps[lane], self._lane_ms[lane]
+        self._total_events += sign * events
+        self._oob_count += sign * oob
+        self._peak = None
+
+    def load(self, steps):
+        rows = list(map(self._summary, steps))
+        cols = list(zip(*rows)) or [(), (), (), (), (), ()]
+        self._types = list(cols[0])
+        self._dur = array("q", cols[1])
+        self._events = array("q", cols[2])
+        self._burst = array("q", cols[3])
+        self._lane = array("i", cols[4])
+        self._oob = array("b", cols[5])
+        self._counts = Counter(self._types)
+        self._lane_steps = Counter(self._lane)
+        if len(self._lane_steps) <= 1:
+            self._lane_ms = Counter({lane: sum(self._dur) for lane in self._lane_steps})
+        else:
+            self._lane_ms = Counter({lane: sum(compress(self._dur, map(lane.__eq__, self._lane)))
+                                     for lane in self._lane_steps})
+        self._total_events = sum(self._events)
+        self._oob_count = sum(self._oob)
+        self._peak = None
+
+    def insert(self, i, step):
+        row = self._summary(step)
+        for col, v in zip(self._columns(), row):
+            col.insert(i, v)
+        self._account(row, 1)
+
+    def append(self, step):
+        self.insert(len(self._types), step)
+
+    def pop(self, i):
+        self._account([col.pop(i) for col in self._columns()], -1)
+
+    def set(self, i, step):
+        self._account([col[i] for col in self._columns()], -1)
+        row = self._summary(step)
+        for col, v in zip(self._columns(), row):
+            col[i] = v
+        self._account(row, 1)
+
+    def swap(self, i, j):
+        for col in self._columns():
+            col[i], col[j] = col[j], col[i]
+        self._peak = None
+
+    def report(self) -> dict:
+        """Итоги: duration_ms (самая длинная дорожка), lanes — мс по дорожкам,
+        events, counts по типам, dynamic (шагов-сценариев) и offscreen —
+        число шагов за экраном; их номера — в offscreen()."""
+        return {
+            "steps": len(self._types),
+            "duration_ms": max(self._lane_ms.values(), default=0),
+            "lanes": dict(self._lane_ms),
+            "events": self._total_events,
+            "counts": {t: n for t, n in self._counts.items() if n},
+            "dynamic": self._counts["script"],
+            "offscreen": self._oob_count,
+        }
+
+    def offscreen(self) -> list:
+        """Номера шагов (с нуля) с координатами за пределами bounds"""
+        if not self._oob_count:
+            return []
+        return list(compress(range(len(self._oob)), self._oob))
+
+    def peak_rate(self) -> int:
+        """Наибольшее число событий за WINDOW_MS по плановой шкале.
+
+        События шага относятся к его началу (потоковые — с поправкой на
+        растянутость); дорожки сливаются в одну шкалу.
+        """
+        if self._peak is None:
+            self._peak = self._build_peak()
+        return self._peak
+
+    def _build_peak(self) -> int:
+        lanes = list(self._lane_steps)
+        if len(lanes) <= 1:
+            at = list(accumulate(self._dur, initial=0))
+            at.pop()
+            return _peak(list(compress(at, self._burst)), list(compress(self._burst, self._burst)),
+                         WINDOW_MS)
+        pairs = []
+        for lane in lanes:
+            mask = list(map(lane.__eq__, self._lane))
+            burst = list(compress(self._burst, mask))
+            at = list(accumulate(compress(self._dur, mask), initial=0))
+            at.pop()
+            pairs += zip(compress(at, burst), compress(burst, burst))
+        pairs.sort()
+        return _peak([t for t, _ in pairs], [w for _, w in pairs], WINDOW_MS)
+
+
+def _peak(times, weights, window):
+    """Наибольшая сумма весов событий в окне [t, t + window) по отсортированным times.
+
+    Окно достаточно начинать в моменты событий: для каждого i граница j —
+    bisect по t[i] + window, сумма — разность префиксных сумм.
+    """
+    if not times:
+        return 0
+    prefix = list(accumulate(weights, initial=0))
+    ends = map(bisect_left, repeat(times), map(add, times, repeat(window)))
+    return max(map(sub, map(prefix.__getitem__, ends), prefix))
+
+
+# ── Запуск как модуля ─────────────────────────────────────────────────────────
+
+def _synthetic(n):
+    steps = []
+    for i in range(n):
+        r = i % 5
+        if r == 0:
+            steps.append({"type": "move", "x": i % 2000, "y": i % 1000})
+        elif r == 1:
+            steps.append({"type": "click", "x": i % 2000, "y": 300, "button": "left"})
+        elif r == 2:
+            steps.append({"type": "delay", "delay": 20 + i % 7})
+        elif r == 3:
+            steps.append({"type": "key", "key": "space", "lane": 2 if i % 3 == 0 else 0})
+        else:
+            steps.append({"type": "drag", "x1": 10, "y1": 10, "x2": 500, "y2": 500,
+                          "duration": 200, "lane": 1 if i % 2 else 0})
+    return steps
+
+
+def _bench(n):
+    steps = _synthetic(n)
+    an = MacroAnalyzer(bounds=(0, 0, 1920, 1080))
+    t0 = time.perf_counter()
+    an.load(steps)
+    t_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    peak = an.peak_rate()
+    t_peak = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    edits = 1000
+    for k in range(edits):
+        i = k * (n // edits)
+        an.set(i, {"type": "delay", "delay": 5})
+        rep = an.report()
+    t_edit = (time.perf_counter() - t0) / edits
+    print(f"{n} шагов: полный разбор {t_load * 1000:.1f} мс, пик {t_peak * 1000:.1f} мс, "
+          f"правка шага + итоги {t_edit * 1000:.3f} мс")
+    print(f"длительность {rep['duration_ms'] / 1000:.1f} с, событий {rep['events']}, "
+          f"пик {peak}/с, за экраном {rep['offscreen']}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m utils.analysis",
+                                 description="Статический анализ макросов Mouse Ops")
+    ap.add_argument("--bench", type=int, metavar="N", help="замер на N синтетических шагах")
+    args = ap.parse_args(argv)
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    ap.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
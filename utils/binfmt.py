@@ -0,0 +1,569 @@
+"""Компактный двоичный формат макросов и записей
+
+Файл: MAGIC, затем индекс — число разделов и для каждого имя, тип,
+число элементов и размер — и следом данные разделов подряд. По индексу
+можно прочитать один раздел, не разбирая остальные.
+
+Шаги макроса кодируются построчно: номер типа, маска присутствующих полей
+и значения полей varint'ами. Новые поля добавляются только в конец схемы,
+чтобы биты маски старых файлов не сдвигались. Координаты хранятся
+разностью с предыдущей координатой той же оси (zigzag), строки — номером в таблице, которая
+пополняется по ходу: новая строка идёт сразу за своим номером. Шаги, не
+укладывающиеся в схему (лишние поля, нечисловые значения), сохраняются
+как JSON — формат без потерь.
+
+Записи событий хранятся по колонкам (SECTION_EVENT_COLUMNS): таблица
+имён клавиш, затем колонки t, x, y, kind, code EventBuffer — каждая
+отдельным потоком zlib. Колонка пишется кусками по chunk событий, и в
+куске байты значений переставлены по разрядам (все младшие байты, затем
+следующие и т. д., little-endian): старшие байты соседних времён и
+координат совпадают и сжимаются почти в ноль. Чтение обходится без цикла
+на Python по событиям — распаковка, обратная перестановка срезами и
+array.frombytes идут на уровне C сразу в колонки буфера. Разности с
+varint'ами сжимаются лучше, но их свёртка стоит цикла по событиям, а
+время загрузки здесь важнее. Старый построчный раздел событий
+(SECTION_EVENTS) по-прежнему читается.
+
+Раздел событий кодируется и пишется в файл кусками, а размер в индексе
+дописывается после данных: под него заранее отведён varint фиксированной
+ширины (старшие группы нулевые с битом продолжения — обычный читатель
+varint'ов разбирает его как есть). Чтение тоже идёт кусками.
+"""
+
+import json
+import os
+import sys
+import zlib
+from array import array
+from collections import namedtuple
+
+
+MAGIC = b"MOB1"
+
+CHUNK = 1 << 16
+# Ширина varint'а, место под который отводится до того, как значение известно
+FIXED_VARINT = 10
+
+SECTION_STEPS = 0
+SECTION_EVENTS = 1              # построчные varint'ы — только чтение старых файлов
+SECTION_EVENT_COLUMNS = 2
+
+# Колонки EventBuffer в порядке записи
+EVENT_COLUMNS = ("t", "x", "y", "kind", "code")
+# Событий в куске при кодировании колонок
+COLUMN_CHUNK = 1 << 14
+_SWAP = sys.byteorder != "little"
+
+STEP_SCHEMAS = {
+    "click": ("x", "y", "button", "hold", "lane"),
+    "key":   ("key", "hold", "lane"),
+    "delay": ("delay", "lane"),
+    "move":  ("x", "y", "lane"),
+    "drag":  ("x1", "y1", "x2", "y2", "duration", "lane"),
+    "curve": ("x1", "y1", "cx1", "cy1", "cx2", "cy2", "x", "y", "duration", "lane"),
+    "mouse_down": ("x", "y", "button", "lane"),
+    "mouse_up":   ("x", "y", "button", "lane"),
+    "key_down":   ("key", "lane"),
+    "key_up":     ("key", "lane"),
+    "script":     ("source", "lane"),
+}
+STEP_TYPES = tuple(STEP_SCHEMAS)
+OP_JSON = 0x7F
+
+X_FIELDS = frozenset(("x", "x1", "x2", "cx1", "cx2"))
+Y_FIELDS = frozenset(("y", "y1", "y2", "cy1", "cy2"))
+STR_FIELDS = frozenset(("button", "key", "source"))
+
+_TYPE_IDS = {t: i for i, t in enumerate(STEP_TYPES)}
+
+Section = namedtuple("Section", "name kind count offset size")
+
+
+# ── varint ────────────────────────────────────────────────────────────────────
+
+def put_uvarint(out: bytearray, v: int):
+    while v > 0x7F:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def put_svarint(out: bytearray, v: int):
+    put_uvarint(out, (v << 1) if v >= 0 else ((-v << 1) - 1))
+
+
+def put_uvarint_fixed(out: bytearray, v: int, width=FIXED_VARINT):
+    """varint ровно из width байт — место под значение, известное позже"""
+    for _ in range(width - 1):
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    if v > 0x7F:
+        raise ValueError("значение не помещается в varint фиксированной ширины")
+    out.append(v)
+
+
+def put_str(out: bytearray, s: str):
+    raw = s.encode("utf-8")
+    put_uvarint(out, len(raw))
+    out += raw
+
+
+class Reader:
+    """Последовательное чтение varint'ов и строк из буфера"""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def uvarint(self) -> int:
+        data, pos = self.data, self.pos
+        b = data[pos]
+        pos += 1
+        v = b & 0x7F
+        shift = 7
+        while b & 0x80:
+            b = data[pos]
+            pos += 1
+            v |= (b & 0x7F) << shift
+            shift += 7
+        self.pos = pos
+        return v
+
+    def svarint(self) -> int:
+        v = self.uvarint()
+        return (v >> 1) ^ -(v & 1)
+
+    def str(self) -> str:
+        n = self.uvarint()
+        pos = self.pos
+        self.pos = pos + n
+        return bytes(self.data[pos:pos + n]).decode("utf-8")
+
+    def byte(self) -> int:
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+
+# ── Шаги макроса ──────────────────────────────────────────────────────────────
+
+class StepEncoder:
+    """Потоковый кодировщик шагов: состояние (оси, таблица строк) между вызовами"""
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.strings = {}
+
+    def _fits(self, step, schema) -> bool:
+        for k, v in step.items():
+            if k == "type":
+                continue
+            if k not in schema:
+                return False
+            if k in STR_FIELDS:
+                if not isinstance(v, str):
+                    return False
+            elif type(v) is not int:
+                return False
+        return True
+
+    def encode(self, step: dict, out: bytearray):
+        t = step.get("type")
+        schema = STEP_SCHEMAS.get(t)
+        if schema is None or not self._fits(step, schema):
+            out.append(OP_JSON)
+            put_str(out, json.dumps(step, ensure_ascii=False))
+            return
+        out.append(_TYPE_IDS[t])
+        mask = 0
+        for i, k in enumerate(schema):
+            if k in step:
+                mask |= 1 << i
+        put_uvarint(out, mask)
+        for i, k in enumerate(schema):
+            if not mask >> i & 1:
+                continue
+            v = step[k]
+            if k in X_FIELDS:
+                put_svarint(out, v - self.x)
+                self.x = v
+            elif k in Y_FIELDS:
+                put_svarint(out, v - self.y)
+                self.y = v
+            elif k in STR_FIELDS:
+                idx = self.strings.get(v)
+                if idx is None:
+                    idx = self.strings[v] = len(self.strings)
+                    put_uvarint(out, idx)
+                    put_str(out, v)
+                else:
+                    put_uvarint(out, idx)
+            else:
+                put_svarint(out, v)
+
+
+def iter_encode_steps(steps, chunk=1 << 16):
+    """Кодировать шаги, выдавая байты кусками примерно по chunk"""
+    enc = StepEncoder()
+    out = bytearray()
+    for step in steps:
+        enc.encode(step, out)
+        if len(out) >= chunk:
+            yield bytes(out)
+            out.clear()
+    if out:
+        yield bytes(out)
+
+
+def encode_steps(steps) -> bytes:
+    return b"".join(iter_encode_steps(steps))
+
+
+def _uvarint_tail(data, pos, b):
+    """Дочитать многобайтовый varint, первый байт которого b уже прочитан"""
+    v = b & 0x7F
+    shift = 7
+    while b & 0x80:
+        b = data[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        shift += 7
+    return v, pos
+
+
+def iter_steps(data):
+    """Разбирать шаги из буфера по одному (генератор).
+
+    Чтение varint'ов развёрнуто в цикл: однобайтовые значения (малые
+    смещения координат — основная масса) не требуют вызова функции.
+    """
+    x = y = 0
+    strings = []
+    pos, n = 0, len(data)
+    fields = [tuple((k, 1 if k in X_FIELDS else 2 if k in Y_FIELDS else 3 if k in STR_FIELDS else 0)
+                    for k in STEP_SCHEMAS[t]) for t in STEP_TYPES]
+    while pos < n:
+        op = data[pos]
+        b = data[pos + 1]
+        pos += 2
+        if b & 0x80:
+            b, pos = _uvarint_tail(data, pos, b)
+        if op == OP_JSON:
+            yield json.loads(bytes(data[pos:pos + b]).decode("utf-8"))
+            pos += b
+            continue
+        step = {"type": STEP_TYPES[op]}
+        mask = b
+        for k, kind in fields[op]:
+            if not mask & 1:
+                mask >>= 1
+                continue
+            mask >>= 1
+            b = data[pos]
+            pos += 1
+            if b & 0x80:
+                b, pos = _uvarint_tail(data, pos, b)
+            if kind == 3:
+                if b == len(strings):
+                    ln = data[pos]
+                    pos += 1
+                    if ln & 0x80:
+                        ln, pos = _uvarint_tail(data, pos, ln)
+                    strings.append(bytes(data[pos:pos + ln]).decode("utf-8"))
+                    pos += ln
+                step[k] = strings[b]
+                continue
+            b = (b >> 1) ^ -(b & 1)
+            if kind == 1:
+                x += b
+                step[k] = x
+            elif kind == 2:
+                y += b
+                step[k] = y
+            else:
+                step[k] = b
+        yield step
+
+
+# ── Записи событий ────────────────────────────────────────────────────────────
+
+def _shuffle(vals) -> bytes:
+    """Байты значений array, сгруппированные по разрядам"""
+    if _SWAP:
+        vals = array(vals.typecode, vals)
+        vals.byteswap()
+    raw, n = vals.tobytes(), vals.itemsize
+    return raw if n == 1 else b"".join(raw[k::n] for k in range(n))
+
+
+def _unshuffle(data, n) -> bytes:
+    if n == 1:
+        return data
+    out = bytearray(len(data))
+    m = len(data) // n
+    for k in range(n):
+        out[k::n] = data[k * m:(k + 1) * m]
+    return out
+
+
+def iter_encode_event_columns(buffer, level=6, chunk=COLUMN_CHUNK):
+    """Кодировать EventBuffer колонками кусками (генератор байтов раздела)"""
+    head = bytearray()
+    for name in buffer.names:
+        put_str(head, name)
+    out = bytearray()
+    put_uvarint(out, chunk)
+    put_uvarint(out, len(buffer.names))
+    put_uvarint(out, len(head))
+    yield bytes(out + head)
+    for name in EVENT_COLUMNS:
+        z = zlib.compressobj(level)
+        for part in buffer.column_chunks(name, chunk):
+            data = z.compress(_shuffle(part))
+            if data:
+                yield data
+        yield z.flush()
+
+
+def decode_event_columns(chunks, buffer):
+    """Разобрать колоночный раздел событий из кусков байтов в EventBuffer.
+
+    Колонка собирается в array прямо из распакованных кусков; в памяти
+    сверх неё — не больше одного куска. Возвращает число событий.
+    """
+    it = iter(chunks)
+    data = b""
+
+    def more():
+        piece = next(it, None)
+        if piece is None:
+            raise ValueError("файл повреждён: запись событий обрезана")
+        return piece
+
+    # Заголовок: событий в куске, число имён, длина таблицы имён в байтах
+    while True:
+        try:
+            r = Reader(data)
+            chunk, count, size = r.uvarint(), r.uvarint(), r.uvarint()
+            if r.pos + size <= len(data):
+                break
+        except IndexError:
+            pass
+        data += more()
+    if chunk < 1:
+        raise ValueError("файл повреждён: неверный размер куска")
+    r.data = data[:r.pos + size]
+    names = [r.str() for _ in range(count)]
+    data = data[r.pos:]
+    cols = []
+    for name in EVENT_COLUMNS:
+        col = array(getattr(buffer, name).typecode)
+        item = col.itemsize
+        step = chunk * item
+        z = zlib.decompressobj()
+        pending = bytearray()
+        while True:
+            if not data:
+                data = more()
+            pending += z.decompress(data)
+            data = z.unused_data
+            while len(pending) >= step or (z.eof and pending):
+                part = bytes(pending[:step])
+                del pending[:step]
+                if len(part) % item:
+                    raise ValueError(f"файл повреждён: колонка {name} обрезана")
+                col.frombytes(_unshuffle(part, item))
+            if z.eof:
+                break
+        if _SWAP:
+            col.byteswap()
+        cols.append(col)
+    if len({len(c) for c in cols}) != 1:
+        raise ValueError("файл повреждён: колонки разной длины")
+    buffer.load_names(names)
+    buffer.load_columns(*cols)
+    return len(cols[0])
+
+
+def decode_events(data, buffer):
+    """Дописать события старого построчного раздела из data в EventBuffer;
+    вернуть число событий"""
+    return decode_event_chunks((data,), buffer)
+
+
+def decode_event_chunks(chunks, buffer):
+    """То же по кускам байтов; запись может быть разрезана между кусками.
+
+    Недоразобранный хвост куска переносится в начало следующего — он не
+    длиннее одной записи (или таблицы имён в начале).
+    """
+    append = buffer.append
+    names = None
+    t = x = y = 0
+    n = 0
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk if tail else chunk
+        end = len(data)
+        r = Reader(data)
+        if names is None:
+            try:
+                names = [r.str() for _ in range(r.uvarint())]
+            except (IndexError, UnicodeDecodeError):
+                names = None
+            if names is None or r.pos > end:
+                names = None
+                tail = data
+                continue
+            buffer.load_names(names)
+        svar, uvar = r.svarint, r.uvarint
+        while r.pos < end:
+            start = r.pos
+            try:
+                kind = r.byte()
+                dt, dx, dy, code = svar(), svar(), svar(), uvar()
+            except IndexError:
+                r.pos = start
+                break
+            t += dt
+            x += dx
+            y += dy
+            append(t, kind, x, y, code)
+            n += 1
+        tail = bytes(data[r.pos:])
+    if tail or names is None:
+        raise ValueError("файл повреждён: запись событий обрезана")
+    return n
+
+
+# ── Файл с индексом разделов ──────────────────────────────────────────────────
+
+def write_file(path, sections):
+    """Записать разделы [(имя, тип, число элементов, данные), ...] атомарно.
+
+    Данные — bytes или итерируемое кусков bytes: такой раздел пишется в
+    файл по мере кодирования, а его размер дописывается в индекс потом.
+    """
+    sections = list(sections)
+    head = bytearray(MAGIC)
+    put_uvarint(head, len(sections))
+    slots = []          # смещения размеров потоковых разделов в заголовке
+    for name, kind, count, payload in sections:
+        put_str(head, name)
+        put_uvarint(head, kind)
+        put_uvarint(head, count)
+        if isinstance(payload, (bytes, bytearray)):
+            put_uvarint(head, len(payload))
+        else:
+            slots.append(len(head))
+            put_uvarint_fixed(head, 0)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        sizes = []
+        for *_, payload in sections:
+            if isinstance(payload, (bytes, bytearray)):
+                f.write(payload)
+                continue
+            size = 0
+            for piece in payload:
+                f.write(piece)
+                size += len(piece)
+            sizes.append(size)
+        for pos, size in zip(slots, sizes):
+            fixed = bytearray()
+            put_uvarint_fixed(fixed, size)
+            f.seek(pos)
+            f.write(fixed)
+    os.replace(tmp, path)
+
+
+def read_index(path) -> dict:
+    """Прочитать только индекс: {имя: Section}"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("не двоичный файл Mouse Ops")
+        # Индекс невелик: читаем с запасом и дочитываем при необходимости
+        buf = f.read(1 << 16)
+        while True:
+            try:
+                r = Reader(buf)
+                meta = []
+                for _ in range(r.uvarint()):
+                    meta.append((r.str(), r.uvarint(), r.uvarint(), r.uvarint()))
+                break
+            except IndexError:
+                more = f.read(1 << 16)
+                if not more:
+                    raise ValueError("файл повреждён: обрезан индекс") from None
+                buf += more
+    index = {}
+    offset = len(MAGIC) + r.pos
+    for name, kind, count, size in meta:
+        index[name] = Section(name, kind, count, offset, size)
+        offset += size
+    return index
+
+
+def iter_section(path, section: Section, chunk=CHUNK):
+    """Читать раздел кусками по chunk байт (генератор)"""
+    with open(path, "rb") as f:
+        f.seek(section.offset)
+        left = section.size
+        while left:
+            data = f.read(min(chunk, left))
+            if not data:
+                raise ValueError(f"файл повреждён: раздел {section.name} обрезан")
+            left -= len(data)
+            yield data
+
+
+def read_section(path, section: Section) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(section.offset)
+        data = f.read(section.size)
+    if len(data) < section.size:
+        raise ValueError(f"файл повреждён: раздел {section.name} обрезан")
+    return data
+
+
+def is_binary(path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def save_macros(path, macros: dict):
+    """Сохранить словарь {имя: [шаги]}"""
+    write_file(path, ((name, SECTION_STEPS, len(steps), encode_steps(steps))
+                      for name, steps in macros.items()))
+
+
+def load_steps(path, section: Section) -> list:
+    return list(iter_steps(read_section(path, section)))
+
+
+def load_macros(path) -> dict:
+    index = read_index(path)
+    return {name: load_steps(path, sec) for name, sec in index.items()
+            if sec.kind == SECTION_STEPS}
+
+
+def save_recording(path, buffer, name="recording"):
+    """Сохранить EventBuffer одним колоночным разделом; он кодируется и пишется кусками"""
+    write_file(path, [(name, SECTION_EVENT_COLUMNS, len(buffer), iter_encode_event_columns(buffer))])
+
+
+def load_recording(path, buffer) -> int:
+    """Загрузить первую запись из файла в EventBuffer; вернуть число событий"""
+    for sec in read_index(path).values():
+        if sec.kind == SECTION_EVENT_COLUMNS:
+            return decode_event_columns(iter_section(path, sec), buffer)
+        if sec.kind == SECTION_EVENTS:
+            return decode_event_chunks(iter_section(path, sec), buffer)
+    raise ValueError("в файле нет записи событий")
@@ -0,0 +1,101 @@
+"""Контрольная точка воспроизведения для продолжения после остановки или сбоя
+
+Проигрыватель ничего не пишет сам: Checkpoint раз в interval секунд из
+фонового потока спрашивает у него позицию (функция position) и, если она
+изменилась, сохраняет её вместе с описанием запуска. Запись атомарна —
+временный файл, fsync и os.replace, — поэтому после сбоя на диске
+остаётся последняя целая точка. При штатном завершении файл удаляется,
+при остановке дописывается последняя позиция.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+INTERVAL = 2.0
+
+# Поля, без которых точку нельзя продолжить
+REQUIRED = ("kind", "digest", "repeats", "repeat", "step", "elapsed_ms", "total_ms")
+
+
+def fingerprint(items) -> str:
+    """Короткий отпечаток шагов или точек: точка применима только к ним же"""
+    raw = json.dumps(items, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def save(path, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(path, kind=None):
+    """Прочитать точку; None — её нет, файл не читается или точка другого вида"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or any(k not in data for k in REQUIRED):
+        return None
+    if kind is not None and data["kind"] != kind:
+        return None
+    return data
+
+
+def clear(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Checkpoint:
+    """Периодическое сохранение позиции воспроизведения фоновым потоком.
+
+    meta — неизменная часть (что и с какими настройками играется);
+    position() вызывается из фонового потока и возвращает словарь позиции
+    или None, пока позиции нет. Ошибка записи сохраняется в error и не
+    останавливает воспроизведение.
+    """
+
+    def __init__(self, path, meta: dict, position, interval=INTERVAL):
+        self.path = path
+        self.meta = meta
+        self.position = position
+        self.interval = interval
+        self.error = None
+        self._written = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        pos = self.position()
+        if pos is None or pos == self._written:
+            return
+        try:
+            save(self.path, dict(self.meta, **pos, saved=time.time()))
+            self._written = pos
+        except OSError as e:
+            self.error = e
+
+    def close(self, finished: bool):
+        """finished — воспроизведение дошло до конца: точка больше не нужна"""
+        self._done.set()
+        self._thread.join()
+        if finished:
+            clear(self.path)
+        else:
+            self.flush()
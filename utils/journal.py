@@ -0,0 +1,169 @@
+"""Журнал записи на диске: дозапись событий фоновым потоком
+
+Формат — заголовок MAGIC и далее записи фиксированного размера RECORD
+(t, x, y, kind, code). Имена клавиш передаются записью KIND_NAME, за которой
+следуют x байт UTF-8. Запись KIND_END ставится при штатной остановке:
+журнал без неё остался после сбоя и его можно восстановить. Оборванная
+последняя запись при чтении отбрасывается.
+"""
+
+import os
+import queue
+from collections import deque
+import struct
+import threading
+import time
+
+
+MAGIC = b"MOJ1"
+RECORD = struct.Struct("<qiiBH")
+
+KIND_NAME = 254
+KIND_END = 255
+
+QUEUE_SIZE = 65536
+BATCH = 4096
+
+
+class JournalWriter:
+    """Дозапись событий в файл из фонового потока.
+
+    put() только кладёт событие в ограниченную очередь и не ждёт диска;
+    если очередь переполнена, событие считается в dropped. define() тоже
+    не ждёт: имена копятся в отдельной очереди без ограничения (их мало) и
+    пишутся перед очередной пачкой событий. Поток пишет
+    пачками и сбрасывает буферы файла после каждой пачки; при fsync_interval
+    (сек) дополнительно вызывает os.fsync не чаще этого интервала.
+    """
+
+    def __init__(self, path, fsync_interval=None, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self._q = queue.Queue(queue_size)
+        self._names = deque()
+        self._defined = set()
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._f.flush()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, t, kind, x=0, y=0, code=0):
+        try:
+            self._q.put_nowait((t, kind, x, y, code))
+        except queue.Full:
+            self.dropped += 1
+
+    def define(self, code: int, name: str):
+        """Записать имя клавиши для кода code (до первого события с ним).
+
+        Повторный вызов для уже записанного в этот журнал кода ничего не
+        делает, поэтому его можно вызывать перед каждым событием клавиши.
+        """
+        if code in self._defined:
+            return
+        self._defined.add(code)
+        self._names.append((code, name.encode("utf-8")))
+
+    def close(self):
+        """Дописать очередь, отметить штатное завершение и закрыть файл"""
+        self._q.put(None)
+        self._thread.join()
+
+    def _run(self):
+        f = self._f
+        pack = RECORD.pack
+        last_sync = time.monotonic()
+        done = False
+        while not done:
+            items = [self._q.get()]
+            try:
+                while len(items) < BATCH:
+                    items.append(self._q.get_nowait())
+            except queue.Empty:
+                pass
+            out = bytearray()
+            # Имена определены раньше, чем их события попали в очередь
+            names = self._names
+            while names:
+                code, name = names.popleft()
+                out += pack(0, len(name), 0, KIND_NAME, code) + name
+            for item in items:
+                if item is None:
+                    out += pack(0, 0, 0, KIND_END, 0)
+                    done = True
+                    break
+                t, kind, x, y, code = item
+                out += pack(t, x, y, kind, code)
+                self.written += 1
+            try:
+                f.write(out)
+                f.flush()
+                now = time.monotonic()
+                if done or (self.fsync_interval and now - last_sync >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    last_sync = now
+            except OSError as e:
+                self.error = e
+        f.close()
+
+
+class JournalReader:
+    """Потоковое чтение журнала: итерация выдаёт (t, kind, x, y, code).
+
+    names заполняется по мере чтения; clean — журнал завершён штатно
+    (известно после полной итерации).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names = []
+        self.clean = False
+
+    @staticmethod
+    def is_journal(path) -> bool:
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(MAGIC)) == MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def finished(path) -> bool:
+        """Журнал закрыт штатно (последняя запись — KIND_END); без полного чтения"""
+        try:
+            with open(path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < len(MAGIC) + RECORD.size:
+                    return False
+                f.seek(-RECORD.size, os.SEEK_END)
+                return RECORD.unpack(f.read(RECORD.size))[3] == KIND_END
+        except OSError:
+            return False
+
+    def __iter__(self):
+        size = RECORD.size
+        unpack = RECORD.unpack
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return
+            while True:
+                raw = f.read(size)
+                if len(raw) < size:
+                    return
+                t, x, y, kind, code = unpack(raw)
+                if kind == KIND_END:
+                    self.clean = True
+                    return
+                if kind == KIND_NAME:
+                    name = f.read(x)
+                    if len(name) < x:
+                        return
+                    while len(self.names) <= code:
+                        self.names.append("?")
+                    self.names[code] = name.decode("utf-8", "replace")
+                    continue
+                yield t, kind, x, y, code
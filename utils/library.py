@@ -0,0 +1,165 @@
+"""Библиотека макросов: каталог с файлом на каждый макрос и общим индексом
+
+Каждый макрос хранится отдельным двоичным файлом binfmt с одним разделом
+шагов; имя файла — отпечаток имени макроса. Индекс (index.json) держит
+для каждого имени файл, размер, число шагов и время изменения, поэтому при
+запуске читается только он, а шаги — при выборе макроса. Сохранение
+переписывает файл одного макроса и индекс.
+
+Сначала пишется файл макроса, затем индекс; удаление — в обратном порядке.
+При открытии индекс сверяется с каталогом: набор файлов, размер и время
+изменения каждого (одним os.scandir, без чтения файлов). Если они не
+сходятся — нет индекса, лишний или пропавший файл, файл заменён мимо
+индекса, — индекс восстанавливается по заголовкам файлов.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from . import binfmt
+
+
+INDEX = "index.json"
+EXT = ".bin"
+
+Entry = namedtuple("Entry", "file size steps mtime")
+
+
+def file_name(name: str) -> str:
+    return hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest() + EXT
+
+
+class MacroLibrary:
+    """Макросы в каталоге root: индекс в памяти, шаги — по запросу с кешем.
+
+    names() и «in» работают только по индексу; get() читает файл макроса
+    один раз. Ошибки чтения и записи (OSError, ValueError) передаются
+    вызывающему.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index = {}         # {имя: Entry} в порядке добавления
+        self._cache = {}
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def names(self) -> list:
+        return list(self.index)
+
+    def _path(self, file):
+        return os.path.join(self.root, file)
+
+    def _files(self) -> dict:
+        """{файл: (размер, время изменения)} макросов каталога"""
+        try:
+            with os.scandir(self.root) as it:
+                return {e.name: (e.stat().st_size, e.stat().st_mtime)
+                        for e in it if e.name.endswith(EXT) and e.is_file()}
+        except OSError:
+            return {}
+
+    def open(self) -> bool:
+        """Прочитать индекс; False — библиотеки на диске ещё нет"""
+        self.index, self._cache = {}, {}
+        files = self._files()
+        try:
+            with open(self._path(INDEX), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.index = {name: Entry(*e) for name, e in data["macros"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            if not files:
+                return False
+            self.rebuild()
+            return True
+        if len(files) != len(self.index) or any(
+                files.get(e.file) != (e.size, e.mtime) for e in self.index.values()):
+            self.rebuild()
+        return True
+
+    def rebuild(self):
+        """Собрать индекс заново по заголовкам файлов каталога"""
+        index = {}
+        for file in sorted(self._files()):
+            entry = self._scan(file)
+            if entry is not None:
+                index[entry[0]] = entry[1]
+        # Сохранить прежний порядок имён, новые — в конец
+        self.index = {name: index.pop(name) for name in self.index if name in index}
+        self.index.update(index)
+        self._write_index()
+
+    def _scan(self, file):
+        path = self._path(file)
+        try:
+            sections = binfmt.read_index(path)
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        for sec in sections.values():
+            if sec.kind == binfmt.SECTION_STEPS:
+                return sec.name, Entry(file, st.st_size, sec.count, st.st_mtime)
+        return None
+
+    def _write_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(INDEX)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"macros": [[name, list(e)] for name, e in self.index.items()]},
+                      f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def get(self, name) -> list:
+        """Шаги макроса; KeyError — такого нет в индексе"""
+        steps = self._cache.get(name)
+        if steps is not None:
+            return steps
+        entry = self.index[name]
+        path = self._path(entry.file)
+        sec = binfmt.read_index(path).get(name)
+        if sec is None or sec.kind != binfmt.SECTION_STEPS:
+            raise ValueError(f"в файле {entry.file} нет макроса {name}")
+        steps = binfmt.load_steps(path, sec)
+        st = os.stat(path)
+        if (st.st_size, sec.count) != (entry.size, entry.steps):
+            # Файл записан, а индекс — нет (сбой между записями)
+            self.index[name] = Entry(entry.file, st.st_size, sec.count, st.st_mtime)
+            self._write_index()
+        self._cache[name] = steps
+        return steps
+
+    def _store(self, name, steps):
+        os.makedirs(self.root, exist_ok=True)
+        file = file_name(name)
+        path = self._path(file)
+        binfmt.save_macros(path, {name: steps})
+        st = os.stat(path)
+        self.index[name] = Entry(file, st.st_size, len(steps), st.st_mtime)
+        self._cache[name] = steps
+
+    def put(self, name, steps):
+        """Сохранить один макрос: его файл и индекс"""
+        self._store(name, list(steps))
+        self._write_index()
+
+    def put_many(self, macros: dict):
+        """Сохранить несколько макросов с одной записью индекса (импорт, перенос)"""
+        for name, steps in macros.items():
+            self._store(name, list(steps))
+        self._write_index()
+
+    def remove(self, name):
+        entry = self.index.pop(name)
+        self._cache.pop(name, None)
+        try:
+            os.remove(self._path(entry.file))
+        except FileNotFoundError:
+            pass
+        self._write_index()
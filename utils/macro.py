@@ -0,0 +1,1207 @@
+"""Компиляция макроса в плоский массив операций и интерпретатор
+
+Шаги конструктора ({"type": ..., поля}) переводятся один раз перед
+воспроизведением: тип — в целый код операции, координаты — в готовые
+кортежи позиций, имена кнопок и клавиш — в объекты pynput. Операнды
+лежат в массиве кода подряд за кодом операции; всё, что не целое число
+(позиции, кнопки, клавиши, кривые, строки журнала), — в таблице констант
+и адресуется номером. Одинаковые константы хранятся один раз.
+
+Перед компиляцией optimize() убирает избыточные шаги, а компилятор
+сворачивает подряд повторяющиеся блоки шагов в цикл OP_LOOP … OP_NEXT.
+Шаг {"type": "script"} — сценарий (utils.script) — компилируется в тот же
+массив: переменные живут в регистрах, выражения считаются на стеке.
+
+Интерпретатор идёт по массиву счётчиком команд и не создаёт объектов на
+шаг: ни словарей, ни строк, ни кортежей позиций. Паузы отсчитываются по
+абсолютной шкале времени от начала повтора.
+
+Запуск модуля — сравнение скорости с разбором шагов-словарей:
+
+    python -m utils.macro --bench 200000
+"""
+
+import argparse
+import ast
+import heapq
+import random
+import sys
+import time
+from array import array
+
+from .motion import STREAM_HZ, cubic_at
+from .script import NAME_ELAPSED, parse_script
+from .timing import now_ns, sleep_until_ns
+
+
+OP_MOVE = 0         # позиция
+OP_DELAY = 1        # мс
+OP_CLICK = 2        # позиция, кнопка, удержание мс (-1 — обычный клик), строка
+OP_KEY = 3          # клавиша, удержание мс (-1 — нажатие), строка
+OP_DRAG = 4         # x1, y1, x2, y2, длительность мс (-1 — по настройке), строка
+OP_CURVE = 5        # (at, длительность с)
+OP_MOUSE_DOWN = 6   # позиция, кнопка
+OP_MOUSE_UP = 7     # позиция, кнопка
+OP_KEY_DOWN = 8     # клавиша
+OP_KEY_UP = 9       # клавиша
+OP_LOOP = 10        # число повторов тела
+OP_NEXT = 11        # адрес начала тела
+# Операции сценариев: стековая машина, регистры переменных, переходы.
+# Операции *_S берут координаты и длительности со стека
+OP_HALT = 12
+OP_PUSH = 13        # число
+OP_LOAD = 14        # регистр
+OP_STORE = 15       # регистр
+OP_BIN = 16         # BIN_*: b = pop, a = pop, push a ∘ b
+OP_NEG = 17
+OP_RAND = 18        # b = pop, a = pop, push rand(a..b)
+OP_ELAPSED = 19     # push мс от начала воспроизведения
+OP_JMP = 20         # адрес
+OP_JZ = 21          # адрес: переход, если pop() == 0
+OP_DECJZ = 22       # регистр, адрес: переход, если регистр <= 0, иначе регистр −= 1
+OP_CALL = 23        # адрес
+OP_RET = 24
+OP_MOVE_S = 25      # x, y
+OP_CLICK_S = 26     # кнопка, строка; x, y, удержание
+OP_KEY_S = 27       # клавиша, строка; удержание
+OP_DELAY_S = 28     # мс
+OP_DRAG_S = 29      # строка; x1, y1, x2, y2, длительность
+OP_MOUSE_DOWN_S = 30    # кнопка; x, y
+OP_MOUSE_UP_S = 31      # кнопка; x, y
+OP_MARK = 32        # номер шага: начало шага для профилировщика
+
+# Длина операции в массиве вместе с кодом
+OP_SIZE = (2, 2, 5, 4, 7, 2, 3, 3, 2, 2, 2, 2,
+           1, 2, 2, 2, 2, 1, 1, 1, 2, 2, 3, 2, 1, 1, 3, 3, 1, 2, 2, 2, 2)
+
+BIN_ADD, BIN_SUB, BIN_MUL, BIN_DIV, BIN_MOD = range(5)
+BIN_LT, BIN_LE, BIN_GT, BIN_GE, BIN_EQ, BIN_NE = range(5, 11)
+BIN_AND, BIN_OR = 11, 12
+
+_BIN_OF = {
+    ast.Add: BIN_ADD, ast.Sub: BIN_SUB, ast.Mult: BIN_MUL, ast.Div: BIN_DIV,
+    ast.FloorDiv: BIN_DIV, ast.Mod: BIN_MOD,
+    ast.Lt: BIN_LT, ast.LtE: BIN_LE, ast.Gt: BIN_GT, ast.GtE: BIN_GE,
+    ast.Eq: BIN_EQ, ast.NotEq: BIN_NE, ast.And: BIN_AND, ast.Or: BIN_OR,
+}
+
+# Наибольшая вложенность циклов и вызовов call
+LOOP_DEPTH = 64
+CALL_DEPTH = 64
+# Наибольшая длина повторяющегося блока, который ищет компилятор
+LOOP_MAX_BLOCK = 64
+# Цикл оправдан, если экономит не меньше стольких шагов
+LOOP_MIN_SAVED = 4
+
+# Шаги, которые сами ставят курсор: перемещение прямо перед ними лишнее
+# Поля точки, с которой шаг начинает, сам ставя курсор
+_START_POINT = {"click": ("x", "y"), "mouse_down": ("x", "y"), "mouse_up": ("x", "y"),
+                "drag": ("x1", "y1"), "curve": ("x1", "y1")}
+_PLAIN_MOVE = frozenset(("type", "x", "y", "lane"))
+
+# Вид действия для учёта: клик / клавиша
+ACT_CLICK = 0
+ACT_KEY = 1
+
+
+class Program:
+    """Скомпилированный макрос: массив кода и таблица констант"""
+
+    __slots__ = ("code", "consts", "steps", "nregs", "lanes")
+
+    def __init__(self, code: array, consts: list, steps: int, nregs: int = 0, lanes=(0,)):
+        self.code = code
+        self.consts = consts
+        self.steps = steps
+        self.nregs = nregs
+        self.lanes = lanes      # адреса начала дорожек
+
+    def __len__(self):
+        return self.steps
+
+
+class _Consts:
+    """Таблица констант с объединением одинаковых значений"""
+
+    def __init__(self):
+        self.items = []
+        self._index = {}
+
+    def add(self, value) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.items)
+            self.items.append(value)
+        return idx
+
+
+def optimize(steps, origins=None):
+    """Убрать избыточные шаги, не меняя того, что видит система.
+
+    Соседние паузы складываются, нулевые — убираются. Перемещение, за
+    которым сразу следует другое перемещение или шаг, сам ставящий курсор
+    в ту же точку (клик, нажатие, отпускание, начало перетаскивания или
+    кривой), выбрасывается. Перемещение перед шагом в другой точке
+    остаётся: система видит его отдельным событием.
+    Соседство считается внутри дорожки: шаги других дорожек между ними
+    не мешают. Исходный список не меняется. Возвращает (шаги, убрано
+    событий ввода); список origins, если передан, дополняется номерами
+    исходных шагов для каждого шага результата (сложенные паузы — номер
+    первой).
+    """
+    out = []
+    src = []
+    last = {}       # дорожка → номер её последнего шага в out
+    removed = 0
+    for n, step in enumerate(steps):
+        t = step.get("type")
+        lane = step.get("lane", 0)
+        i = last.get(lane)
+        prev = out[i] if i is not None else None
+        if t == "delay" and type(step.get("delay")) is int:
+            if prev is not None and prev.get("type") == "delay" and type(prev.get("delay")) is int:
+                out[i] = dict(prev, delay=prev["delay"] + step["delay"])
+            elif step["delay"] > 0:
+                last[lane] = len(out)
+                out.append(step)
+                src.append(n)
+            continue
+        if (prev is not None and prev.get("type") == "move" and _PLAIN_MOVE.issuperset(prev)
+                and _covers_move(step, prev)):
+            out[i] = None
+            removed += 1
+        last[lane] = len(out)
+        out.append(step)
+        src.append(n)
+    if origins is not None:
+        origins.extend(i for st, i in zip(out, src) if st is not None)
+    return [st for st in out if st is not None], removed
+
+
+def _covers_move(step, move) -> bool:
+    """Шаг сам ставит курсор туда, куда его перед этим переместил move"""
+    t = step.get("type")
+    if t == "move":
+        return True
+    fields = _START_POINT.get(t)
+    return fields is not None and (step.get(fields[0]), step.get(fields[1])) == (move.get("x"), move.get("y"))
+
+
+def _step_key(step):
+    try:
+        return tuple(sorted(step.items()))
+    except TypeError:
+        return repr(sorted(step.items()))
+
+
+def find_loops(steps, max_block=LOOP_MAX_BLOCK, min_saved=LOOP_MIN_SAVED):
+    """Найти подряд повторяющиеся блоки: список (начало, длина блока, повторов).
+
+    Кандидаты на длину блока — расстояния до следующих вхождений того же
+    шага, поэтому на записях без повторов поиск почти линеен.
+    """
+    ids = {}
+    keys = [ids.setdefault(_step_key(st), len(ids)) for st in steps]
+    n = len(keys)
+    nxt = [n] * n
+    last = {}
+    for i in range(n - 1, -1, -1):
+        nxt[i] = last.get(keys[i], n)
+        last[keys[i]] = i
+    loops = []
+    i = 0
+    while i < n:
+        best = None
+        j = nxt[i]
+        while j < n and j - i <= max_block:
+            size = j - i
+            # Дешёвая отсечка по последнему шагу блока до сравнения срезов
+            if j + size > n or keys[j + size - 1] != keys[j - 1]:
+                j = nxt[j]
+                continue
+            block = keys[i:j]
+            count = 1
+            while keys[i + count * size:i + (count + 1) * size] == block:
+                count += 1
+            saved = (count - 1) * size
+            if saved >= min_saved and (best is None or saved > best[1] * (best[2] - 1)):
+                best = (i, size, count)
+            j = nxt[j]
+        if best is None:
+            i += 1
+        else:
+            loops.append(best)
+            i += best[1] * best[2]
+    return loops
+
+
+class _Compiler:
+    """Перевод шагов и сценариев в один массив кода.
+
+    Подпрограммы (call) компилируются по одному разу и кладутся после
+    основного кода, за OP_HALT; адреса вызовов дописываются в конце.
+    """
+
+    def __init__(self, button_of, key_of, macro_of, loops, marks=None):
+        self.code = array("i")
+        self.consts = _Consts()
+        self.emit = self.code.extend
+        self.button_of = button_of
+        self.key_of = key_of
+        self.macro_of = macro_of
+        self.loops = loops
+        self.marks = marks
+        self.regs = {}          # имя переменной → номер регистра
+        self.subs = {}          # имя макроса → адрес подпрограммы
+        self.calls = []         # (позиция адреса в коде, имя макроса)
+        self._buttons = {}
+        self._keys = {}
+
+    def button(self, name):
+        if name not in self._buttons:
+            self._buttons[name] = self.consts.add(self.button_of(name))
+        return self._buttons[name]
+
+    def key(self, name):
+        if name not in self._keys:
+            self._keys[name] = self.consts.add(self.key_of(name))
+        return self._keys[name]
+
+    def reg(self, name=None):
+        """Номер регистра переменной; без имени — скрытый счётчик цикла"""
+        if name is None:
+            name = f"#{len(self.regs)}"
+        if name not in self.regs:
+            self.regs[name] = len(self.regs)
+        return self.regs[name]
+
+    def here(self) -> int:
+        return len(self.code)
+
+    # ── Шаги конструктора ──
+
+    def steps(self, steps, index=None):
+        """index — номера шагов в исходном списке (для сообщений об ошибках)"""
+        emit, consts = self.emit, self.consts
+        runs = {start: (size, count) for start, size, count in find_loops(steps)} if self.loops else {}
+        loop_end = body = -1
+        n = 0
+        while n < len(steps):
+            if n in runs:
+                size, count = runs[n]
+                emit((OP_LOOP, count))
+                body = self.here()
+                loop_end = n + size
+            step = steps[n]
+            n += 1
+            num = index[n - 1] + 1 if index is not None else n
+            t = step.get("type")
+            if self.marks is not None and index is not None:
+                emit((OP_MARK, self.marks[index[n - 1]]))
+            try:
+                if t == "move":
+                    emit((OP_MOVE, consts.add((int(step["x"]), int(step["y"])))))
+                elif t == "delay":
+                    emit((OP_DELAY, int(step["delay"])))
+                elif t == "click":
+                    self.click(int(step["x"]), int(step["y"]), step.get("button", "left"),
+                               int(step.get("hold", -1)))
+                elif t == "key":
+                    self.key_tap(step["key"], int(step.get("hold", -1)))
+                elif t == "drag":
+                    self.drag(*(int(step[k]) for k in ("x1", "y1", "x2", "y2")),
+                              int(step.get("duration", -1)))
+                elif t == "curve":
+                    at = cubic_at((step["x1"], step["y1"]), (step["cx1"], step["cy1"]),
+                                  (step["cx2"], step["cy2"]), (step["x"], step["y"]))
+                    emit((OP_CURVE, consts.add((at, step.get("duration", 0) / 1000))))
+                elif t in ("mouse_down", "mouse_up"):
+                    emit((OP_MOUSE_DOWN if t == "mouse_down" else OP_MOUSE_UP,
+                          consts.add((int(step["x"]), int(step["y"]))),
+                          self.button(step.get("button", "left"))))
+                elif t in ("key_down", "key_up"):
+                    emit((OP_KEY_DOWN if t == "key_down" else OP_KEY_UP, self.key(step["key"])))
+                elif t == "script":
+                    self.block(parse_script(step["source"]))
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"шаг {num} ({t}): неверное поле {e}") from None
+            except ValueError as e:
+                raise ValueError(f"шаг {num} ({t}): {e}") from None
+            if n == loop_end:
+                emit((OP_NEXT, body))
+                n += size * (count - 1)
+                loop_end = -1
+
+    def click(self, x, y, name, hold):
+        self.emit((OP_CLICK, self.consts.add((x, y)), self.button(name), hold,
+                   self.consts.add(f"Клик {name} в ({x}, {y})")))
+
+    def key_tap(self, name, hold):
+        self.emit((OP_KEY, self.key(name), hold, self.consts.add(f"Клавиша [{name}]")))
+
+    def drag(self, x1, y1, x2, y2, duration):
+        self.emit((OP_DRAG, x1, y1, x2, y2, duration,
+                   self.consts.add(f"Drag ({x1},{y1})→({x2},{y2})")))
+
+    # ── Сценарии ──
+
+    def block(self, body):
+        emit = self.emit
+        for node in body:
+            cmd, line = node[0], node[1]
+            if cmd == "set":
+                self.expr(node[3])
+                emit((OP_STORE, self.reg(node[2])))
+            elif cmd == "repeat":
+                r = self.reg()
+                self.expr(node[2])
+                emit((OP_STORE, r))
+                top = self.here()
+                emit((OP_DECJZ, r, 0))
+                fix = self.here() - 1
+                self.block(node[3])
+                emit((OP_JMP, top))
+                self.code[fix] = self.here()
+            elif cmd == "while":
+                top = self.here()
+                self.expr(node[2])
+                emit((OP_JZ, 0))
+                fix = self.here() - 1
+                self.block(node[3])
+                emit((OP_JMP, top))
+                self.code[fix] = self.here()
+            elif cmd == "if":
+                self.expr(node[2])
+                emit((OP_JZ, 0))
+                fix = self.here() - 1
+                self.block(node[3])
+                if node[4]:
+                    emit((OP_JMP, 0))
+                    self.code[fix] = self.here()
+                    fix = self.here() - 1
+                    self.block(node[4])
+                self.code[fix] = self.here()
+            elif cmd == "call":
+                name = node[2]
+                if self.macro_of is None or self.macro_of(name) is None:
+                    raise ValueError(f"строка {line}: нет сохранённого макроса {name}")
+                emit((OP_CALL, 0))
+                self.calls.append((self.here() - 1, name))
+            else:
+                self.action(cmd, node[2:])
+
+    def action(self, cmd, args):
+        emit, consts = self.emit, self.consts
+        values = [_literal(a) if isinstance(a, ast.AST) else a for a in args]
+        static = all(v is not None for v in values)
+        if cmd == "wait":
+            if static:
+                emit((OP_DELAY, values[0]))
+            else:
+                self.expr(args[0])
+                emit((OP_DELAY_S,))
+        elif cmd == "move":
+            if static:
+                emit((OP_MOVE, consts.add(tuple(values))))
+            else:
+                self.exprs(args)
+                emit((OP_MOVE_S,))
+        elif cmd == "click":
+            x, y, name, *hold = args
+            if static:
+                self.click(values[0], values[1], name, values[3] if hold else -1)
+            else:
+                self.exprs((x, y))
+                if hold:
+                    self.expr(hold[0])
+                else:
+                    emit((OP_PUSH, -1))
+                emit((OP_CLICK_S, self.button(name), consts.add(f"Клик {name} (сценарий)")))
+        elif cmd in ("down", "up"):
+            x, y, name = args
+            down = cmd == "down"
+            if static:
+                emit((OP_MOUSE_DOWN if down else OP_MOUSE_UP,
+                      consts.add((values[0], values[1])), self.button(name)))
+            else:
+                self.exprs((x, y))
+                emit((OP_MOUSE_DOWN_S if down else OP_MOUSE_UP_S, self.button(name)))
+        elif cmd == "drag":
+            if static:
+                self.drag(*values[:4], values[4] if len(values) > 4 else -1)
+            else:
+                self.exprs(args)
+                if len(args) < 5:
+                    emit((OP_PUSH, -1))
+                emit((OP_DRAG_S, consts.add("Drag (сценарий)")))
+        elif cmd == "key":
+            name, *hold = args
+            if static:
+                self.key_tap(name, values[1] if hold else -1)
+            else:
+                self.expr(hold[0])
+                emit((OP_KEY_S, self.key(name), consts.add(f"Клавиша [{name}]")))
+        else:
+            emit((OP_KEY_DOWN if cmd == "keydown" else OP_KEY_UP, self.key(args[0])))
+
+    def exprs(self, nodes):
+        for node in nodes:
+            self.expr(node)
+
+    def expr(self, node):
+        """Выражение → операции стековой машины, результат — на вершине стека"""
+        emit = self.emit
+        value = _literal(node)
+        if value is not None:
+            emit((OP_PUSH, value))
+        elif isinstance(node, ast.Name):
+            if node.id == NAME_ELAPSED:
+                emit((OP_ELAPSED,))
+            else:
+                emit((OP_LOAD, self.reg(node.id)))
+        elif isinstance(node, ast.BinOp):
+            self.exprs((node.left, node.right))
+            emit((OP_BIN, _BIN_OF[type(node.op)]))
+        elif isinstance(node, ast.Compare):
+            self.exprs((node.left, node.comparators[0]))
+            emit((OP_BIN, _BIN_OF[type(node.ops[0])]))
+        elif isinstance(node, ast.BoolOp):
+            self.expr(node.values[0])
+            for v in node.values[1:]:
+                self.expr(v)
+                emit((OP_BIN, _BIN_OF[type(node.op)]))
+        elif isinstance(node, ast.UnaryOp):
+            self.expr(node.operand)
+            if isinstance(node.op, ast.USub):
+                emit((OP_NEG,))
+            elif isinstance(node.op, ast.Not):
+                emit((OP_PUSH, 0, OP_BIN, BIN_EQ))
+        elif isinstance(node, ast.Call):
+            self.exprs(node.args)
+            emit((OP_RAND,))
+
+    def lanes(self, steps) -> list:
+        """Скомпилировать шаги по дорожкам; вернуть адреса их начала.
+
+        Каждая дорожка — свой отрезок кода, заканчивающийся OP_HALT;
+        порядок шагов внутри дорожки сохраняется.
+        """
+        groups = {}
+        for i, step in enumerate(steps):
+            lane = step.get("lane", 0)
+            if type(lane) is not int or lane < 0:
+                raise ValueError(f"шаг {i + 1}: номер дорожки должен быть целым ≥ 0")
+            groups.setdefault(lane, ([], []))
+            groups[lane][0].append(step)
+            groups[lane][1].append(i)
+        entries = []
+        for lane in sorted(groups) or [0]:
+            entries.append(self.here())
+            lane_steps, index = groups.get(lane, ([], []))
+            self.steps(lane_steps, index)
+            self.emit((OP_HALT,))
+        return entries
+
+    def finish(self, steps, lanes) -> Program:
+        """Дописать подпрограммы и адреса вызовов"""
+        done = 0
+        while done < len(self.calls):
+            pos, name = self.calls[done]
+            done += 1
+            if name not in self.subs:
+                self.subs[name] = self.here()
+                try:
+                    self.steps(self.macro_of(name))
+                except ValueError as e:
+                    raise ValueError(f"макрос {name}: {e}") from None
+                self.emit((OP_RET,))
+            self.code[pos] = self.subs[name]
+        return Program(self.code, self.consts.items, steps, len(self.regs), tuple(lanes))
+
+
+def _literal(node):
+    """Значение выражения-константы (в том числе отрицательной) или None"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if (isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd))
+            and isinstance(node.operand, ast.Constant)):
+        return -node.operand.value if isinstance(node.op, ast.USub) else node.operand.value
+    return None
+
+
+def compile_steps(steps, button_of, key_of, loops=True, macro_of=None, marks=None) -> Program:
+    """Скомпилировать список шагов.
+
+    button_of(имя) и key_of(имя) возвращают объекты кнопки и клавиши;
+    каждое имя разрешается один раз. loops — сворачивать повторы в циклы.
+    macro_of(имя) — шаги сохранённого макроса или None, для call в
+    сценариях. Шаги с полем "lane" попадают на свою дорожку. Шаги неизвестных типов пропускаются, шаг без обязательного
+    поля или с ошибкой в сценарии — ValueError с номером шага.
+
+    marks — номер для профилировщика каждого шага (например, origins из
+    optimize); с ними перед шагом ставится OP_MARK. Тела call меток не
+    получают, их время идёт шагу-сценарию.
+    """
+    comp = _Compiler(button_of, key_of, macro_of, loops, marks)
+    return comp.finish(len(steps), comp.lanes(steps))
+
+
+class _Lane:
+    """Состояние дорожки между пробуждениями"""
+
+    __slots__ = ("pc", "due", "stack", "calls", "loops", "sp", "resume", "curve",
+                 "step", "since", "lag")
+
+    def __init__(self, pc: int, due: int):
+        self.pc = pc                # -1 — дорожка закончилась
+        self.due = due              # плановый момент следующего пробуждения
+        self.stack = []
+        self.calls = []
+        self.loops = [0] * LOOP_DEPTH
+        self.sp = -1
+        self.resume = None          # удержание: (устройство, объект, вид действия, строка)
+        self.curve = None           # кривая в работе: (at, начало, длительность нс)
+        # Профилировщик: открытый шаг, начало замера его работы (0 — замер
+        # на паузе) и отставание от плана на его старте
+        self.step = -1
+        self.since = 0
+        self.lag = 0
+
+
+class MacroVM:
+    """Исполнитель скомпилированного макроса по абсолютной шкале времени.
+
+    Каждая пауза и удержание ждут до момента «начало + сумма плановых
+    длительностей», а не «после предыдущего шага», поэтому время на сами
+    действия не накапливается в сдвиг. speed — множитель скорости: плановые
+    длительности делятся на него.
+
+    Дорожки (шаги с полем "lane") идут одновременно в одном потоке: очередь
+    с приоритетом по плановому моменту будит ту дорожку, чей момент раньше,
+    и та выполняется до своей следующей паузы. Удержания и кривые тоже
+    отдают очередь, поэтому дорожки не задерживают друг друга; перетаскивание
+    выполняется целиком.
+
+    mouse, kb — контроллеры pynput; tap_key(клавиша) — нажатие с настройками
+    приложения; drag(x1, y1, x2, y2, мс) — перетаскивание, drag_ms — его
+    длительность по умолчанию; on_action(вид, строка) вызывается после клика
+    или клавиши и возвращает True, если воспроизведение пора остановить
+    (лимит действий); on_error(исключение) — ошибка шага, выполнение
+    продолжается. held — нажатые кнопки и клавиши, отпускаются вызывающим.
+    rng — источник rand() сценариев; регистры переменных общие для дорожек
+    и сохраняются между повторами. profile — StepProfile для программ,
+    собранных с метками шагов (compile_steps(..., marks=...)).
+    """
+
+    # Шаг кривой во времени (нс)
+    CURVE_TICK = 1_000_000_000 // STREAM_HZ
+
+    def __init__(self, mouse, kb, tap_key, drag, on_action, on_error, stop, drag_ms=300, rng=None,
+                 profile=None):
+        self.mouse = mouse
+        self.kb = kb
+        self.tap_key = tap_key
+        self.drag = drag
+        self._on_action = on_action
+        self.on_action = self._count_action
+        self.on_error = on_error
+        self.stop = stop
+        self.drag_ms = drag_ms
+        self.rng = rng or random.Random()
+        self.profile = profile
+        self.held = set()
+        self.regs = []
+        self.started = None
+        # Для контрольной точки: номер повтора (задаёт вызывающий) и позиция
+        # последнего пробуждения дорожки — (повтор, шаг, нс от начала
+        # повтора, дорожка, действий в этом пробуждении, нс от начала
+        # воспроизведения, регистры на начало повтора)
+        self.repeat = 0
+        self.at = None
+        self._prog = None
+        self._code = None
+
+    def run(self, prog: Program, start: int, speed: float = 1.0, seek=None):
+        """Выполнить программу один раз с момента start (perf_counter_ns).
+
+        Возвращает плановый момент конца самой длинной дорожки — начало
+        следующего повтора — или None, если воспроизведение остановлено.
+
+        seek — продолжить повтор с позиции (нс от start, дорожка, действий),
+        взятой из at: всё, что было до неё, выполняется «всухую» — без ввода и
+        ожиданий, но с теми же регистрами, удержаниями и позицией курсора,
+        которые затем переносятся на настоящие устройства. Из пробуждения
+        самой позиции пропускается столько действий, сколько уже было
+        сделано. rand() сценариев при перемотке даёт новые значения.
+        """
+        if prog is not self._prog:
+            # Список вместо array: чтение элемента не создаёт новый объект int
+            self._prog, self._code = prog, prog.code.tolist()
+        if len(self.regs) < prog.nregs:
+            self.regs.extend([0] * (prog.nregs - len(self.regs)))
+        if self.started is None:
+            self.started = start
+        stop, wait = self.stop, sleep_until_ns
+        scale = 1_000_000 / speed       # нс плана на мс шага
+        lanes = [_Lane(pc, start) for pc in prog.lanes]
+        queue = [(start, i) for i in range(len(lanes))]
+        end = start
+        base_regs = self.regs[:]
+        if self.profile is not None:
+            self.profile.base = start
+        rewind = _Rewind(self) if seek is not None else None
+        try:
+            while queue:
+                due, i = queue[0]
+                if rewind is not None and not rewind.opened:
+                    here, target = (due - start, i), tuple(seek[:2])
+                    if here > target or (here == target and not seek[2]):
+                        rewind.open()
+                    elif here == target:
+                        rewind.skip = seek[2]
+                if (rewind is None or rewind.opened) and not wait(due, stop):
+                    return None
+                lane = lanes[i]
+                self.at = (self.repeat, lane.step, due - start, i, 0, due - self.started, base_regs)
+                prof = self.profile
+                if prof is None:
+                    if not self._exec(lane, scale, speed):
+                        return None
+                else:
+                    # Отпускание удержания и такты кривой — работа открытого шага
+                    if lane.resume is not None or lane.curve is not None:
+                        prof.resume(lane, now_ns())
+                    if not self._exec(lane, scale, speed):
+                        return None
+                    prof.leave(lane, now_ns(), lane.due if lane.pc < 0 else None)
+                if lane.pc < 0:
+                    heapq.heappop(queue)
+                    end = max(end, lane.due)
+                else:
+                    heapq.heapreplace(queue, (lane.due, i))
+            if rewind is not None and not rewind.opened:
+                # Позиция за концом повтора: состояние переходит в следующий
+                rewind.open()
+        finally:
+            if rewind is not None:
+                rewind.close()
+        return end
+
+    def _count_action(self, act, msg):
+        """Учёт действия в позиции at, затем on_action вызывающего"""
+        at = self.at
+        if at is not None:
+            self.at = at[:4] + (at[4] + 1,) + at[5:]
+        return self._on_action(act, msg)
+
+    def _exec(self, lane: _Lane, scale: float, speed: float) -> bool:
+        """Выполнять дорожку до её следующей паузы; False — остановлено"""
+        code, consts, size = self._code, self._prog.consts, OP_SIZE
+        mouse, kb, held, regs = self.mouse, self.kb, self.held, self.regs
+        stop, on_action = self.stop, self.on_action
+        pc, due, sp, loops = lane.pc, lane.due, lane.sp, lane.loops
+        stack, calls = lane.stack, lane.calls
+        push, pop = stack.append, stack.pop
+
+        if lane.resume is not None:
+            dev, obj, act, msg = lane.resume
+            lane.resume = None
+            dev.release(obj)
+            held.discard(obj)
+            if on_action(act, msg):
+                return False
+        if lane.curve is not None:
+            at, t0, length = lane.curve
+            f = (now_ns() - t0) / length
+            if f < 1.0:
+                mouse.position = at(f)
+                lane.due = min(due + self.CURVE_TICK, t0 + length)
+                return True
+            mouse.position = at(1.0)
+            lane.curve = None
+            due = t0 + length
+
+        end = len(code)
+        while pc < end:
+            if stop.is_set():
+                return False
+            op = code[pc]
+            nxt = pc + size[op]
+            try:
+                if op == OP_MOVE:
+                    mouse.position = consts[code[pc + 1]]
+                elif op == OP_DELAY:
+                    lane.pc, lane.due, lane.sp = nxt, due + int(code[pc + 1] * scale), sp
+                    return True
+                elif op == OP_CLICK:
+                    mouse.position = consts[code[pc + 1]]
+                    btn = consts[code[pc + 2]]
+                    hold = code[pc + 3]
+                    if hold >= 0:
+                        mouse.press(btn)
+                        held.add(btn)
+                        lane.resume = (mouse, btn, ACT_CLICK, consts[code[pc + 4]])
+                        lane.pc, lane.due, lane.sp = nxt, due + int(hold * scale), sp
+                        return True
+                    mouse.click(btn)
+                    if on_action(ACT_CLICK, consts[code[pc + 4]]):
+                        return False
+                elif op == OP_KEY:
+                    key = consts[code[pc + 1]]
+                    hold = code[pc + 2]
+                    if hold >= 0:
+                        kb.press(key)
+                        held.add(key)
+                        lane.resume = (kb, key, ACT_KEY, consts[code[pc + 3]])
+                        lane.pc, lane.due, lane.sp = nxt, due + int(hold * scale), sp
+                        return True
+                    self.tap_key(key)
+                    if on_action(ACT_KEY, consts[code[pc + 3]]):
+                        return False
+                elif op == OP_CURVE:
+                    at, duration = consts[code[pc + 1]]
+                    length = int(duration * 1000 * scale)
+                    if length > 0:
+                        mouse.position = at(0.0)
+                        lane.curve = (at, due, length)
+                        lane.pc, lane.due, lane.sp = nxt, min(due + self.CURVE_TICK, due + length), sp
+                        return True
+                    mouse.position = at(1.0)
+                elif op == OP_DRAG:
+                    d = code[pc + 5]
+                    if d < 0:
+                        d = self.drag_ms
+                    self.drag(code[pc + 1], code[pc + 2], code[pc + 3], code[pc + 4], d / speed)
+                    due += int(d * scale)
+                    if on_action(ACT_CLICK, consts[code[pc + 6]]):
+                        return False
+                elif op == OP_MOUSE_DOWN:
+                    btn = consts[code[pc + 2]]
+                    mouse.position = consts[code[pc + 1]]
+                    mouse.press(btn)
+                    held.add(btn)
+                    if on_action(ACT_CLICK, None):
+                        return False
+                elif op == OP_MOUSE_UP:
+                    btn = consts[code[pc + 2]]
+                    mouse.position = consts[code[pc + 1]]
+                    mouse.release(btn)
+                    held.discard(btn)
+                elif op == OP_KEY_DOWN:
+                    key = consts[code[pc + 1]]
+                    kb.press(key)
+                    held.add(key)
+                    if on_action(ACT_KEY, None):
+                        return False
+                elif op == OP_KEY_UP:
+                    key = consts[code[pc + 1]]
+                    kb.release(key)
+                    held.discard(key)
+                elif op == OP_LOOP:
+                    sp += 1
+                    loops[sp] = code[pc + 1]
+                elif op == OP_NEXT:
+                    loops[sp] -= 1
+                    if loops[sp] > 0:
+                        nxt = code[pc + 1]
+                    else:
+                        sp -= 1
+                elif op == OP_PUSH:
+                    push(code[pc + 1])
+                elif op == OP_LOAD:
+                    push(regs[code[pc + 1]])
+                elif op == OP_STORE:
+                    regs[code[pc + 1]] = pop()
+                elif op == OP_DECJZ:
+                    r = code[pc + 1]
+                    if regs[r] <= 0:
+                        nxt = code[pc + 2]
+                    else:
+                        regs[r] -= 1
+                elif op == OP_JZ:
+                    if not pop():
+                        nxt = code[pc + 1]
+                elif op == OP_JMP:
+                    nxt = code[pc + 1]
+                elif op == OP_BIN:
+                    b = pop()
+                    push(_binary(code[pc + 1], pop(), b))
+                elif op == OP_DELAY_S:
+                    lane.pc, lane.due, lane.sp = nxt, due + int(pop() * scale), sp
+                    return True
+                elif op == OP_MOVE_S:
+                    y = pop()
+                    mouse.position = (pop(), y)
+                elif op == OP_CLICK_S:
+                    hold = pop()
+                    y = pop()
+                    mouse.position = (pop(), y)
+                    btn = consts[code[pc + 1]]
+                    if hold >= 0:
+                        mouse.press(btn)
+                        held.add(btn)
+                        lane.resume = (mouse, btn, ACT_CLICK, consts[code[pc + 2]])
+                        lane.pc, lane.due, lane.sp = nxt, due + int(hold * scale), sp
+                        return True
+                    mouse.click(btn)
+                    if on_action(ACT_CLICK, consts[code[pc + 2]]):
+                        return False
+                elif op == OP_KEY_S:
+                    hold = pop()
+                    key = consts[code[pc + 1]]
+                    if hold >= 0:
+                        kb.press(key)
+                        held.add(key)
+                        lane.resume = (kb, key, ACT_KEY, consts[code[pc + 2]])
+                        lane.pc, lane.due, lane.sp = nxt, due + int(hold * scale), sp
+                        return True
+                    self.tap_key(key)
+                    if on_action(ACT_KEY, consts[code[pc + 2]]):
+                        return False
+                elif op == OP_RAND:
+                    b = pop()
+                    a = pop()
+                    push(self.rng.randint(min(a, b), max(a, b)))
+                elif op == OP_ELAPSED:
+                    push((now_ns() - self.started) // 1_000_000)
+                elif op == OP_NEG:
+                    push(-pop())
+                elif op == OP_CALL:
+                    if len(calls) >= CALL_DEPTH:
+                        raise RuntimeError("слишком глубокая вложенность call")
+                    calls.append(nxt)
+                    nxt = code[pc + 1]
+                elif op == OP_RET:
+                    nxt = calls.pop()
+                elif op == OP_HALT:
+                    break
+                elif op == OP_MARK:
+                    if self.profile is not None:
+                        self.profile.enter(lane, code[pc + 1], due, now_ns())
+                    else:
+                        lane.step = code[pc + 1]
+                elif op == OP_DRAG_S:
+                    d = pop()
+                    y2, x2, y1, x1 = pop(), pop(), pop(), pop()
+                    if d < 0:
+                        d = self.drag_ms
+                    self.drag(x1, y1, x2, y2, d / speed)
+                    due += int(d * scale)
+                    if on_action(ACT_CLICK, consts[code[pc + 1]]):
+                        return False
+                elif op == OP_MOUSE_DOWN_S or op == OP_MOUSE_UP_S:
+                    btn = consts[code[pc + 1]]
+                    y = pop()
+                    mouse.position = (pop(), y)
+                    if op == OP_MOUSE_DOWN_S:
+                        mouse.press(btn)
+                        held.add(btn)
+                        if on_action(ACT_CLICK, None):
+                            return False
+                    else:
+                        mouse.release(btn)
+                        held.discard(btn)
+            except Exception as e:
+                self.on_error(e)
+            pc = nxt
+        lane.pc, lane.due = -1, due
+        return True
+
+
+class _Gate:
+    """Устройство на время перемотки: пока закрыто — только запоминает
+    позицию курсора и нажатое, после open() — передаёт всё настоящему"""
+
+    def __init__(self, dev):
+        self.dev = dev
+        self.live = False
+        self.pressed = set()
+        self._pos = None
+
+    @property
+    def position(self):
+        return self.dev.position if self.live else self._pos
+
+    @position.setter
+    def position(self, pos):
+        if self.live:
+            self.dev.position = pos
+        else:
+            self._pos = pos
+
+    def click(self, obj):
+        if self.live:
+            self.dev.click(obj)
+
+    def press(self, obj):
+        if self.live:
+            self.dev.press(obj)
+        else:
+            self.pressed.add(obj)
+
+    def release(self, obj):
+        if self.live:
+            self.dev.release(obj)
+        else:
+            self.pressed.discard(obj)
+
+    def open(self):
+        self.live = True
+        if self._pos is not None:
+            self.dev.position = self._pos
+        for obj in self.pressed:
+            self.dev.press(obj)
+
+
+class _Rewind:
+    """Перемотка повтора до контрольной точки через шлюзы ввода.
+
+    Подменяет ввод исполнителя: пока шлюз закрыт, нажатия, перетаскивания
+    и действия не выполняются и не учитываются. skip > 0 — открыть шлюз
+    после стольких действий (они уже были сделаны до остановки). Шлюз
+    открывается посреди пробуждения, поэтому удержания дорожек, начатые
+    при перемотке, отпускаются уже на настоящем устройстве.
+    """
+
+    def __init__(self, vm: "MacroVM"):
+        self.vm = vm
+        self.opened = False
+        self.skip = 0
+        self.skipped = 0
+        self._live = (vm.mouse, vm.kb, vm.tap_key, vm.drag, vm.on_action, vm.profile)
+        self.mouse, self.kb = _Gate(vm.mouse), _Gate(vm.kb)
+        vm.mouse, vm.kb = self.mouse, self.kb
+        vm.tap_key, vm.drag, vm.on_action = self.tap_key, self.drag, self.on_action
+        vm.profile = None
+
+    def tap_key(self, key):
+        if self.opened:
+            self._live[2](key)
+
+    def drag(self, *args):
+        if self.opened:
+            self._live[3](*args)
+
+    def on_action(self, act, msg):
+        if self.opened:
+            return self._live[4](act, msg)
+        if self.skip > 0:
+            self.skipped += 1
+            if self.skipped == self.skip:
+                self.open()
+                at = self.vm.at
+                self.vm.at = at[:4] + (self.skipped,) + at[5:]
+        return False
+
+    def open(self):
+        self.opened = True
+        self.mouse.open()
+        self.kb.open()
+        self.vm.profile = self._live[5]
+
+    def close(self):
+        vm = self.vm
+        vm.mouse, vm.kb, vm.tap_key, vm.drag, vm.on_action, vm.profile = self._live
+
+
+class StepProfile:
+    """Профиль воспроизведения по шагам, накопленный за все повторы.
+
+    Для шага: hits — сколько раз он начинался, planned/actual — суммы
+    плановых и фактических моментов начала от начала повтора, cost — время
+    работы шага без ожиданий, slip — на сколько выросло отставание от плана
+    за время шага (перетаскивание дольше плана, позднее пробуждение после
+    паузы). Всё в наносекундах; средние — суммы, делённые на hits.
+    """
+
+    def __init__(self, steps: int):
+        self.steps = steps
+        self.hits = [0] * steps
+        self.planned = [0] * steps
+        self.actual = [0] * steps
+        self.cost = [0] * steps
+        self.cost_max = [0] * steps
+        self.slip = [0] * steps
+        self.slip_max = [0] * steps
+        self.base = 0           # начало текущего повтора (perf_counter_ns)
+
+    def enter(self, lane: _Lane, step: int, due: int, t: int):
+        """Начало шага step на дорожке lane в момент t при плановом due"""
+        self.leave(lane, t, due)
+        self.hits[step] += 1
+        self.planned[step] += due - self.base
+        self.actual[step] += t - self.base
+        lane.step, lane.since, lane.lag = step, t, t - due
+
+    def leave(self, lane: _Lane, t: int, due=None):
+        """Остановить замер работы шага; с due — закрыть шаг и учесть slip"""
+        step = lane.step
+        if step < 0:
+            return
+        if lane.since:
+            cost = t - lane.since
+            self.cost[step] += cost
+            if cost > self.cost_max[step]:
+                self.cost_max[step] = cost
+            lane.since = 0
+        if due is not None:
+            slip = t - due - lane.lag
+            self.slip[step] += slip
+            if slip > self.slip_max[step]:
+                self.slip_max[step] = slip
+            lane.step = -1
+
+    def resume(self, lane: _Lane, t: int):
+        if lane.step >= 0:
+            lane.since = t
+
+    def rows(self):
+        """(шаг, повторов, план мс, факт мс, отставание мс, slip мс, slip макс,
+        работа мс, работа макс) — средние по повторам, для шагов, что исполнялись"""
+        for i in range(self.steps):
+            n = self.hits[i]
+            if not n:
+                continue
+            planned, actual = self.planned[i] / n / 1e6, self.actual[i] / n / 1e6
+            yield (i, n, planned, actual, actual - planned,
+                   self.slip[i] / n / 1e6, self.slip_max[i] / 1e6,
+                   self.cost[i] / n / 1e6, self.cost_max[i] / 1e6)
+
+
+def _binary(f, a, b):
+    """Двухместная операция сценария над целыми; деление на ноль даёт 0"""
+    if f == BIN_ADD:
+        return a + b
+    if f == BIN_SUB:
+        return a - b
+    if f == BIN_MUL:
+        return a * b
+    if f == BIN_DIV:
+        return a // b if b else 0
+    if f == BIN_MOD:
+        return a % b if b else 0
+    if f == BIN_LT:
+        return int(a < b)
+    if f == BIN_LE:
+        return int(a <= b)
+    if f == BIN_GT:
+        return int(a > b)
+    if f == BIN_GE:
+        return int(a >= b)
+    if f == BIN_EQ:
+        return int(a == b)
+    if f == BIN_NE:
+        return int(a != b)
+    if f == BIN_AND:
+        return int(bool(a and b))
+    return int(bool(a or b))
+
+
+# ── Запуск как модуля ─────────────────────────────────────────────────────────
+
+class _Null:
+    """Контроллер-заглушка для замера: принимает позицию и нажатия"""
+
+    position = (0, 0)
+
+    def click(self, b):
+        pass
+
+    def press(self, b):
+        pass
+
+    def release(self, b):
+        pass
+
+
+class _Never:
+    """Событие остановки, которое не наступает"""
+
+    @staticmethod
+    def is_set():
+        return False
+
+    @staticmethod
+    def wait(timeout):
+        time.sleep(timeout)
+        return False
+
+
+def _synthetic(n):
+    """n шагов: перемещения, клики и клавиши.
+
+    Пауз нет: time.sleep(0) — системный вызов, он заслонил бы разницу.
+    """
+    steps = []
+    for i in range(n):
+        r = i % 10
+        if r < 7:
+            steps.append({"type": "move", "x": i % 1920, "y": i % 1080})
+        elif r < 8:
+            steps.append({"type": "click", "x": 500 + r, "y": 400, "button": "left"})
+        else:
+            steps.append({"type": "key", "key": "space"})
+    return steps
+
+
+def _dict_interpreter(steps, mouse, kb, log):
+    """Разбор шагов-словарей на каждом шаге — как до компиляции"""
+    btn_map = {"left": "L", "right": "R", "middle": "M"}
+    for step in steps:
+        t = step["type"]
+        if t == "click":
+            mouse.position = (step["x"], step["y"])
+            btn = btn_map.get(step.get("button", "left"), "L")
+            mouse.click(btn)
+            log(f"Клик {step.get('button', 'left')} в ({step['x']}, {step['y']})")
+        elif t == "key":
+            kb.press(step["key"].lower())
+            kb.release(step["key"].lower())
+            log(f"Клавиша [{step['key']}]")
+        elif t == "delay":
+            time.sleep(step["delay"] / 1000)
+        elif t == "move":
+            mouse.position = (step["x"], step["y"])
+            log(f"Переместить в ({step['x']}, {step['y']})")
+
+
+def _bench(n):
+    steps = _synthetic(n)
+    mouse, kb = _Null(), _Null()
+    log = [].append
+
+    t0 = time.perf_counter()
+    _dict_interpreter(steps, mouse, kb, log)
+    ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    prog = compile_steps(steps, str.upper, str.lower)
+    comp = time.perf_counter() - t0
+
+    def tap(key):
+        kb.press(key)
+        kb.release(key)
+
+    vm = MacroVM(mouse, kb, tap, None, lambda act, msg: log(msg), print, _Never)
+    t0 = time.perf_counter()
+    vm.run(prog, now_ns())
+    run = time.perf_counter() - t0
+
+    print(f"шагов: {n}, код: {len(prog.code)} int, констант: {len(prog.consts)}")
+    print(f"словари:    {ref:.3f} с  ({n / ref:,.0f} оп/с)")
+    print(f"компиляция: {comp:.3f} с")
+    print(f"ВМ:         {run:.3f} с  ({n / run:,.0f} оп/с, ×{ref / run:.1f})")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m utils.macro",
+                                 description="Замер интерпретатора макросов Mouse Ops")
+    ap.add_argument("--bench", type=int, metavar="N", default=200_000,
+                    help="число синтетических шагов")
+    args = ap.parse_args(argv)
+    _bench(args.bench)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
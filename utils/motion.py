@@ -0,0 +1,405 @@
+"""Движок траекторий курсора: кривая Безье, минимальный рывок, пружина"""
+
+import math
+import time
+import random
+from functools import lru_cache
+
+
+MOTION_MODELS = ("bezier", "min_jerk", "spring")
+
+# Пружина интегрируется на нормированном времени T = 1:
+# ω·T = 9 — за это время критически задемпфированная пружина успокаивается
+SPRING_OMEGA = 9.0
+SPRING_DT = 1.0 / 512
+
+# Частота выдачи точек потоковой траектории по умолчанию (Гц)
+STREAM_HZ = 250
+
+
+def _min_jerk(t: float) -> float:
+    """Профиль минимального рывка: s(t) = 10t³ − 15t⁴ + 6t⁵"""
+    return t * t * t * (10 - 15 * t + 6 * t * t)
+
+
+class _Spring:
+    """Пружина x'' = ω²(1 − x) − 2ζωx', интегрируемая фиксированным шагом.
+
+    Полунеявный метод Эйлера с шагом SPRING_DT. Состояние продвигается
+    только вперёд по мере запроса, поэтому память не зависит от длины пути.
+    При ζ = 1 пружина критически задемпфирована, при ζ < 1 — проскакивает цель.
+    """
+
+    __slots__ = ("k", "c", "x", "v", "t")
+
+    def __init__(self, zeta: float):
+        self.k = SPRING_OMEGA * SPRING_OMEGA * SPRING_DT
+        self.c = 2.0 * zeta * SPRING_OMEGA * SPRING_DT
+        self.x = self.v = self.t = 0.0
+
+    def at(self, f: float) -> float:
+        """Прогресс в момент f ∈ [0, 1] (f не должен убывать)"""
+        if f >= 1.0:
+            return 1.0
+        k, c, x, v, t = self.k, self.c, self.x, self.v, self.t
+        while t < f:
+            v += k * (1.0 - x) - c * v
+            x += v * SPRING_DT
+            t += SPRING_DT
+        self.x, self.v, self.t = x, v, t
+        return x
+
+
+@lru_cache(maxsize=256)
+def progress_table(model: str, n: int, zeta: float = 1.0) -> tuple:
+    """Таблица прогресса s(i/n), i = 0..n, для модели движения (кешируется)"""
+    n = max(1, n)
+    if model == "min_jerk":
+        return tuple(_min_jerk(i / n) for i in range(n + 1))
+    if model == "spring":
+        spring = _Spring(zeta)
+        return tuple(spring.at(i / n) for i in range(n + 1))
+    return tuple(i / n for i in range(n + 1))
+
+
+def paced(at, duration, hz=STREAM_HZ):
+    """Выдавать точки at(f) в реальном времени, f — доля прошедшего duration (сек).
+
+    Перед каждой точкой генератор спит до её момента, а если потребитель
+    отстал — берёт точку по фактически прошедшему времени, пропуская
+    устаревшие. Последняя точка — всегда at(1.0), не позже duration.
+    """
+    step = 1.0 / max(1, hz)
+    start = due = time.perf_counter()
+    while duration > 0:
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+            now = due
+        f = (now - start) / duration
+        if f >= 1.0:
+            break
+        yield at(f)
+        due += step
+    yield at(1.0)
+
+
+def cubic_at(p0, p1, p2, p3):
+    """Функция положения f → (x, y) на кубической кривой Безье"""
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = p0, p1, p2, p3
+
+    def at(f):
+        u = 1 - f
+        a, b, c, d = u * u * u, 3 * u * u * f, 3 * u * f * f, f * f * f
+        return (int(round(a * x0 + b * x1 + c * x2 + d * x3)),
+                int(round(a * y0 + b * y1 + c * y2 + d * y3)))
+    return at
+
+
+class MotionEngine:
+    """Генератор траекторий курсора для выбранной модели движения.
+
+    Параметры имитации (0–10) совпадают со слайдерами вкладки «Имитация».
+    Если humanize выключен, все модели дают прямую равномерную линию.
+    """
+
+    def __init__(self, model="bezier", curviness=5, overshoot=0, speed_var=0,
+                 humanize=True, rng=random):
+        self.model = model if model in MOTION_MODELS else "bezier"
+        self.curviness = curviness
+        self.overshoot = overshoot
+        self.speed_var = speed_var
+        self.humanize = humanize
+        self.rng = rng
+
+    @property
+    def zeta(self) -> float:
+        """Коэффициент демпфирования пружины: перелёт задаётся слайдером overshoot"""
+        return 1.0 - 0.05 * self.overshoot
+
+    def path(self, x1, y1, x2, y2, n=20):
+        """Построить траекторию из n+1 точек от (x1, y1) до (x2, y2)"""
+        n = max(1, n)
+        if not self.humanize:
+            return [(int(x1 + (x2 - x1) * i / n), int(y1 + (y2 - y1) * i / n))
+                    for i in range(n + 1)]
+        if self.model == "bezier":
+            return self._bezier(x1, y1, x2, y2, n)
+        return self._physical(x1, y1, x2, y2, n)
+
+    def iter_path(self, x1, y1, x2, y2, n=20):
+        """То же, что path(), но точки выдаются лениво по одной"""
+        n = max(1, n)
+        at = self._curve(x1, y1, x2, y2)
+        for i in range(n + 1):
+            yield at(i / n)
+        yield from self._iter_tail(x1, y1, x2, y2, n)
+
+    def stream(self, x1, y1, x2, y2, duration, hz=STREAM_HZ):
+        """Потоковая траектория, уложенная во временной бюджет duration (сек).
+
+        Точки выдаются в реальном времени через paced(); хвост перелёта
+        занимает последние 15% бюджета. Последняя точка всегда (x2, y2).
+        Память постоянна при любой дистанции.
+        """
+        dist = math.hypot(x2 - x1, y2 - y1)
+        tail = self.humanize and self.model != "spring" and self.overshoot > 0 and dist > 20
+        main = duration * (0.85 if tail else 1.0)
+        yield from paced(self._curve(x1, y1, x2, y2), main, hz)
+        if not tail:
+            return
+        ox, oy = self._overshoot_point(x2, y2, math.atan2(y2 - y1, x2 - x1), dist)
+
+        def back(f):
+            g = 1 - f * f
+            return (int(x2 + (ox - x2) * g), int(y2 + (oy - y2) * g))
+        yield from paced(back, duration - main, hz)
+
+    def bake(self, segments, n=20, variants=16):
+        """Заранее построить пачку вариантов цикла из отрезков.
+
+        segments — [(x1, y1, x2, y2), ...]; каждый вариант — плоский список
+        точек всех отрезков подряд. В цикле движения остаётся только выбрать
+        вариант и пройти по нему.
+        """
+        table = []
+        for _ in range(variants if self.humanize else 1):
+            pts = []
+            for x1, y1, x2, y2 in segments:
+                pts.extend(self.path(x1, y1, x2, y2, n))
+            table.append(pts)
+        return table
+
+    # ── Модели ────────────────────────────────────────────────────────────────
+
+    def _curve(self, x1, y1, x2, y2):
+        """Функция положения f → (x, y) на нормированном времени f ∈ [0, 1].
+
+        Случайные параметры кривой (контрольные точки, изгиб) выбираются
+        один раз при создании. Для пружины f не должен убывать.
+        """
+        dx, dy = x2 - x1, y2 - y1
+        if not self.humanize:
+            return lambda f: (int(x1 + dx * f), int(y1 + dy * f))
+
+        if self.model == "bezier":
+            c1x, c1y, c2x, c2y = self._control_points(x1, y1, x2, y2)
+            ease = self.speed_var / 10.0
+
+            def at(f):
+                t = f * f * (3 - 2 * f) * ease + f * (1 - ease) if ease > 0 else f
+                u = 1 - t
+                return (int(u**3 * x1 + 3 * u**2 * t * c1x + 3 * u * t**2 * c2x + t**3 * x2),
+                        int(u**3 * y1 + 3 * u**2 * t * c1y + 3 * u * t**2 * c2y + t**3 * y2))
+            return at
+
+        px, py = self._bend(x1, y1, x2, y2)
+        progress = _Spring(self.zeta).at if self.model == "spring" else _min_jerk
+        sin, pi = math.sin, math.pi
+
+        def at(f):
+            s = progress(min(f, 1.0))
+            b = sin(pi * min(s, 1.0))
+            return (int(x1 + dx * s + px * b), int(y1 + dy * s + py * b))
+        return at
+
+    def _control_points(self, x1, y1, x2, y2):
+        rng = self.rng
+        dist = math.hypot(x2 - x1, y2 - y1)
+        strength = dist * 0.3 * (self.curviness / 5.0)
+        perp = math.atan2(y2 - y1, x2 - x1) + math.pi / 2
+        d1 = rng.uniform(-strength, strength)
+        d2 = rng.uniform(-strength, strength)
+        return (x1 + (x2 - x1) * 0.33 + d1 * math.cos(perp),
+                y1 + (y2 - y1) * 0.33 + d1 * math.sin(perp),
+                x1 + (x2 - x1) * 0.66 + d2 * math.cos(perp),
+                y1 + (y2 - y1) * 0.66 + d2 * math.sin(perp))
+
+    def _bend(self, x1, y1, x2, y2):
+        """Боковой изгиб прямой траектории (вектор максимального отклонения)"""
+        dist = math.hypot(x2 - x1, y2 - y1)
+        angle = math.atan2(y2 - y1, x2 - x1)
+        strength = dist * 0.15 * (self.curviness / 5.0)
+        bend = self.rng.uniform(-strength, strength)
+        return -math.sin(angle) * bend, math.cos(angle) * bend
+
+    def _bezier(self, x1, y1, x2, y2, n):
+        c1x, c1y, c2x, c2y = self._control_points(x1, y1, x2, y2)
+        ease = self.speed_var / 10.0
+        pts = []
+        for i in range(n + 1):
+            t = i / n
+            if ease > 0:
+                t = t * t * (3 - 2 * t) * ease + t * (1 - ease)
+            u = 1 - t
+            x = u**3 * x1 + 3 * u**2 * t * c1x + 3 * u * t**2 * c2x + t**3 * x2
+            y = u**3 * y1 + 3 * u**2 * t * c1y + 3 * u * t**2 * c2y + t**3 * y2
+            pts.append((int(x), int(y)))
+        pts.extend(self._iter_tail(x1, y1, x2, y2, n))
+        return pts
+
+    def _physical(self, x1, y1, x2, y2, n):
+        """Минимальный рывок / пружина: профиль скорости из таблицы + боковой изгиб"""
+        px, py = self._bend(x1, y1, x2, y2)
+        dx, dy = x2 - x1, y2 - y1
+        spring = self.model == "spring"
+        prof = progress_table(self.model, n, round(self.zeta, 2) if spring else 1.0)
+        pi = math.pi
+        pts = [(int(x1 + dx * s + px * math.sin(pi * min(s, 1.0))),
+                int(y1 + dy * s + py * math.sin(pi * min(s, 1.0))))
+               for s in prof]
+        pts.extend(self._iter_tail(x1, y1, x2, y2, n))
+        return pts
+
+    def _overshoot_point(self, x2, y2, angle, dist):
+        od = dist * 0.08 * (self.overshoot / 10.0) * self.rng.uniform(0.5, 1.5)
+        return x2 + od * math.cos(angle), y2 + od * math.sin(angle)
+
+    def _iter_tail(self, x1, y1, x2, y2, n):
+        """Проскочить цель и вернуться к ней (хвост траектории).
+
+        У пружины перелёт получается из самой динамики (ζ < 1), хвост не нужен.
+        """
+        dist = math.hypot(x2 - x1, y2 - y1)
+        if (not self.humanize or self.model == "spring"
+                or self.overshoot <= 0 or dist <= 20):
+            return
+        ox, oy = self._overshoot_point(x2, y2, math.atan2(y2 - y1, x2 - x1), dist)
+        m = max(3, int(n * 0.15))
+        for i in range(m):
+            t = i / m
+            yield (int(x2 + (ox - x2) * (1 - t * t)),
+                   int(y2 + (oy - y2) * (1 - t * t)))
+        yield (int(x2), int(y2))
+
+
+# ── Аппроксимация записанного пути кривыми Безье ──────────────────────────────
+
+def _unit(dx, dy):
+    d = math.hypot(dx, dy)
+    return (dx / d, dy / d) if d else (0.0, 0.0)
+
+
+def _bez(b, u):
+    v = 1 - u
+    a0, a1, a2, a3 = v * v * v, 3 * v * v * u, 3 * v * u * u, u * u * u
+    return (a0 * b[0][0] + a1 * b[1][0] + a2 * b[2][0] + a3 * b[3][0],
+            a0 * b[0][1] + a1 * b[1][1] + a2 * b[2][1] + a3 * b[3][1])
+
+
+def _chord_params(pts, first, last):
+    u = [0.0]
+    for i in range(first + 1, last + 1):
+        u.append(u[-1] + math.hypot(pts[i][0] - pts[i - 1][0], pts[i][1] - pts[i - 1][1]))
+    total = u[-1] or 1.0
+    return [x / total for x in u]
+
+
+def _generate(pts, first, last, u, t1, t2):
+    """Контрольные точки методом наименьших квадратов при заданных касательных"""
+    p0, p3 = pts[first], pts[last]
+    c00 = c01 = c11 = x0 = x1 = 0.0
+    for i, ui in enumerate(u):
+        v = 1 - ui
+        b0, b1, b2, b3 = v * v * v, 3 * v * v * ui, 3 * v * ui * ui, ui * ui * ui
+        a1 = (t1[0] * b1, t1[1] * b1)
+        a2 = (t2[0] * b2, t2[1] * b2)
+        c00 += a1[0] * a1[0] + a1[1] * a1[1]
+        c01 += a1[0] * a2[0] + a1[1] * a2[1]
+        c11 += a2[0] * a2[0] + a2[1] * a2[1]
+        px, py = pts[first + i]
+        tx = px - (p0[0] * (b0 + b1) + p3[0] * (b2 + b3))
+        ty = py - (p0[1] * (b0 + b1) + p3[1] * (b2 + b3))
+        x0 += a1[0] * tx + a1[1] * ty
+        x1 += a2[0] * tx + a2[1] * ty
+    det = c00 * c11 - c01 * c01
+    seg = math.hypot(p3[0] - p0[0], p3[1] - p0[1])
+    al1 = (x0 * c11 - x1 * c01) / det if abs(det) > 1e-12 else 0.0
+    al2 = (c00 * x1 - c01 * x0) / det if abs(det) > 1e-12 else 0.0
+    if al1 < 1e-6 * seg or al2 < 1e-6 * seg:
+        al1 = al2 = seg / 3
+    return (p0, (p0[0] + t1[0] * al1, p0[1] + t1[1] * al1),
+            (p3[0] + t2[0] * al2, p3[1] + t2[1] * al2), p3)
+
+
+def _max_error(pts, first, last, bez, u):
+    err, split = 0.0, (first + last) // 2
+    for i, ui in enumerate(u):
+        x, y = _bez(bez, ui)
+        px, py = pts[first + i]
+        d = (x - px) ** 2 + (y - py) ** 2
+        if d > err:
+            err, split = d, first + i
+    return math.sqrt(err), split
+
+
+def _reparameterize(pts, first, bez, u):
+    """Один шаг Ньютона: уточнить параметры точек на кривой"""
+    d1 = [(3 * (bez[i + 1][0] - bez[i][0]), 3 * (bez[i + 1][1] - bez[i][1])) for i in range(3)]
+    d2 = [(2 * (d1[i + 1][0] - d1[i][0]), 2 * (d1[i + 1][1] - d1[i][1])) for i in range(2)]
+    out = []
+    for i, ui in enumerate(u):
+        v = 1 - ui
+        qx, qy = _bez(bez, ui)
+        q1x = v * v * d1[0][0] + 2 * v * ui * d1[1][0] + ui * ui * d1[2][0]
+        q1y = v * v * d1[0][1] + 2 * v * ui * d1[1][1] + ui * ui * d1[2][1]
+        q2x = v * d2[0][0] + ui * d2[1][0]
+        q2y = v * d2[0][1] + ui * d2[1][1]
+        px, py = pts[first + i]
+        num = (qx - px) * q1x + (qy - py) * q1y
+        den = q1x * q1x + q1y * q1y + (qx - px) * q2x + (qy - py) * q2y
+        out.append(min(1.0, max(0.0, ui - num / den)) if den else ui)
+    return out
+
+
+def _fit(pts, first, last, t1, t2, tol, out, depth):
+    if last - first == 1:
+        p0, p3 = pts[first], pts[last]
+        d = math.hypot(p3[0] - p0[0], p3[1] - p0[1]) / 3
+        out.append((first, last, (p0, (p0[0] + t1[0] * d, p0[1] + t1[1] * d),
+                                  (p3[0] + t2[0] * d, p3[1] + t2[1] * d), p3)))
+        return
+    u = _chord_params(pts, first, last)
+    bez = _generate(pts, first, last, u, t1, t2)
+    err, split = _max_error(pts, first, last, bez, u)
+    if err > tol and err < tol * 4:
+        for _ in range(4):
+            u = _reparameterize(pts, first, bez, u)
+            bez = _generate(pts, first, last, u, t1, t2)
+            err, split = _max_error(pts, first, last, bez, u)
+            if err <= tol:
+                break
+    if err <= tol or depth <= 0:
+        out.append((first, last, bez))
+        return
+    split = min(last - 1, max(first + 1, split))
+    tc = _unit(pts[split - 1][0] - pts[split + 1][0], pts[split - 1][1] - pts[split + 1][1])
+    if tc == (0.0, 0.0):
+        tc = _unit(pts[split - 1][0] - pts[split][0], pts[split - 1][1] - pts[split][1])
+    _fit(pts, first, split, t1, tc, tol, out, depth - 1)
+    _fit(pts, split, last, (-tc[0], -tc[1]), t2, tol, out, depth - 1)
+
+
+def fit_cubic(points, tolerance=2.0, max_depth=16):
+    """Аппроксимировать путь кубическими кривыми Безье (алгоритм Шнайдера).
+
+    points — [(t, x, y), ...] по порядку времени. Возвращает список
+    (t0, t1, p0, c1, c2, p3) с точками-кортежами целых координат: кривая
+    проходит через концы участка и отклоняется от исходных точек не больше
+    чем на tolerance пикселей (если хватает глубины разбиения).
+    """
+    src = []
+    for t, x, y in points:
+        if not src or (x, y) != src[-1][1:]:
+            src.append((t, x, y))
+        else:
+            src[-1] = (src[-1][0], x, y)
+    if len(src) < 2:
+        return []
+    pts = [(float(x), float(y)) for _, x, y in src]
+    t1 = _unit(pts[1][0] - pts[0][0], pts[1][1] - pts[0][1])
+    t2 = _unit(pts[-2][0] - pts[-1][0], pts[-2][1] - pts[-1][1])
+    raw = []
+    _fit(pts, 0, len(pts) - 1, t1, t2, max(0.5, tolerance), raw, max_depth)
+    rnd = lambda p: (int(round(p[0])), int(round(p[1])))
+    return [(src[a][0], src[b][0]) + tuple(rnd(p) for p in bez) for a, b, bez in raw]
@@ -0,0 +1,205 @@
+"""Параметрические фигуры движения: выражения x(t)/y(t) и ключевые точки
+
+Формат описания (JSON):
+
+    {
+      "spiral":  {"x": "t * cos(6 * tau * t)", "y": "t * sin(6 * tau * t)",
+                  "points": 180},
+      "zigzag":  {"keyframes": [[-1, -1], [1, -0.5], [-1, 0], [1, 0.5]],
+                  "points": 120, "closed": true}
+    }
+
+t пробегает [0, 1] за points шагов. Координаты нормированы: ±1 — радиус
+движения. Выражения компилируются один раз в вычислитель, который за
+один вызов считает всю таблицу точек; таблицы кешируются по радиусу.
+"""
+
+import ast
+import json
+import math
+
+
+def _tri(x):
+    """Треугольная волна периода 1 со значениями в [-1, 1]"""
+    x = x % 1.0
+    return 4 * x - 1 if x < 0.5 else 3 - 4 * x
+
+
+def _saw(x):
+    """Пилообразная волна периода 1 со значениями в [-1, 1]"""
+    return 2 * (x % 1.0) - 1
+
+
+PATTERN_NAMESPACE = {
+    "pi": math.pi, "tau": 2 * math.pi, "e": math.e,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan, "atan2": math.atan2,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log,
+    "floor": math.floor, "ceil": math.ceil,
+    "abs": abs, "min": min, "max": max,
+    "tri": _tri, "saw": _saw,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.IfExp, ast.Compare,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+MAX_POINTS = 20000
+
+
+BUILTIN_PATTERNS = {
+    "circle":    {"x": "cos(tau * t)", "y": "sin(tau * t)", "points": 60},
+    "eight":     {"x": "sin(tau * t)", "y": "0.6 * sin(2 * tau * t)", "points": 80},
+    "ellipse":   {"x": "cos(tau * t)", "y": "0.5 * sin(tau * t)", "points": 72},
+    "spiral":    {"x": "t * cos(6 * tau * t)", "y": "t * sin(6 * tau * t)", "points": 180},
+    "lissajous": {"x": "sin(3 * tau * t + pi / 2)", "y": "sin(2 * tau * t)", "points": 160},
+    "zigzag":    {"keyframes": [[-1, -1], [1, -0.6], [-1, -0.2], [1, 0.2], [-1, 0.6], [1, 1]],
+                  "points": 120, "closed": True},
+}
+
+
+def _parse_expr(src: str):
+    try:
+        tree = ast.parse(str(src), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"синтаксис: {e.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"недопустимая конструкция: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id != "t" and node.id not in PATTERN_NAMESPACE:
+            raise ValueError(f"неизвестное имя: {node.id}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError("допустимы только числовые константы")
+    return _FloatPow().visit(tree.body)
+
+
+class _FloatPow(ast.NodeTransformer):
+    """a ** b → _pow(a, b), то есть math.pow: степень считается в float и
+    при переполнении сразу даёт OverflowError. Целочисленная ** на
+    выражениях вроде 9 ** 9 ** 9 считала бы число в сотни мегабайт и
+    повесила бы поток Tk."""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Pow):
+            return node
+        return ast.copy_location(ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()),
+                                          args=[node.left, node.right], keywords=[]), node)
+
+
+def compile_expressions(name: str, x_src: str, y_src: str):
+    """Скомпилировать пару выражений в вычислитель T → [(x, y), ...].
+
+    Оба выражения собираются в одно списковое включение по всем t, так что
+    таблица считается одним вызовом без интерпретации описания на каждой точке.
+    """
+    comp = ast.ListComp(
+        elt=ast.Tuple(elts=[_parse_expr(x_src), _parse_expr(y_src)], ctx=ast.Load()),
+        generators=[ast.comprehension(target=ast.Name(id="t", ctx=ast.Store()),
+                                      iter=ast.Name(id="_T", ctx=ast.Load()),
+                                      ifs=[], is_async=0)])
+    tree = ast.fix_missing_locations(ast.Expression(body=comp))
+    code = compile(tree, f"<pattern {name}>", "eval")
+    glb = dict(PATTERN_NAMESPACE, __builtins__={}, _pow=math.pow)
+    return lambda T: eval(code, glb, {"_T": T})
+
+
+def _keyframe_evaluator(keyframes, closed):
+    """Ломаная по ключевым точкам с равномерной скоростью по длине пути"""
+    if not isinstance(keyframes, (list, tuple)):
+        raise ValueError("keyframes — список точек [x, y]")
+    for k in keyframes:
+        if not isinstance(k, (list, tuple)) or len(k) < 2:
+            raise ValueError(f"ключевая точка {k!r}: нужны два числа [x, y]")
+    pts = [(float(k[0]), float(k[1])) for k in keyframes]
+    if len(pts) < 2:
+        raise ValueError("нужно минимум две ключевые точки")
+    if closed:
+        pts.append(pts[0])
+    cum = [0.0]
+    for (ax, ay), (bx, by) in zip(pts, pts[1:]):
+        cum.append(cum[-1] + math.hypot(bx - ax, by - ay))
+    total = cum[-1] or 1.0
+
+    def evaluate(T):
+        out = []
+        seg = 0
+        for t in T:
+            d = t * total
+            while seg < len(cum) - 2 and cum[seg + 1] < d:
+                seg += 1
+            (ax, ay), (bx, by) = pts[seg], pts[seg + 1]
+            span = cum[seg + 1] - cum[seg]
+            f = (d - cum[seg]) / span if span else 0.0
+            out.append((ax + (bx - ax) * f, ay + (by - ay) * f))
+        return out
+    return evaluate
+
+
+def _scaled(point, radius):
+    """Точка фигуры в пикселях; бесконечность и NaN — ValueError"""
+    x, y = radius * point[0], radius * point[1]
+    if not (math.isfinite(x) and math.isfinite(y)):
+        raise ValueError(f"точка вне конечных значений: ({x}, {y})")
+    return int(x), int(y)
+
+
+class MovementPattern:
+    """Скомпилированная фигура движения с кешем таблиц по радиусу"""
+
+    CACHE_SIZE = 8
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.spec = spec
+        self.points_n = max(2, min(MAX_POINTS, int(spec.get("points", 60))))
+        if "keyframes" in spec:
+            self._eval = _keyframe_evaluator(spec["keyframes"], bool(spec.get("closed")))
+        elif "x" in spec and "y" in spec:
+            self._eval = compile_expressions(name, spec["x"], spec["y"])
+        else:
+            raise ValueError("нужны выражения x/y или keyframes")
+        self._cache = {}
+        self.points(1)  # проверить вычисление сразу, а не в цикле движения
+
+    def points(self, radius: int) -> tuple:
+        """Смещения (dx, dy) одного цикла для радиуса radius"""
+        table = self._cache.get(radius)
+        if table is None:
+            n = self.points_n
+            try:
+                raw = self._eval([i / n for i in range(n + 1)])
+                table = tuple(map(_scaled, raw, [radius] * len(raw)))
+            except (ArithmeticError, TypeError, ValueError) as e:
+                raise ValueError(f"ошибка вычисления: {e}") from None
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[radius] = table
+        return table
+
+
+def build_patterns(specs: dict, errors=None) -> dict:
+    """Скомпилировать словарь описаний; ошибочные пропускаются.
+
+    errors — необязательный список, в который складываются (имя, причина).
+    """
+    patterns = {}
+    for name, spec in specs.items():
+        try:
+            patterns[name] = MovementPattern(name, spec)
+        except (ValueError, TypeError, KeyError, IndexError, ArithmeticError) as e:
+            if errors is not None:
+                errors.append((name, str(e)))
+    return patterns
+
+
+def load_pattern_specs(path: str) -> dict:
+    """Прочитать пользовательские описания фигур из JSON-файла"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("ожидается объект {имя: описание}")
+    return {str(k): v for k, v in data.items() if isinstance(v, dict)}
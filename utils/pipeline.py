@@ -0,0 +1,207 @@
+"""Потоковая обработка записанных событий
+
+Каждый этап — генератор: принимает итерируемое событий (t, kind, x, y, code)
+и выдаёт преобразованные события по одному, поэтому цепочка не держит
+запись в памяти целиком. Этапы собираются в chain() и применимы как к
+буферу записи перед переводом в конструктор, так и к сохранённой записи.
+
+Запуск модуля — обработка файла записи или замер скорости:
+
+    python -m utils.pipeline in.bin out.bin --trim-idle 500 --speed 2
+    python -m utils.pipeline --bench 1000000
+"""
+
+import argparse
+import sys
+import time
+from functools import partial
+
+from .recording import EV_MOVE, EV_CLICK, EV_KEY, EV_BUTTON_UP, EV_KEY_UP
+
+
+MS = 1_000_000
+
+_UP_OF = {EV_CLICK: EV_BUTTON_UP, EV_KEY: EV_KEY_UP}
+
+
+def trim_idle(events, max_gap_ns):
+    """Сжать паузы длиннее max_gap_ns до max_gap_ns"""
+    shift = 0
+    prev = None
+    for t, kind, x, y, code in events:
+        if prev is not None and t - prev > max_gap_ns:
+            shift += t - prev - max_gap_ns
+        prev = t
+        yield t - shift, kind, x, y, code
+
+
+def dedupe_clicks(events, window_ns, radius=0):
+    """Убрать повторные клики той же кнопкой в той же точке за window_ns.
+
+    Вместе с лишним нажатием убирается и его отпускание.
+    """
+    last = {}       # кнопка → (t, x, y) последнего оставленного нажатия
+    skip_up = set()
+    for ev in events:
+        t, kind, x, y, code = ev
+        if kind == EV_CLICK:
+            prev = last.get(code)
+            if (prev is not None and t - prev[0] <= window_ns
+                    and abs(x - prev[1]) <= radius and abs(y - prev[2]) <= radius):
+                skip_up.add(code)
+                continue
+            last[code] = (t, x, y)
+        elif kind == EV_BUTTON_UP and code in skip_up:
+            skip_up.discard(code)
+            continue
+        yield ev
+
+
+def scale_speed(events, factor):
+    """Ускорить (factor > 1) или замедлить воспроизведение записи"""
+    if factor <= 0:
+        raise ValueError("коэффициент скорости должен быть больше нуля")
+    first = None
+    for t, kind, x, y, code in events:
+        if first is None:
+            first = t
+        yield first + int((t - first) / factor), kind, x, y, code
+
+
+def crop(events, start_ns, end_ns=None, close_held=True):
+    """Оставить отрезок [start_ns, end_ns] и отсчитывать время от его начала.
+
+    Отпускания, чьи нажатия остались до отрезка, отбрасываются; нажатия,
+    не отпущенные до конца отрезка, закрываются отпусканием в end_ns
+    (close_held=False — для старых записей, где нажатие и есть клик).
+    """
+    held = {}
+    last = None
+    for t, kind, x, y, code in events:
+        if t < start_ns:
+            continue
+        if end_ns is not None and t > end_ns:
+            break
+        if kind in _UP_OF:
+            if close_held:
+                held[(_UP_OF[kind], code)] = (x, y)
+        elif kind != EV_MOVE and close_held:
+            if held.pop((kind, code), None) is None:
+                continue
+        last = t
+        yield t - start_ns, kind, x, y, code
+    if held:
+        t_end = (end_ns if end_ns is not None else last) - start_ns
+        for (kind, code), (x, y) in held.items():
+            yield t_end, kind, x, y, code
+
+
+def chain(events, *stages):
+    """Пропустить события через этапы по порядку (ленивая цепочка)"""
+    for stage in stages:
+        events = stage(events)
+    return events
+
+
+def build_stages(trim_idle_ms=None, dedupe_ms=None, speed=1.0, crop_s=None, edges=True):
+    """Собрать этапы по настройкам; пустые настройки пропускаются.
+
+    crop_s — пара (начало, конец) в секундах, конец может быть None;
+    edges — в записи есть отпускания кнопок и клавиш. ValueError —
+    trim_idle_ms задан, но не больше нуля (время пошло бы назад).
+    """
+    if trim_idle_ms is not None and not trim_idle_ms > 0:
+        raise ValueError("предел паузы должен быть больше нуля")
+    stages = []
+    if crop_s is not None:
+        a, b = crop_s
+        stages.append(partial(crop, start_ns=int(a * 1000 * MS),
+                              end_ns=None if b is None else int(b * 1000 * MS),
+                              close_held=edges))
+    if dedupe_ms:
+        stages.append(partial(dedupe_clicks, window_ns=int(dedupe_ms * MS)))
+    if trim_idle_ms:
+        stages.append(partial(trim_idle, max_gap_ns=int(trim_idle_ms * MS)))
+    if speed and speed != 1.0:
+        stages.append(partial(scale_speed, factor=speed))
+    return stages
+
+
+# ── Запуск как модуля ─────────────────────────────────────────────────────────
+
+def _synthetic(n):
+    """Поток из n событий: движение с кликами, повторами и длинными паузами"""
+    t = 0
+    for i in range(n):
+        t += 16 * MS if i % 1000 else 3000 * MS
+        r = i % 50
+        if r == 10 or r == 12:
+            yield t, EV_CLICK, 500, 400, 0
+        elif r == 11 or r == 13:
+            yield t, EV_BUTTON_UP, 500, 400, 0
+        else:
+            yield t, EV_MOVE, i % 1920, i % 1080, 0
+
+
+def _bench(n):
+    stages = {
+        "trim_idle": partial(trim_idle, max_gap_ns=500 * MS),
+        "dedupe_clicks": partial(dedupe_clicks, window_ns=200 * MS),
+        "scale_speed": partial(scale_speed, factor=2.0),
+        "crop": partial(crop, start_ns=60_000 * MS, end_ns=None),
+    }
+    t0 = time.perf_counter()
+    base = sum(1 for _ in _synthetic(n))
+    src = time.perf_counter() - t0
+    print(f"источник: {base} событий за {src:.3f} с")
+    for name, stage in stages.items():
+        t0 = time.perf_counter()
+        out = sum(1 for _ in stage(_synthetic(n)))
+        dt = time.perf_counter() - t0 - src
+        print(f"{name:>14}: {out:>8} событий, {dt:.3f} с ({dt / n * 1e9:.0f} нс/событие)")
+    t0 = time.perf_counter()
+    out = sum(1 for _ in chain(_synthetic(n), *stages.values()))
+    dt = time.perf_counter() - t0 - src
+    print(f"{'вся цепочка':>14}: {out:>8} событий, {dt:.3f} с ({dt / n * 1e9:.0f} нс/событие)")
+
+
+def _positive(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError("нужно число больше нуля")
+    return value
+
+
+def main(argv=None):
+    from . import binfmt
+    from .recording import EventBuffer
+
+    ap = argparse.ArgumentParser(prog="python -m utils.pipeline",
+                                 description="Обработка записи Mouse Ops")
+    ap.add_argument("input", nargs="?")
+    ap.add_argument("output", nargs="?")
+    ap.add_argument("--trim-idle", type=_positive, metavar="MS")
+    ap.add_argument("--dedupe", type=float, metavar="MS")
+    ap.add_argument("--speed", type=float, default=1.0)
+    ap.add_argument("--crop", type=float, nargs=2, metavar=("FROM_S", "TO_S"))
+    ap.add_argument("--bench", type=int, metavar="N", help="замер на N синтетических событиях")
+    args = ap.parse_args(argv)
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    if not args.input or not args.output:
+        ap.error("нужны входной и выходной файлы")
+    src = EventBuffer()
+    binfmt.load_recording(args.input, src)
+    stages = build_stages(args.trim_idle, args.dedupe, args.speed, args.crop, src.has_releases())
+    out = EventBuffer()
+    for ev in chain(src, *stages):
+        out.append(*ev)
+    out.load_names(src.names)
+    binfmt.save_recording(args.output, out)
+    print(f"{len(src)} → {len(out)} событий → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
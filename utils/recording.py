@@ -0,0 +1,326 @@
+"""Компактное хранение записанных событий ввода
+
+    python -m utils.recording --check
+"""
+
+import argparse
+import math
+import sys
+from array import array
+
+
+# Типы событий: EV_CLICK / EV_KEY — нажатие, *_UP — отпускание
+EV_MOVE = 0
+EV_CLICK = 1
+EV_KEY = 2
+EV_BUTTON_UP = 3
+EV_KEY_UP = 4
+
+BUTTONS = ("left", "right", "middle")
+
+# ~19 байт на событие: миллион событий — около 19 МБ
+DEFAULT_CAPACITY = 1 << 20
+
+
+class EventBuffer:
+    """Кольцевой буфер событий в колоночных типизированных массивах.
+
+    Колонки: t — время от начала записи ('q'), x/y — координаты ('i'),
+    kind — тип события ('B'), code — номер кнопки или индекс имени клавиши
+    в таблице names ('H'). Массивы растут по мере записи до capacity,
+    после чего самые старые события перезаписываются.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = max(1, capacity)
+        self.names = []
+        self._name_ids = {}
+        self.clear()
+
+    def clear(self):
+        self.t = array("q")
+        self.x = array("i")
+        self.y = array("i")
+        self.kind = array("B")
+        self.code = array("H")
+        self._head = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.t)
+
+    def column_chunks(self, name: str, size: int):
+        """Колонка name по порядку времени кусками ровно по size (последний —
+        остаток); кусок на стыке кольца склеивается из двух срезов"""
+        col = getattr(self, name)
+        n, head = len(col), self._head
+        for j in range(0, n, size):
+            a, b = head + j, head + min(j + size, n)
+            if b <= n:
+                yield col[a:b]
+            elif a >= n:
+                yield col[a - n:b - n]
+            else:
+                yield col[a:] + col[:b - n]
+
+    def load_columns(self, t, x, y, kind, code):
+        """Заменить события готовыми колонками по порядку времени.
+
+        Типы массивов — как у колонок буфера. Сверх capacity остаются
+        самые новые события, остальные считаются в dropped.
+        """
+        cols = (t, x, y, kind, code)
+        extra = len(t) - self.capacity
+        if extra > 0:
+            cols = tuple(c[extra:] for c in cols)
+        self.t, self.x, self.y, self.kind, self.code = cols
+        self._head = 0
+        self.dropped = max(0, extra)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.t, self.x, self.y, self.kind, self.code))
+
+    def intern(self, name: str) -> int:
+        """Индекс имени клавиши в таблице names (добавляет новое имя)"""
+        idx = self._name_ids.get(name)
+        if idx is None:
+            idx = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def load_names(self, names):
+        """Заменить таблицу имён (при загрузке сохранённой записи)"""
+        self.names = list(names)
+        self._name_ids = {n: i for i, n in enumerate(self.names)}
+
+    def name(self, code: int) -> str:
+        return self.names[code] if code < len(self.names) else "?"
+
+    def append(self, t, kind, x=0, y=0, code=0):
+        if len(self.t) < self.capacity:
+            self.t.append(t)
+            self.x.append(x)
+            self.y.append(y)
+            self.kind.append(kind)
+            self.code.append(code)
+            return
+        i = self._head
+        self.t[i], self.x[i], self.y[i] = t, x, y
+        self.kind[i], self.code[i] = kind, code
+        self._head = (i + 1) % self.capacity
+        self.dropped += 1
+
+    def copy(self) -> "EventBuffer":
+        """Снимок буфера: колонки копируются целиком на уровне C, без прохода
+        по событиям, — короткое время под замком писателя"""
+        snap = EventBuffer.__new__(EventBuffer)
+        snap.capacity = self.capacity
+        snap.load_names(self.names)
+        snap.t, snap.x, snap.y = self.t[:], self.x[:], self.y[:]
+        snap.kind, snap.code = self.kind[:], self.code[:]
+        snap._head = self._head
+        snap.dropped = self.dropped
+        return snap
+
+    def __iter__(self):
+        """События по порядку времени: (t, kind, x, y, code)"""
+        n = len(self.t)
+        t, x, y, kind, code = self.t, self.x, self.y, self.kind, self.code
+        for j in range(n):
+            i = (self._head + j) % n
+            yield t[i], kind[i], x[i], y[i], code[i]
+
+    def since(self, t_min: int):
+        """События с t >= t_min по порядку времени"""
+        for ev in self:
+            if ev[0] >= t_min:
+                yield ev
+
+    def count(self, kind: int) -> int:
+        return self.kind.count(kind)
+
+    def has_releases(self) -> bool:
+        """Есть ли отпускания (старые записи хранили только нажатия-клики)"""
+        return EV_BUTTON_UP in self.kind or EV_KEY_UP in self.kind
+
+
+class SpscRing:
+    """Кольцо «один писатель — один читатель» без блокировок.
+
+    Писатель (поток слушателя) только кладёт кортеж в заранее выделенный
+    слот и сдвигает tail; читатель забирает всё до tail и сдвигает head.
+    Каждый индекс меняет ровно один поток, а запись слота и сдвиг индекса
+    под GIL атомарны, поэтому замки не нужны. При переполнении событие
+    отбрасывается и учитывается в dropped — писатель никогда не ждёт.
+    cost/cost_max — время, проведённое писателем в колбэке (нс), для замеров.
+    """
+
+    __slots__ = ("_slots", "_mask", "_head", "_tail", "dropped", "cost", "cost_max")
+
+    def __init__(self, capacity=1 << 16):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._slots = [None] * size
+        self._mask = size - 1
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        self.cost = 0
+        self.cost_max = 0
+
+    def push(self, item) -> bool:
+        tail = self._tail
+        if tail - self._head > self._mask:
+            self.dropped += 1
+            return False
+        self._slots[tail & self._mask] = item
+        self._tail = tail + 1
+        return True
+
+    def drain(self, sink):
+        """Передать все накопленные элементы в sink(item) по порядку"""
+        head, tail = self._head, self._tail
+        slots, mask = self._slots, self._mask
+        for i in range(head, tail):
+            sink(slots[i & mask])
+            slots[i & mask] = None
+        self._head = tail
+
+    @property
+    def pushed(self) -> int:
+        return self._tail
+
+
+def _seg_dist(px, py, ax, ay, bx, by):
+    """Расстояние от точки P до отрезка AB"""
+    dx, dy = bx - ax, by - ay
+    L2 = dx * dx + dy * dy
+    if L2 == 0:
+        return math.hypot(px - ax, py - ay)
+    f = ((px - ax) * dx + (py - ay) * dy) / L2
+    f = 0.0 if f < 0 else 1.0 if f > 1 else f
+    return math.hypot(px - ax - f * dx, py - ay - f * dy)
+
+
+class PathSimplifier:
+    """Потоковое упрощение пути в духе Рамера — Дугласа — Пекера.
+
+    Держит опорную точку A и окно отложенных точек после неё. Пока все
+    отложенные точки лежат не дальше tolerance пикселей от отрезка
+    A → новая точка, окно растёт. Как только очередная точка нарушает
+    допуск, последняя хорошая точка выдаётся наружу и становится новой
+    опорной. Так сохраняются только точки, нужные, чтобы воспроизвести
+    путь с заданной точностью. Окно ограничено window точками и, если
+    задан max_span, временем (нс) от опорной точки: тогда промежуток между
+    сохранёнными точками длиннее max_span бывает, только если его не было
+    и между исходными, — то есть курсор действительно стоял.
+    """
+
+    def __init__(self, tolerance=2.0, window=64, max_span=None):
+        self.tolerance = tolerance
+        self.window = window
+        self.max_span = max_span
+        self.raw = 0
+        self.kept = 0
+        self._anchor = None
+        self._pending = []
+
+    def push(self, t, x, y):
+        """Добавить точку; вернуть точку (t, x, y), которую нужно сохранить, или None"""
+        self.raw += 1
+        p = (t, x, y)
+        if self._anchor is None or self.tolerance <= 0:
+            self._anchor = p
+            self.kept += 1
+            return p
+        pending = self._pending
+        span = self.max_span
+        if pending and len(pending) < self.window and (span is None or t - self._anchor[0] <= span):
+            _, ax, ay = self._anchor
+            tol = self.tolerance
+            if all(_seg_dist(qx, qy, ax, ay, x, y) <= tol for _, qx, qy in pending):
+                pending.append(p)
+                return None
+        elif not pending:
+            pending.append(p)
+            return None
+        # Допуск нарушен (или окно заполнено по числу точек или времени):
+        # фиксируем последнюю хорошую точку
+        out = pending[-1]
+        self._anchor = out
+        self._pending = [p]
+        self.kept += 1
+        return out
+
+    def flush(self):
+        """Завершить текущий участок пути: вернуть его конечную точку или None"""
+        out = self._pending[-1] if self._pending else None
+        self._anchor = None
+        self._pending = []
+        if out is not None:
+            self.kept += 1
+        return out
+
+    @property
+    def ratio(self) -> float:
+        return self.raw / self.kept if self.kept else 1.0
+
+
+# ── Запуск как модуля ─────────────────────────────────────────────────────────
+
+def _check_stroke(gap_ms=100):
+    """Прямой мазок 60 Гц — одна кривая; остановка курсора — разрыв пути.
+
+    Повторяет правило конструктора: путь режется, где между сохранёнными
+    точками прошло больше gap_ms. Возвращает список ошибок.
+    """
+    from .motion import fit_cubic
+
+    gap = gap_ms * 1_000_000
+    errors = []
+
+    def runs(samples):
+        simp = PathSimplifier(2.0, max_span=gap)
+        kept = [p for p in map(lambda s: simp.push(*s), samples) if p]
+        last = simp.flush()
+        if last:
+            kept.append(last)
+        out = [[kept[0]]]
+        for a, b in zip(kept, kept[1:]):
+            if b[0] - a[0] > gap:
+                out.append([])
+            out[-1].append(b)
+        return out
+
+    # 31 точка по прямой 300 пикселей через 16 мс
+    line = [(i * 16_000_000, 100 + i * 10, 100) for i in range(31)]
+    parts = runs(line)
+    if len(parts) != 1 or len(fit_cubic(parts[0], 2.0)) != 1:
+        errors.append(f"прямой мазок: участков {len(parts)}, {parts}")
+    # Тот же мазок, затем курсор стоит 300 мс и движется дальше
+    resume = [(t + 780_000_000, x + 300, y) for t, x, y in line]
+    parts = runs(line + resume)
+    if len(parts) != 2:
+        errors.append(f"мазок с остановкой: участков {len(parts)} вместо 2")
+    return errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m utils.recording",
+                                 description="Проверки записи Mouse Ops")
+    ap.add_argument("--check", action="store_true", help="проверить упрощение пути")
+    args = ap.parse_args(argv)
+    if not args.check:
+        ap.print_help()
+        return 0
+    errors = _check_stroke()
+    for e in errors:
+        print("ОШИБКА:", e)
+    print("ошибок нет" if not errors else f"ошибок: {len(errors)}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
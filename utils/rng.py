@@ -0,0 +1,106 @@
+"""Пул случайных чисел сессии с детерминированным сидом"""
+
+import queue
+import random
+import threading
+
+
+BLOCK_SIZE = 2048
+
+# Один долгоживущий поток на процесс заполняет следующие блоки всех пулов
+# по очереди запросов; у пула в очереди не больше одного запроса
+_requests = queue.SimpleQueue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _prefetch_loop():
+    while True:
+        pool = _requests.get()
+        pool._next = pool._fill(pool._block)
+        pool._ready.set()
+
+
+def _request(pool):
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_prefetch_loop, name="rng-prefetch", daemon=True)
+                _worker.start()
+    _requests.put(pool)
+
+
+class _Pool:
+    """Блок заранее сгенерированных чисел + фоновая подготовка следующего.
+
+    take() можно вызывать из нескольких потоков: смена блока и позиция
+    защищены замком.
+    """
+
+    __slots__ = ("_fill", "_block", "_buf", "_pos", "_next", "_ready", "_lock")
+
+    def __init__(self, fill, block):
+        self._fill = fill
+        self._block = block
+        self._buf = fill(block)
+        self._pos = 0
+        self._next = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        _request(self)
+
+    def take(self) -> float:
+        with self._lock:
+            pos = self._pos
+            if pos == self._block:
+                self._ready.wait()
+                self._ready.clear()
+                self._buf, self._next = self._next, None
+                _request(self)
+                pos = 0
+            self._pos = pos + 1
+            return self._buf[pos]
+
+
+class RandomStream:
+    """Поток случайных чисел сессии, генерируемых блоками.
+
+    Равномерные и нормальные величины готовятся пачками по block штук,
+    следующий блок заполняется общим фоновым потоком, пока расходуется текущий.
+    Блоки идут строго по порядку, поэтому при одинаковом seed
+    последовательность повторяется в точности. Каждый поток выполнения
+    должен брать числа из своего потока — см. spawn().
+    """
+
+    def __init__(self, seed=None, block=BLOCK_SIZE):
+        if seed is None:
+            seed = random.SystemRandom().randrange(1, 1_000_000)
+        self.seed = seed
+        self._block = block
+        uni = random.Random(f"{seed}:uniform")
+        gau = random.Random(f"{seed}:gauss")
+        self._uniform = _Pool(lambda n, r=uni.random: [r() for _ in range(n)], block)
+        self._gauss = _Pool(lambda n, g=gau.gauss: [g(0.0, 1.0) for _ in range(n)], block)
+
+    def spawn(self, name: str) -> "RandomStream":
+        """Независимый дочерний поток, детерминированно выведенный из seed"""
+        return RandomStream(f"{self.seed}/{name}", self._block)
+
+    def random(self) -> float:
+        return self._uniform.take()
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self._uniform.take()
+
+    def gauss(self, mu: float = 0.0, sigma: float = 1.0) -> float:
+        return mu + sigma * self._gauss.take()
+
+    def randrange(self, n: int) -> int:
+        return min(n - 1, int(self._uniform.take() * n))
+
+    def randint(self, a: int, b: int) -> int:
+        return a + self.randrange(b - a + 1)
+
+    def choice(self, seq):
+        return seq[self.randrange(len(seq))]
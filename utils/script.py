@@ -0,0 +1,192 @@
+"""Язык сценариев макросов: разбор текста в дерево команд
+
+Одна команда на строку, аргументы через запятую, # — комментарий:
+
+    set n = 0
+    repeat 100
+        click 500, 300
+        wait rand(80, 120)
+        set n = n + 1
+        if n % 10 == 0
+            key enter
+        end
+    end
+    while elapsed < 60000
+        call farm
+    end
+
+Действия: click x, y[, кнопка[, удержание]], down/up x, y[, кнопка],
+move x, y, drag x1, y1, x2, y2[, мс], key имя[, удержание],
+keydown/keyup имя, wait мс. Управление: set, repeat, while, if/else,
+end, call имя_макроса. Выражения — целые числа, переменные, + - * / %,
+сравнения, and/or/not, rand(a, b) и elapsed (мс от начала
+воспроизведения). Деление целочисленное, деление на ноль даёт 0.
+
+Разбор кешируется по тексту сценария; в байт-код дерево переводит
+компилятор макросов (utils.macro).
+"""
+
+import ast
+from functools import lru_cache
+
+
+BUTTON_NAMES = ("left", "right", "middle")
+
+# Встроенные имена выражений
+NAME_ELAPSED = "elapsed"
+FUNC_RAND = "rand"
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+# Команда → (обязательных, всего) аргументов-выражений; кнопка и клавиша — не выражения
+_ACTIONS = {
+    "click": (2, 4),
+    "down": (2, 3),
+    "up": (2, 3),
+    "move": (2, 2),
+    "drag": (4, 5),
+    "key": (1, 2),
+    "keydown": (1, 1),
+    "keyup": (1, 1),
+    "wait": (1, 1),
+}
+_BLOCKS = ("repeat", "while", "if")
+
+
+def _expr(src: str, line: int):
+    try:
+        tree = ast.parse(src.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"строка {line}: синтаксис: {e.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"строка {line}: недопустимая конструкция: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and type(node.value) is not int:
+            raise ValueError(f"строка {line}: допустимы только целые числа")
+        if isinstance(node, ast.Compare) and len(node.ops) > 1:
+            raise ValueError(f"строка {line}: цепочки сравнений не поддерживаются")
+        if isinstance(node, ast.Call):
+            if (not isinstance(node.func, ast.Name) or node.func.id != FUNC_RAND
+                    or len(node.args) != 2 or node.keywords):
+                raise ValueError(f"строка {line}: из функций доступна только rand(a, b)")
+    return tree.body
+
+
+def _split_args(text: str) -> list:
+    """Разделить аргументы по запятым верхнего уровня (вне скобок)"""
+    out, depth, cur = [], 0, []
+    for ch in text:
+        if ch == "," and depth == 0:
+            out.append("".join(cur).strip())
+            cur = []
+            continue
+        depth += (ch == "(") - (ch == ")")
+        cur.append(ch)
+    tail = "".join(cur).strip()
+    if tail or out:
+        out.append(tail)
+    return out
+
+
+def _names(node):
+    """Имена переменных, читаемые выражением"""
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)
+            and n.id not in (NAME_ELAPSED, FUNC_RAND)}
+
+
+def _action(cmd: str, args: list, line: int):
+    lo, hi = _ACTIONS[cmd]
+    if not lo <= len(args) <= hi:
+        want = lo if lo == hi else f"{lo}–{hi}"
+        raise ValueError(f"строка {line}: {cmd} ожидает аргументов: {want}")
+    if cmd in ("key", "keydown", "keyup"):
+        if not args[0]:
+            raise ValueError(f"строка {line}: не указана клавиша")
+        return (cmd, line, args[0]) + tuple(_expr(a, line) for a in args[1:])
+    if cmd in ("click", "down", "up"):
+        button = args[2].lower() if len(args) > 2 else "left"
+        if button not in BUTTON_NAMES:
+            raise ValueError(f"строка {line}: неизвестная кнопка {args[2]}")
+        hold = (_expr(args[3], line),) if len(args) > 3 else ()
+        return (cmd, line, _expr(args[0], line), _expr(args[1], line), button) + hold
+    return (cmd, line) + tuple(_expr(a, line) for a in args)
+
+
+@lru_cache(maxsize=64)
+def parse_script(source: str) -> tuple:
+    """Разобрать сценарий в дерево команд (кортежи, кешируется по тексту).
+
+    Команда — (имя, строка, аргументы...); блоки repeat/while несут тело,
+    if — тело и ветку else. Ошибки — ValueError с номером строки.
+    """
+    root = []
+    # Открытые блоки: [узел блока или None, список, куда дописываются команды]
+    stack = [[None, root]]
+    assigned, read = set(), []
+    for n, raw in enumerate(source.splitlines(), 1):
+        text = raw.split("#", 1)[0].strip()
+        if not text:
+            continue
+        cmd, _, rest = text.partition(" ")
+        cmd = cmd.lower()
+        rest = rest.strip()
+        node, body = stack[-1]
+        if cmd == "end":
+            if node is None:
+                raise ValueError(f"строка {n}: end без начала блока")
+            stack.pop()
+        elif cmd == "else":
+            if node is None or node[0] != "if" or body is node[4]:
+                raise ValueError(f"строка {n}: else вне if")
+            stack[-1][1] = node[4]
+        elif cmd in _BLOCKS:
+            if not rest:
+                raise ValueError(f"строка {n}: {cmd} без условия")
+            cond = _expr(rest, n)
+            read.append((n, cond))
+            node = [cmd, n, cond, [], []]
+            body.append(node)
+            stack.append([node, node[3]])
+        elif cmd == "set":
+            name, eq, value = rest.partition("=")
+            name = name.strip()
+            if not eq or not name.isidentifier() or name in (NAME_ELAPSED, FUNC_RAND):
+                raise ValueError(f"строка {n}: ожидается set имя = выражение")
+            expr = _expr(value, n)
+            assigned.add(name)
+            read.append((n, expr))
+            body.append(("set", n, name, expr))
+        elif cmd == "call":
+            if not rest:
+                raise ValueError(f"строка {n}: call без имени макроса")
+            body.append(("call", n, rest))
+        elif cmd in _ACTIONS:
+            node = _action(cmd, _split_args(rest), n)
+            read.extend((n, a) for a in node[2:] if isinstance(a, ast.AST))
+            body.append(node)
+        else:
+            raise ValueError(f"строка {n}: неизвестная команда {cmd}")
+    if len(stack) > 1:
+        node = stack[-1][0]
+        raise ValueError(f"строка {node[1]}: {node[0]} без end")
+    for n, expr in read:
+        unknown = _names(expr) - assigned
+        if unknown:
+            raise ValueError(f"строка {n}: переменная {min(unknown)} нигде не задана через set")
+    return _freeze(root)
+
+
+def _freeze(body) -> tuple:
+    out = []
+    for node in body:
+        if isinstance(node, list):
+            cmd, n, cond, inner, orelse = node
+            node = (cmd, n, cond, _freeze(inner)) + ((_freeze(orelse),) if cmd == "if" else ())
+        out.append(node)
+    return tuple(out)
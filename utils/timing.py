@@ -0,0 +1,100 @@
+"""Точное время: монотонные наносекунды, ожидание до момента, учёт задержек"""
+
+import time
+from array import array
+
+
+now_ns = time.perf_counter_ns
+
+# Последний отрезок ожидания крутится в цикле: sleep() на Windows
+# просыпается с погрешностью до ~15 мс
+SPIN_NS = 2_000_000
+
+
+def sleep_until_ns(deadline: int, stop=None) -> bool:
+    """Ждать до момента deadline (perf_counter_ns).
+
+    Большую часть времени спит, последние SPIN_NS — активно ждёт.
+    stop — необязательный threading.Event: ожидание прерывается, если он
+    установлен. Возвращает False, если ожидание прервано.
+    """
+    while True:
+        left = deadline - now_ns()
+        if left <= 0:
+            return True
+        if stop is not None and stop.is_set():
+            return False
+        if left > SPIN_NS:
+            wait = (left - SPIN_NS) / 1e9
+            if stop is not None:
+                if stop.wait(min(wait, 0.05)):
+                    return False
+            else:
+                time.sleep(wait)
+        else:
+            time.sleep(0)
+
+
+class LatencyMeter:
+    """Скользящая оценка задержки вызова (например, впрыска события в ОС).
+
+    Экспоненциальное среднее: новые замеры весят alpha, так что оценка
+    успевает за изменением нагрузки, но не дёргается от единичных выбросов.
+    """
+
+    __slots__ = ("alpha", "estimate", "samples")
+
+    def __init__(self, alpha=0.1, initial=0):
+        self.alpha = alpha
+        self.estimate = initial
+        self.samples = 0
+
+    def add(self, ns: int):
+        if self.samples == 0:
+            self.estimate = ns
+        else:
+            self.estimate += int(self.alpha * (ns - self.estimate))
+        self.samples += 1
+
+    def call(self, fn, *args):
+        """Вызвать fn(*args), учтя длительность вызова; вернуть момент завершения"""
+        t0 = now_ns()
+        fn(*args)
+        t1 = now_ns()
+        self.add(t1 - t0)
+        return t1
+
+
+class TimingStats:
+    """Отклонения фактического времени событий от плана (нс)"""
+
+    def __init__(self):
+        self.errors = array("q")
+
+    def add(self, planned: int, actual: int):
+        self.errors.append(actual - planned)
+
+    def __len__(self):
+        return len(self.errors)
+
+    @property
+    def mean_ns(self) -> float:
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    @property
+    def max_abs_ns(self) -> int:
+        return max(map(abs, self.errors), default=0)
+
+    def percentile_ns(self, q: float) -> int:
+        """Модуль отклонения, не превышаемый долей q событий"""
+        if not self.errors:
+            return 0
+        s = sorted(map(abs, self.errors))
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    def summary(self) -> dict:
+        """Сводка в миллисекундах для отображения"""
+        return {"n": len(self.errors),
+                "mean": self.mean_ns / 1e6,
+                "p95": self.percentile_ns(0.95) / 1e6,
+                "max": self.max_abs_ns / 1e6}